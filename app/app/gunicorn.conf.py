@@ -0,0 +1,47 @@
+"""
+Gunicorn config for app project.
+
+Production serving profile: a pre-forked pool of workers, each with a few
+threads, running the WSGI application. Set GUNICORN_WORKER_CLASS to
+``uvicorn.workers.UvicornWorker`` and use ``app.asgi:application`` to serve
+the ASGI application instead.
+
+Run with::
+
+    gunicorn -c app/gunicorn.conf.py app.wsgi:application
+"""
+
+import multiprocessing
+import os
+
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:8000')
+
+workers = int(
+    os.environ.get('GUNICORN_WORKERS', multiprocessing.cpu_count() * 2 + 1)
+)
+worker_class = os.environ.get('GUNICORN_WORKER_CLASS', 'gthread')
+threads = int(os.environ.get('GUNICORN_THREADS', 4))
+
+# Import the application once in the master so workers share its memory
+preload_app = True
+
+# Recycle workers now and then to bound the effect of any slow leak
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', 2000))
+max_requests_jitter = int(os.environ.get('GUNICORN_MAX_REQUESTS_JITTER', 200))
+
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 30))
+graceful_timeout = 30
+keepalive = 5
+
+# The heartbeat file lives in memory rather than on the container's disk
+worker_tmp_dir = '/dev/shm'
+
+accesslog = '-'
+errorlog = '-'
+
+
+def post_fork(server, worker):
+    """Never share database connections opened by the master with a worker"""
+    from django.db import connections
+
+    connections.close_all()
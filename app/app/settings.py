@@ -24,9 +24,9 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 SECRET_KEY = 'y)*s*ldqzlp1v%3r4^)^41xk1k6by@7mv5r#$3m2o=3@a58ei@'
 
 # SECURITY WARNING: don't run with debug turned on in production!
-DEBUG = True
+DEBUG = bool(int(os.environ.get('DJANGO_DEBUG', 1)))
 
-ALLOWED_HOSTS = []
+ALLOWED_HOSTS = [host for host in os.environ.get('ALLOWED_HOSTS', '').split(',') if host]
 
 
 # Application definition
@@ -40,13 +40,15 @@ INSTALLED_APPS = [
     'django.contrib.staticfiles',
     'rest_framework',
     'rest_framework.authtoken',
-    'core',
-    'user',
-    'recipe',
+    'core.apps.CoreConfig',
+    'user.apps.UserConfig',
+    'recipe.apps.RecipeConfig',
 ]
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'whitenoise.middleware.WhiteNoiseMiddleware',
+    'core.metrics.MetricsMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -81,12 +83,147 @@ WSGI_APPLICATION = 'app.wsgi.application'
 
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.postgresql',
+        # core.backends.postgresql_pool checks connections out of a pool
+        'ENGINE': os.environ.get('DB_ENGINE', 'django.db.backends.postgresql'),
         'HOST': os.environ.get('DB_HOST'),
         'NAME': os.environ.get('DB_NAME'),
         'USER': os.environ.get('DB_USER'),
         'PASSWORD': os.environ.get('DB_PASS'),
+        # Seconds a connection is reused across requests, 0 closes it after
+        # every request as the development server always did
+        'CONN_MAX_AGE': int(os.environ.get('DB_CONN_MAX_AGE', 0)),
+        # Only used by core.backends.postgresql_pool
+        'POOL': {
+            'MAX_SIZE': int(os.environ.get('DB_POOL_MAX_SIZE', 10)),
+            'TIMEOUT': float(os.environ.get('DB_POOL_TIMEOUT', 10)),
+            'MAX_AGE': int(os.environ.get('DB_POOL_MAX_AGE', 1800)),
+        },
+    }
+}
+
+# Request latency, SQL and size metrics exposed on /metrics, see core.metrics
+METRICS = {
+    'ENABLED': bool(int(os.environ.get('METRICS_ENABLED', 0))),
+    'SLOW_REQUEST_SECONDS': float(os.environ.get('METRICS_SLOW_REQUEST_SECONDS', 1)),
+    # Loopback only unless METRICS_ALLOWED_IPS lists the scrapers' addresses
+    'ALLOWED_IPS': [
+        ip for ip in os.environ.get('METRICS_ALLOWED_IPS', '').split(',') if ip
+    ] or ['127.0.0.1', '::1'],
+}
+
+# Profiles of recipe and user requests, see core.profiling. Requests sending
+# `X-Profile: <PROFILING_SECRET>` are profiled, and one in PROFILING_SAMPLE_EVERY
+PROFILING = {
+    'ENABLED': bool(int(os.environ.get('PROFILING_ENABLED', 0))),
+    'SECRET': os.environ.get('PROFILING_SECRET', ''),
+    'SAMPLE_EVERY': int(os.environ.get('PROFILING_SAMPLE_EVERY', 0)),
+    'DIRECTORY': os.environ.get('PROFILING_DIRECTORY', '/vol/web/profiles'),
+    'MAX_PROFILES': int(os.environ.get('PROFILING_MAX_PROFILES', 50)),
+}
+
+# Seconds between liveness checks of a persistent connection, see core.db
+DB_HEALTH_CHECK_INTERVAL = 10
+
+# Read replicas, one alias per host in DB_REPLICA_HOSTS. Tests run against
+# the primary's test database.
+for index, host in enumerate(filter(None, os.environ.get('DB_REPLICA_HOSTS', '').split(',')), 1):
+    DATABASES[f'replica{index}'] = {
+        **DATABASES['default'], 'HOST': host, 'TEST': {'MIRROR': 'default'},
     }
+
+DATABASE_ROUTERS = ['core.replicas.ReplicaRouter']
+
+# Safe API requests read from a replica, see core.replicas
+REPLICA_ROUTING = {
+    'REPLICAS': [alias for alias in DATABASES if alias != 'default'],
+    'STICKY_SECONDS': int(os.environ.get('DB_REPLICA_STICKY_SECONDS', 5)),
+    'CACHE': 'shared',
+}
+
+
+# Cache
+# https://docs.djangoproject.com/en/3.1/topics/cache/
+
+SHARED_CACHE_BACKEND = os.environ.get(
+    'SHARED_CACHE_BACKEND', 'django.core.cache.backends.db.DatabaseCache'
+)
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    # State every process must see, such as the recipe list generations and
+    # the failed login counts of user.throttling. The database table (see
+    # createcachetable) works anywhere, production points it at memcached.
+    # With the table, every cached list and every 304 of
+    # RECIPE_RESPONSE_CACHE still costs a query or two (check core.W001)
+    'shared': {
+        'BACKEND': SHARED_CACHE_BACKEND,
+        'LOCATION': os.environ.get('SHARED_CACHE_LOCATION', 'shared_cache'),
+        # Memcached evicts on its own, the database table is culled past this
+        'OPTIONS': {'MAX_ENTRIES': 100000} if SHARED_CACHE_BACKEND.endswith('DatabaseCache') else {},
+    },
+}
+
+# Cached token authentication, see user.authentication
+TOKEN_AUTH_CACHE = {
+    'LOCAL_MAX_ENTRIES': 10000,
+    'LOCAL_TIMEOUT': 30,
+    'SHARED_CACHE': os.environ.get('TOKEN_AUTH_SHARED_CACHE') or None,
+    'SHARED_TIMEOUT': 300,
+}
+
+# Signed, expiring auth tokens, see user.tokens
+SIGNED_TOKENS = {
+    'LIFETIME': int(os.environ.get('TOKEN_LIFETIME', 3600)),
+    'REFRESH_INTERVAL': 1,
+    'REFRESH_OVERLAP': 30,
+    'REBUILD_INTERVAL': 300,
+}
+
+# Per-user list response cache, see recipe.cache
+RECIPE_RESPONSE_CACHE = {
+    'CACHE': 'shared',
+    'TIMEOUT': 300,
+}
+
+# Largest batch accepted by the bulk endpoints
+BULK_MAX_ITEMS = 10000
+
+
+# Django REST framework
+# https://www.django-rest-framework.org/api-guide/settings/
+
+# The JSON renderer and parser use orjson when it is installed, see
+# core.renderers
+REST_FRAMEWORK = {
+    'DEFAULT_RENDERER_CLASSES': [
+        'core.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'core.parsers.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
+    'DEFAULT_THROTTLE_RATES': {
+        # Failed logins, see user.throttling
+        'login_ip': os.environ.get('LOGIN_IP_RATE', '30/min'),
+        'login_email': os.environ.get('LOGIN_EMAIL_RATE', '5/min'),
+        # Requests per client and endpoint, see core.throttling
+        'recipe_read': os.environ.get('RECIPE_READ_RATE', '600/min'),
+        'recipe_write': os.environ.get('RECIPE_WRITE_RATE', '120/min'),
+        'recipe_upload': os.environ.get('RECIPE_UPLOAD_RATE', '30/hour'),
+        'user_read': os.environ.get('USER_READ_RATE', '120/min'),
+        'user_write': os.environ.get('USER_WRITE_RATE', '30/min'),
+    },
+}
+
+# Store of the request throttles, see core.throttling. 'local' keeps the
+# counts in every process, 'cache' shares them through the CACHE alias
+THROTTLING = {
+    'STORE': os.environ.get('THROTTLE_STORE', 'local'),
+    'CACHE': 'shared',
 }
 
 
@@ -108,6 +245,26 @@ AUTH_PASSWORD_VALIDATORS = [
     },
 ]
 
+# Password hashing, see user.hashers. New passwords use PASSWORD_HASHER
+# (argon2, bcrypt or pbkdf2), hashes of the other algorithms or with other
+# costs are upgraded when their user logs in
+_PASSWORD_HASHERS = {
+    'argon2': 'user.hashers.Argon2PasswordHasher',
+    'bcrypt': 'user.hashers.BCryptSHA256PasswordHasher',
+    'pbkdf2': 'user.hashers.PBKDF2PasswordHasher',
+}
+PASSWORD_HASHERS = [_PASSWORD_HASHERS.pop(os.environ.get('PASSWORD_HASHER', 'argon2'))]
+PASSWORD_HASHERS += _PASSWORD_HASHERS.values()
+
+PASSWORD_HASHING = {
+    'WORKERS': int(os.environ.get('PASSWORD_HASHING_WORKERS', 2)),
+    'QUEUE': int(os.environ.get('PASSWORD_HASHING_QUEUE', 16)),
+    'ARGON2_TIME_COST': 2,
+    'ARGON2_MEMORY_COST': 19456,
+    'ARGON2_PARALLELISM': 1,
+    'BCRYPT_ROUNDS': 12,
+}
+
 
 # Internationalization
 # https://docs.djangoproject.com/en/3.1/topics/i18n/
@@ -132,4 +289,40 @@ MEDIA_URL = '/media/'
 MEDIA_ROOT = '/vol/web/media'
 STATIC_ROOT = '/vol/web/static'
 
+# Static files are served by WhiteNoise, compressed and with hashed names
+# once collectstatic has been run for production
+if not DEBUG:
+    STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
+
+# Set to an internal nginx location to let nginx send media files
+MEDIA_ACCEL_REDIRECT_PREFIX = os.environ.get('MEDIA_ACCEL_REDIRECT_PREFIX')
+
+# Tag and ingredient autocomplete, see recipe.autocomplete
+RECIPE_AUTOCOMPLETE = {
+    'LOCAL_INDEX': True,
+    'CACHE': 'shared',
+    'MAX_USERS': int(os.environ.get('RECIPE_AUTOCOMPLETE_MAX_USERS', 64)),
+    'TIMEOUT': 600,
+    'LIMIT': 10,
+    'MAX_LIMIT': 50,
+}
+
+# Stream uploads to a temporary file instead of buffering them in memory,
+# the storage then moves the file into MEDIA_ROOT without copying it
+FILE_UPLOAD_HANDLERS = [
+    'django.core.files.uploadhandler.TemporaryFileUploadHandler',
+]
+
+# Background processing of recipe images, see recipe.images
+RECIPE_IMAGE_PIPELINE = {
+    'WORKERS': int(os.environ.get('RECIPE_IMAGE_WORKERS', 2)),
+    'MAX_SIZE': 2048,
+    'JPEG_QUALITY': 85,
+    'MAX_PIXELS': 50_000_000,
+    'EAGER': False,
+    'RENDITION_SIZES': (128, 512, 1024),
+    'RENDITION_FORMATS': ('webp', 'jpeg'),
+    'RENDITION_QUALITY': 80,
+}
+
 AUTH_USER_MODEL = 'core.User'
@@ -0,0 +1,194 @@
+import threading
+import time
+from collections import deque
+
+
+class PoolTimeout(Exception):
+    """No connection became available within the checkout timeout"""
+
+
+class PooledConnection:
+    """A raw connection with the bookkeeping the pool needs"""
+
+    __slots__ = ('connection', 'created_at', 'released_at')
+
+    def __init__(self, connection, now):
+        self.connection = connection
+        self.created_at = now
+        self.released_at = now
+
+
+class ConnectionPool:
+    """A bounded, thread safe pool of DB-API connections
+
+    At most `max_size` connections are open at once; a checkout waits up to
+    `timeout` seconds for one to be released before raising `PoolTimeout`.
+    Connections older than `max_age` seconds are closed instead of reused
+    and connections idle for more than `check_interval` seconds are passed
+    to `check` before being handed out.
+
+    The callables receive the raw connection: `connect()` opens one, `close`
+    closes it, `check` returns whether it still works and `reset` prepares a
+    released connection for the next checkout and returns False to discard it.
+    """
+
+    def __init__(self, connect, close=None, check=None, reset=None,
+                 max_size=10, timeout=10, max_age=None, check_interval=30,
+                 clock=time.monotonic):
+        self._connect = connect
+        self._close = close or (lambda conn: conn.close())
+        self._check = check
+        self._reset = reset
+        self.max_size = max_size
+        self.timeout = timeout
+        self.max_age = max_age
+        self.check_interval = check_interval
+        self.clock = clock
+
+        self._idle = deque()
+        self._in_use = {}
+        self._size = 0
+        self._cond = threading.Condition()
+
+        self.checkouts = 0
+        self.waits = 0
+        self.timeouts = 0
+        self.created = 0
+        self.discarded = 0
+        self.wait_time_total = 0.0
+        self.wait_time_max = 0.0
+        self.peak_in_use = 0
+
+    def acquire(self):
+        """Check a connection out of the pool, opening one if there is room"""
+        start = self.clock()
+        deadline = start + self.timeout
+        waited = False
+        while True:
+            with self._cond:
+                while True:
+                    if self._idle:
+                        entry = self._idle.pop()
+                        break
+                    if self._size < self.max_size:
+                        self._size += 1
+                        entry = None
+                        break
+                    remaining = deadline - self.clock()
+                    if remaining <= 0:
+                        self.timeouts += 1
+                        raise PoolTimeout(
+                            f'No connection available within {self.timeout}s '
+                            f'({self._size} of {self.max_size} in use)'
+                        )
+                    waited = True
+                    self._cond.wait(remaining)
+            # Checks and closes talk to the server, so they run unlocked
+            if entry is None or self._healthy(entry):
+                break
+            self._discard(entry)
+
+        if entry is None:
+            try:
+                entry = PooledConnection(self._connect(), self.clock())
+            except BaseException:
+                with self._cond:
+                    self._size -= 1
+                    self._cond.notify()
+                raise
+            with self._cond:
+                self.created += 1
+
+        with self._cond:
+            self._in_use[id(entry.connection)] = entry
+            self._record_checkout(self.clock() - start, waited, entry)
+        return entry.connection
+
+    def release(self, connection, discard=False):
+        """Return a checked out connection, closed if it cannot be reused"""
+        with self._cond:
+            entry = self._in_use.pop(id(connection), None)
+        if entry is None:
+            self._close(connection)
+            return
+
+        if not discard and self._reset is not None:
+            try:
+                discard = self._reset(connection) is False
+            except Exception:
+                discard = True
+        if not discard and self._expired(entry, self.clock()):
+            discard = True
+
+        if discard:
+            self._discard(entry)
+            return
+        entry.released_at = self.clock()
+        with self._cond:
+            self._idle.append(entry)
+            self._cond.notify()
+
+    def close_all(self):
+        """Close the idle connections, checked out ones close on release"""
+        with self._cond:
+            idle, self._idle = list(self._idle), deque()
+        for entry in idle:
+            self._discard(entry)
+
+    def stats(self):
+        """Return the pool's size and its wait time and saturation counters"""
+        with self._cond:
+            return {
+                'max_size': self.max_size,
+                'size': self._size,
+                'idle': len(self._idle),
+                'in_use': len(self._in_use),
+                'peak_in_use': self.peak_in_use,
+                'checkouts': self.checkouts,
+                'waits': self.waits,
+                'timeouts': self.timeouts,
+                'created': self.created,
+                'discarded': self.discarded,
+                'wait_time_total': self.wait_time_total,
+                'wait_time_max': self.wait_time_max,
+                'saturation': len(self._in_use) / self.max_size,
+            }
+
+    def _healthy(self, entry):
+        """Return whether an idle connection may be handed out again"""
+        now = self.clock()
+        if self._expired(entry, now):
+            return False
+        if (self._check is None
+                or now - entry.released_at < self.check_interval):
+            return True
+        try:
+            return bool(self._check(entry.connection))
+        except Exception:
+            return False
+
+    def _expired(self, entry, now):
+        return (
+            self.max_age is not None
+            and now - entry.created_at >= self.max_age
+        )
+
+    def _record_checkout(self, wait, waited, entry):
+        self.checkouts += 1
+        if waited:
+            self.waits += 1
+        self.wait_time_total += wait
+        self.wait_time_max = max(self.wait_time_max, wait)
+        self.peak_in_use = max(self.peak_in_use, len(self._in_use))
+
+    def _discard(self, entry):
+        # The slot is freed once the connection is closed, so the server
+        # never sees more than `max_size` of them
+        try:
+            self._close(entry.connection)
+        except Exception:
+            pass
+        with self._cond:
+            self._size -= 1
+            self.discarded += 1
+            self._cond.notify()
@@ -0,0 +1,133 @@
+"""
+PostgreSQL backend checking connections out of a per process pool.
+
+Set ``ENGINE`` to ``core.backends.postgresql_pool`` and tune the pool with
+a ``POOL`` dict next to it in ``settings.DATABASES``. ``close()`` returns the
+connection to the pool, so with ``CONN_MAX_AGE = 0`` every request borrows
+a connection only for its own duration.
+"""
+import functools
+import os
+import threading
+
+from django.db.backends.postgresql import base
+from psycopg2 import extensions, extras
+
+from core.backends.pool import ConnectionPool, PoolTimeout
+
+Database = base.Database
+
+DEFAULTS = {
+    # Connections open at once in a process, size it to the worker's threads
+    'MAX_SIZE': 10,
+    # Seconds a checkout waits for a connection before failing
+    'TIMEOUT': 10,
+    # Seconds after which a connection is closed instead of reused
+    'MAX_AGE': 1800,
+    # Seconds a connection may sit idle before it is checked with SELECT 1
+    'CHECK_INTERVAL': 30,
+}
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool_setting(settings_dict, name):
+    """Return a POOL setting of a database falling back to our defaults"""
+    return (settings_dict.get('POOL') or {}).get(name, DEFAULTS[name])
+
+
+def pool_stats():
+    """Return the stats of every pool of this process by database alias"""
+    with _pools_lock:
+        pools = [
+            (key, pool) for key, pool in _pools.items()
+            if key[0] == os.getpid()
+        ]
+    return {key[1]: pool.stats() for key, pool in pools}
+
+
+def connect(conn_params, options):
+    """Open a raw connection configured the way the postgresql backend does"""
+    connection = Database.connect(**conn_params)
+    isolation_level = options.get('isolation_level')
+    if (isolation_level is not None
+            and isolation_level != connection.isolation_level):
+        connection.set_session(isolation_level=isolation_level)
+    extras.register_default_jsonb(conn_or_curs=connection, loads=lambda x: x)
+    return connection
+
+
+def check_connection(connection):
+    """SELECT 1 on a raw connection"""
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT 1')
+    return True
+
+
+def reset_connection(connection):
+    """Roll back whatever a released connection left open
+
+    Return False if the connection is unusable.
+    """
+    if connection.closed:
+        return False
+    status = connection.get_transaction_status()
+    if status == extensions.TRANSACTION_STATUS_IDLE:
+        return True
+    if status in (extensions.TRANSACTION_STATUS_INTRANS,
+                  extensions.TRANSACTION_STATUS_INERROR):
+        connection.rollback()
+        return True
+    return False
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    _pool = None
+
+    def get_pool(self, conn_params):
+        """Return the pool for these connection parameters, one per process"""
+        params = tuple(sorted((k, repr(v)) for k, v in conn_params.items()))
+        key = (os.getpid(), self.alias, params)
+        pool = _pools.get(key)
+        if pool is None:
+            with _pools_lock:
+                pool = _pools.get(key)
+                if pool is None:
+                    settings_dict = self.settings_dict
+                    pool = _pools[key] = ConnectionPool(
+                        connect=functools.partial(
+                            connect, conn_params, settings_dict['OPTIONS']
+                        ),
+                        check=check_connection,
+                        reset=reset_connection,
+                        max_size=get_pool_setting(settings_dict, 'MAX_SIZE'),
+                        timeout=get_pool_setting(settings_dict, 'TIMEOUT'),
+                        max_age=get_pool_setting(settings_dict, 'MAX_AGE'),
+                        check_interval=get_pool_setting(
+                            settings_dict, 'CHECK_INTERVAL'
+                        ),
+                    )
+        return pool
+
+    def get_new_connection(self, conn_params):
+        pool = self.get_pool(conn_params)
+        try:
+            connection = pool.acquire()
+        except PoolTimeout as e:
+            raise Database.OperationalError(str(e)) from e
+        self._pool = pool
+        self.isolation_level = self.settings_dict['OPTIONS'].get(
+            'isolation_level', connection.isolation_level
+        )
+        return connection
+
+    def _close(self):
+        if self.connection is None:
+            return
+        if self._pool is None:
+            return super()._close()
+        with self.wrap_database_errors:
+            # Django keeps a connection closed inside an atomic block around
+            # until the block exits, so it must never be handed out again
+            self._pool.release(self.connection, discard=self.in_atomic_block)
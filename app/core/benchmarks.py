@@ -0,0 +1,450 @@
+import random
+import time
+import uuid
+from collections import OrderedDict
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from core.models import Tag, Ingredient, Recipe
+
+# Benchmark suites run by `manage.py benchmark`, by name
+SUITES = OrderedDict()
+
+
+def register(name):
+    """Register a benchmark suite
+
+    A suite is called with the parsed command options and returns a list of
+    `(label, seconds per operation, queries per operation)` rows.
+    """
+    def decorator(func):
+        SUITES[name] = func
+        return func
+    return decorator
+
+
+def measure(label, func, iterations):
+    """Time a callable and count the queries a single call issues"""
+    func()
+    connection.queries_log.clear()
+    with CaptureQueriesContext(connection) as ctx:
+        func()
+    queries = len(ctx.captured_queries)
+
+    start = time.perf_counter()
+    for _ in range(iterations):
+        func()
+    elapsed = time.perf_counter() - start
+
+    return label, elapsed / iterations, queries
+
+
+def create_benchmark_user():
+    """Create a throwaway user to hang the seeded data off"""
+    user = get_user_model()(email=f'bench-{uuid.uuid4().hex}@example.com')
+    user.set_unusable_password()
+    user.save()
+    return user
+
+
+def seed_user_data(user, recipes=1000, tags=50, ingredients=100,
+                   per_recipe=5, seed=0):
+    """Bulk create tags, ingredients and recipes with random links"""
+    rnd = random.Random(seed)
+
+    Tag.objects.bulk_create(
+        Tag(user=user, name=f'tag {i:05d}') for i in range(tags)
+    )
+    Ingredient.objects.bulk_create(
+        Ingredient(user=user, name=f'ingredient {i:05d}')
+        for i in range(ingredients)
+    )
+    Recipe.objects.bulk_create(
+        (
+            Recipe(
+                user=user,
+                title=f'recipe {i:06d}',
+                time_minutes=rnd.randint(1, 240),
+                price=f'{rnd.randint(100, 99999) / 100:.2f}',
+            )
+            for i in range(recipes)
+        ),
+        batch_size=1000,
+    )
+
+    def ids(model):
+        return list(
+            model.objects.filter(user=user).values_list('id', flat=True)
+        )
+
+    tag_ids = ids(Tag)
+    ingredient_ids = ids(Ingredient)
+    recipe_ids = ids(Recipe)
+
+    TagLink = Recipe.tags.through
+    IngredientLink = Recipe.ingredients.through
+    tag_links = []
+    ingredient_links = []
+    for recipe_id in recipe_ids:
+        for tag_id in rnd.sample(tag_ids, min(per_recipe, len(tag_ids))):
+            tag_links.append(TagLink(recipe_id=recipe_id, tag_id=tag_id))
+        for ingredient_id in rnd.sample(
+            ingredient_ids, min(per_recipe, len(ingredient_ids))
+        ):
+            ingredient_links.append(IngredientLink(
+                recipe_id=recipe_id, ingredient_id=ingredient_id
+            ))
+    TagLink.objects.bulk_create(tag_links, batch_size=5000)
+    IngredientLink.objects.bulk_create(ingredient_links, batch_size=5000)
+
+    return recipe_ids, tag_ids, ingredient_ids
+
+
+@register('auth')
+def auth_overhead(options):
+    """Per request cost of token authentication with and without the cache"""
+    from rest_framework.authentication import TokenAuthentication
+    from rest_framework.authtoken.models import Token
+    from rest_framework.test import APIRequestFactory
+
+    from user.authentication import (
+        CachedTokenAuthentication, SignedTokenAuthentication, token_cache,
+    )
+    from user.tokens import issue_token
+
+    user = create_benchmark_user()
+    token = Token.objects.create(user=user)
+    request = APIRequestFactory().get(
+        '/', HTTP_AUTHORIZATION=f'Token {token.key}'
+    )
+    signed_request = APIRequestFactory().get(
+        '/', HTTP_AUTHORIZATION=f'Token {issue_token(user)["token"]}'
+    )
+    iterations = options['iterations']
+
+    def uncached_miss():
+        token_cache.clear()
+        CachedTokenAuthentication().authenticate(request)
+
+    return [
+        measure(
+            'TokenAuthentication',
+            lambda: TokenAuthentication().authenticate(request),
+            iterations,
+        ),
+        measure('CachedTokenAuthentication (miss)', uncached_miss, iterations),
+        measure(
+            'CachedTokenAuthentication (hit)',
+            lambda: CachedTokenAuthentication().authenticate(request),
+            iterations,
+        ),
+        measure(
+            'SignedTokenAuthentication',
+            lambda: SignedTokenAuthentication().authenticate(signed_request),
+            iterations,
+        ),
+    ]
+
+
+@register('related_fields')
+def related_field_validation(options):
+    """Validation cost of recipe payloads referencing hundreds of ids"""
+    from rest_framework import serializers as drf_serializers
+    from rest_framework.test import APIRequestFactory
+
+    from recipe.serializers import RecipeSerializer
+
+    class PerItemRecipeSerializer(RecipeSerializer):
+        ingredients = drf_serializers.PrimaryKeyRelatedField(
+            many=True, queryset=Ingredient.objects.all()
+        )
+        tags = drf_serializers.PrimaryKeyRelatedField(
+            many=True, queryset=Tag.objects.all()
+        )
+
+    user = create_benchmark_user()
+    _, tag_ids, ingredient_ids = seed_user_data(
+        user, recipes=0, tags=500, ingredients=500
+    )
+    request = APIRequestFactory().post('/')
+    request.user = user
+    iterations = max(1, options['iterations'] // 100)
+
+    rows = []
+    for size in (10, 100, 500):
+        payload = {
+            'title': 'Benchmark',
+            'time_minutes': 10,
+            'price': '5.00',
+            'tags': tag_ids[:size],
+            'ingredients': ingredient_ids[:size],
+        }
+        for label, serializer_class in (
+            ('PrimaryKeyRelatedField', PerItemRecipeSerializer),
+            ('UserPrimaryKeyRelatedField', RecipeSerializer),
+        ):
+            def validate():
+                serializer = serializer_class(
+                    data=payload, context={'request': request}
+                )
+                serializer.is_valid(raise_exception=True)
+
+            rows.append(measure(
+                f'{label} ({size} ids per relation)', validate, iterations,
+            ))
+    return rows
+
+
+@register('autocomplete')
+def autocomplete_lookup(options):
+    """Latency of a tag name autocomplete over 100k tags of one user"""
+    from django.test import override_settings
+
+    from recipe.autocomplete import complete, get_index, get_local_cache
+
+    rnd = random.Random(0)
+    words = ('apple', 'basil', 'cumin', 'dill')
+    user = create_benchmark_user()
+    Tag.objects.bulk_create(
+        (
+            Tag(user=user, name=f'{rnd.choice(words)} {i:06d}')
+            for i in range(100000)
+        ),
+        batch_size=5000,
+    )
+    queryset = Tag.objects.filter(user=user)
+    iterations = options['iterations']
+
+    def rebuild():
+        get_local_cache().clear()
+        complete(queryset, user.pk, 'ba', 10)
+
+    index = get_index(queryset, Tag, user.pk)
+    tag = queryset.first()
+
+    def lookup():
+        complete(queryset, user.pk, 'basil 01', 10)
+
+    def patch():
+        index.change(tag.pk, 'basil renamed')
+
+    rows = [
+        measure('local index (hit)', lookup, iterations),
+        measure('local index (rebuild)', rebuild, max(1, iterations // 100)),
+        measure('local index (patch)', patch, max(1, iterations // 10)),
+    ]
+    with override_settings(RECIPE_AUTOCOMPLETE={'LOCAL_INDEX': False}):
+        rows.append(measure(
+            'database prefix scan', lookup, max(1, iterations // 10),
+        ))
+    return rows
+
+
+@register('serializers')
+def serializer_throughput(options):
+    """Rendering a page of rows with the DRF serializers and the fast path"""
+    from rest_framework.test import APIRequestFactory
+
+    from recipe import serializers
+    from recipe.fastpath import FastRepresentation
+
+    user = create_benchmark_user()
+    seed_user_data(user, recipes=500, tags=50, ingredients=100, per_recipe=5)
+    context = {'request': APIRequestFactory().get('/')}
+    iterations = max(1, options['iterations'] // 100)
+
+    recipes = Recipe.objects.filter(user=user)
+    rows = []
+    for label, serializer_class, queryset in (
+        ('recipes', serializers.RecipeSerializer, recipes),
+        ('recipe details', serializers.RecipeDetailSerializer, recipes),
+        ('tags', serializers.TagSerializers, Tag.objects.filter(user=user)),
+    ):
+        queryset = queryset.order_by('-id')
+        count = queryset.count()
+        fast = FastRepresentation(serializer_class, context)
+
+        def drf():
+            instances = serializer_class.setup_eager_loading(queryset.all())
+            return serializer_class(instances, many=True, context=context).data
+
+        for name, func in (
+            ('serializer', drf),
+            ('fast path', lambda: fast.render(list(fast.prepare(queryset)))),
+        ):
+            _label, seconds, queries = measure(name, func, iterations)
+            rows.append((
+                f'{label} {name}, {count / seconds:,.0f} rows/s',
+                seconds, queries,
+            ))
+    return rows
+
+
+@register('login')
+def login_throughput(options):
+    """Logins one core verifies per second with every configured hasher
+
+    The last row is a login refused by the failed login throttle, which
+    never reaches the hasher.
+    """
+    from types import SimpleNamespace
+
+    from django.contrib.auth.hashers import get_hashers
+    from rest_framework.test import APIRequestFactory
+
+    from user.serializers import AuthTokenSerializer
+    from user.throttling import LoginEmailThrottle
+    from user.views import CreateTokenView
+
+    password = 'benchmark-password'
+    iterations = max(1, options['iterations'] // 100)
+
+    rows = []
+    for hasher in get_hashers():
+        try:
+            encoded = hasher.encode(password, hasher.salt())
+        except ValueError:
+            # The hasher's library is not installed
+            continue
+
+        def verify(hasher=hasher, encoded=encoded):
+            hasher.verify(password, encoded)
+
+        rows.append(measure(f'{hasher.algorithm} verify', verify, iterations))
+
+    user = create_benchmark_user()
+    user.set_password(password)
+    user.save()
+    payload = {'email': user.email, 'password': password}
+
+    def login():
+        serializer = AuthTokenSerializer(
+            data=payload, context={'request': None}
+        )
+        serializer.is_valid(raise_exception=True)
+
+    throttle = LoginEmailThrottle()
+    key = throttle.get_cache_key(SimpleNamespace(data=payload), None)
+    throttle.cache.set(key, throttle.num_requests, 60)
+    view = CreateTokenView.as_view()
+    request_factory = APIRequestFactory()
+    try:
+        rows.append(measure('login (AuthTokenSerializer)', login, iterations))
+        rows.append(measure(
+            'throttled login (CreateTokenView)',
+            lambda: view(request_factory.post('/', payload, format='json')),
+            options['iterations'],
+        ))
+    finally:
+        throttle.cache.delete(key)
+    return rows
+
+
+@register('throttling')
+def throttle_check(options):
+    """Per request cost of the sliding window throttle with each store"""
+    from unittest import mock
+
+    from django.test import override_settings
+    from rest_framework.settings import api_settings
+    from rest_framework.test import APIRequestFactory
+
+    from core.caches import has_atomic_incr
+    from core.throttling import SlidingWindowThrottle
+    from recipe.views import RecipeViewSet
+
+    request = APIRequestFactory().get('/')
+    request.user = create_benchmark_user()
+    view = RecipeViewSet()
+    view.action = 'list'
+
+    # Measure admitted requests, the ones doing the most work
+    rates = {'recipe_read': f'{options["iterations"] * 10}/min'}
+
+    # The cache store only runs on a cache with atomic increments
+    stores = ['local']
+    if has_atomic_incr('shared'):
+        stores.append('cache')
+
+    rows = []
+    for store in stores:
+        throttling = {'STORE': store, 'CACHE': 'shared'}
+        with override_settings(THROTTLING=throttling), \
+                mock.patch.dict(api_settings.DEFAULT_THROTTLE_RATES, rates):
+            rows.append(measure(
+                f'SlidingWindowThrottle ({store})',
+                lambda: SlidingWindowThrottle().allow_request(request, view),
+                options['iterations'],
+            ))
+    return rows
+
+
+@register('metrics')
+def metrics_overhead(options):
+    """Per request cost of the metrics middleware, turned off and on
+
+    The tag list rows put that cost next to one of our cheapest requests.
+    """
+    from unittest import mock
+
+    from django.http import HttpResponse
+    from django.test import RequestFactory, override_settings
+    from rest_framework.settings import api_settings
+    from rest_framework.test import APIRequestFactory, force_authenticate
+
+    from core.metrics import MetricsMiddleware, registry
+    from recipe.views import TagViewSet
+
+    request = RequestFactory().get('/')
+    response = HttpResponse(b'{}')
+
+    def get_response(request):
+        return response
+
+    user = create_benchmark_user()
+    Tag.objects.bulk_create(Tag(user=user, name=f'tag {i}') for i in range(20))
+    tag_list = TagViewSet.as_view({'get': 'list'})
+
+    def list_tags(request):
+        response = tag_list(request)
+        response.render()
+        return response
+
+    def tags_request():
+        request = APIRequestFactory().get('/api/recipe/tags/')
+        force_authenticate(request, user)
+        return request
+
+    with override_settings(METRICS={'ENABLED': True}):
+        middleware = MetricsMiddleware(get_response)
+        measured_list = MetricsMiddleware(list_tags)
+    iterations = options['iterations']
+    # The pagination links need the request factory's host name, and no
+    # request may be throttled
+    rates = {'recipe_read': f'{iterations * 10}/min'}
+    with override_settings(ALLOWED_HOSTS=['testserver']), \
+            mock.patch.dict(api_settings.DEFAULT_THROTTLE_RATES, rates):
+        try:
+            rows = [
+                measure(
+                    'no middleware', lambda: get_response(request), iterations
+                ),
+                measure(
+                    'MetricsMiddleware', lambda: middleware(request),
+                    iterations,
+                ),
+                measure(
+                    'tag list', lambda: list_tags(tags_request()),
+                    max(1, iterations // 10),
+                ),
+                measure(
+                    'tag list with MetricsMiddleware',
+                    lambda: measured_list(tags_request()),
+                    max(1, iterations // 10),
+                ),
+            ]
+        finally:
+            registry.clear()
+    return rows
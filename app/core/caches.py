@@ -0,0 +1,50 @@
+from django.core.cache import caches
+from django.core.cache.backends.db import DatabaseCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.cache.backends.memcached import BaseMemcachedCache
+from django.core.exceptions import ImproperlyConfigured
+
+
+def is_process_local(alias):
+    """Whether the cache `alias` keeps its entries in each process' memory"""
+    return isinstance(caches[alias], LocMemCache)
+
+
+def is_database_backed(alias):
+    """Whether every read of the cache `alias` is a database query"""
+    return isinstance(caches[alias], DatabaseCache)
+
+
+def get_shared_cache(alias, setting):
+    """Return the cache `alias`, refusing one the other processes cannot see
+
+    `setting` names the setting pointing at the alias in the error.
+    """
+    if is_process_local(alias):
+        raise ImproperlyConfigured(
+            f'{setting} needs a cache shared between processes, '
+            f'{alias!r} is local to each one'
+        )
+    return caches[alias]
+
+
+def has_atomic_incr(alias):
+    """Whether the cache `alias` increments keys in one server operation
+
+    The database and file caches read then write, losing concurrent updates.
+    """
+    backend = caches[alias]
+    return (
+        isinstance(backend, BaseMemcachedCache)
+        or 'redis' in type(backend).__module__
+    )
+
+
+def get_atomic_cache(alias, setting):
+    """Return the cache `alias`, refusing one whose increments can be lost"""
+    if not has_atomic_incr(alias):
+        raise ImproperlyConfigured(
+            f'{setting} needs a cache with atomic increments, such as '
+            f'memcached, {alias!r} is not one'
+        )
+    return caches[alias]
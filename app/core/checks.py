@@ -0,0 +1,78 @@
+from django.core.checks import Error, Tags, Warning, register
+
+from core.caches import has_atomic_incr, is_database_backed, is_process_local
+
+
+def shared_cache_settings():
+    """Return `(setting, alias)` of the enabled features sharing a cache"""
+    from core import replicas
+    from recipe import autocomplete, cache as response_cache
+
+    required = [('RECIPE_RESPONSE_CACHE', response_cache.get_setting('CACHE'))]
+    if autocomplete.get_setting('LOCAL_INDEX'):
+        required.append(
+            ('RECIPE_AUTOCOMPLETE', autocomplete.get_setting('CACHE'))
+        )
+    if replicas.get_setting('REPLICAS'):
+        required.append(('REPLICA_ROUTING', replicas.get_setting('CACHE')))
+    return required
+
+
+def atomic_cache_settings():
+    """Return `(setting, alias)` of the enabled features counting in a cache"""
+    from core import throttling
+
+    if throttling.get_setting('STORE') == 'cache':
+        return [('THROTTLING', throttling.get_setting('CACHE'))]
+    return []
+
+
+@register(Tags.caches)
+def check_shared_caches(app_configs, **kwargs):
+    """Refuse the per-process caches for state every process must see"""
+    return [
+        Error(
+            f"{setting}['CACHE'] points at {alias!r}, which is local to "
+            'each process',
+            hint=(
+                'Use a cache shared between processes, such as the "shared" '
+                'alias.'
+            ),
+            id='core.E001',
+        )
+        for setting, alias in shared_cache_settings()
+        if is_process_local(alias)
+    ]
+
+
+@register(Tags.caches)
+def check_response_cache(app_configs, **kwargs):
+    """Point out a response cache costing queries on every hit"""
+    from recipe import cache as response_cache
+
+    alias = response_cache.get_setting('CACHE')
+    if is_process_local(alias) or not is_database_backed(alias):
+        return []
+    return [
+        Warning(
+            f"RECIPE_RESPONSE_CACHE['CACHE'] points at {alias!r}, a "
+            'database cache, so every cached list and 304 still queries',
+            hint='Use memcached or redis for the response cache.',
+            id='core.W001',
+        )
+    ]
+
+
+@register(Tags.caches)
+def check_atomic_caches(app_configs, **kwargs):
+    """Refuse the caches losing concurrent increments for counters"""
+    return [
+        Error(
+            f"{setting}['CACHE'] points at {alias!r}, whose increments "
+            'are not atomic',
+            hint='Use a memcached or redis cache, or count per process.',
+            id='core.E002',
+        )
+        for setting, alias in atomic_cache_settings()
+        if not has_atomic_incr(alias)
+    ]
@@ -0,0 +1,24 @@
+import time
+
+from django.conf import settings
+from django.db import connections
+
+
+def check_persistent_connections(**kwargs):
+    """Close broken persistent connections before a request uses them
+
+    Django only checks a connection after an error occurred on it. With
+    CONN_MAX_AGE set, a connection dropped by the server or a proxy would
+    otherwise fail the next request, so idle connections are pinged at most
+    once every DB_HEALTH_CHECK_INTERVAL seconds.
+    """
+    interval = getattr(settings, 'DB_HEALTH_CHECK_INTERVAL', 10)
+    now = time.monotonic()
+    for conn in connections.all():
+        if conn.connection is None or conn.in_atomic_block:
+            continue
+        if now - getattr(conn, 'health_checked_at', 0) < interval:
+            continue
+        conn.health_checked_at = now
+        if not conn.is_usable():
+            conn.close()
@@ -0,0 +1,36 @@
+from django.db import transaction
+from django.core.management.base import BaseCommand, CommandError
+
+from core.benchmarks import SUITES
+
+
+class Command(BaseCommand):
+    """Django Command to run the registered micro benchmarks"""
+
+    help = 'Run benchmark suites inside a transaction that is rolled back'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'suites', nargs='*', help=f'One or more of: {", ".join(SUITES)}'
+        )
+        parser.add_argument('--iterations', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        names = options['suites'] or list(SUITES)
+        unknown = [name for name in names if name not in SUITES]
+        if unknown:
+            raise CommandError(
+                f'Unknown benchmark suite(s): {", ".join(unknown)}'
+            )
+
+        for name in names:
+            self.stdout.write(self.style.MIGRATE_HEADING(f'== {name} =='))
+            with transaction.atomic():
+                rows = SUITES[name](options)
+                transaction.set_rollback(True)
+
+            for label, seconds, queries in rows:
+                self.stdout.write(
+                    f'{label:<50} {seconds * 1e6:>12.1f} us/op '
+                    f'{1 / seconds:>12.0f} op/s {queries:>4} queries/op'
+                )
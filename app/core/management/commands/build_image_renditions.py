@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+
+from core.models import Recipe
+from recipe import images
+
+
+class Command(BaseCommand):
+    """Django Command to create the renditions of older recipe images
+
+    These images were processed before renditions existed.
+    """
+
+    help = 'Generate the missing thumbnail renditions of recipe images'
+
+    def handle(self, *args, **options):
+        recipes = Recipe.objects.filter(
+            image_status=Recipe.IMAGE_READY, image_digest=''
+        )
+        count = 0
+        for recipe in recipes.only('id', 'image').iterator():
+            with recipe.image.open('rb'):
+                digest = images.generate_renditions(recipe.image.read())
+            Recipe.objects.filter(pk=recipe.pk).update(image_digest=digest)
+            count += 1
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Generated renditions for {count} recipe(s)'
+        ))
@@ -0,0 +1,139 @@
+from django.db import connection, transaction
+from django.core.management.base import BaseCommand
+
+from core.benchmarks import create_benchmark_user, seed_user_data
+from core.models import Tag, Ingredient, Recipe
+
+# Indexes added for the per-user listing hot paths in core 0006 and 0011
+HOT_PATH_INDEXES = (
+    'core_tag_user_name_idx',
+    'core_ingredient_user_name_idx',
+    'core_recipe_user_id_idx',
+    'core_recipe_tags_tag_recipe_idx',
+    'core_recipe_ingr_ingr_recipe_idx',
+    'core_recipe_user_time_idx',
+    'core_recipe_user_price_idx',
+    'core_recipe_user_title_idx',
+)
+
+ANALYZED_TABLES = (
+    'core_tag',
+    'core_ingredient',
+    'core_recipe',
+    'core_recipe_tags',
+    'core_recipe_ingredients',
+)
+
+
+class Command(BaseCommand):
+    """Django Command to show the query plans of the listing endpoints
+
+    Each plan is shown with and without our indexes.
+    """
+
+    help = (
+        'Seed a dataset and print the before/after EXPLAIN plans of the hot '
+        'listing queries'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--recipes', type=int, default=20000)
+        parser.add_argument('--tags', type=int, default=200)
+        parser.add_argument('--ingredients', type=int, default=500)
+        parser.add_argument('--per-recipe', type=int, default=5)
+        parser.add_argument('--page-size', type=int, default=100)
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            self.stdout.write('Seeding dataset...')
+            user = create_benchmark_user()
+            # Noise from another user so the user filter has to do some work
+            seed_user_data(
+                create_benchmark_user(), recipes=options['recipes'] // 4,
+                seed=1,
+            )
+            _, tag_ids, ingredient_ids = seed_user_data(
+                user,
+                recipes=options['recipes'],
+                tags=options['tags'],
+                ingredients=options['ingredients'],
+                per_recipe=options['per_recipe'],
+            )
+            self._analyze()
+
+            queries = self._hot_queries(
+                user, tag_ids[:3], ingredient_ids[:3], options['page_size']
+            )
+
+            sid = transaction.savepoint()
+            with connection.cursor() as cursor:
+                for name in HOT_PATH_INDEXES:
+                    cursor.execute(f'DROP INDEX {name}')
+            self._analyze()
+            before = {name: self._explain(qs) for name, qs in queries}
+            transaction.savepoint_rollback(sid)
+
+            self._analyze()
+            after = {name: self._explain(qs) for name, qs in queries}
+
+            for name, _ in queries:
+                self.stdout.write(self.style.MIGRATE_HEADING(f'== {name} =='))
+                self.stdout.write('-- before --')
+                self.stdout.write(before[name])
+                self.stdout.write('-- after --')
+                self.stdout.write(after[name])
+                self.stdout.write('')
+
+            transaction.set_rollback(True)
+
+        self.stdout.write(
+            self.style.SUCCESS('Done, the seeded data was rolled back')
+        )
+
+    def _hot_queries(self, user, tag_ids, ingredient_ids, page_size):
+        """Return the queries issued by the listing endpoints"""
+        recipes = Recipe.objects.filter(user=user)
+        queries = [
+            (
+                'tags list',
+                Tag.objects.filter(user=user).order_by('-name', 'id'),
+            ),
+            (
+                'ingredients list',
+                Ingredient.objects.filter(user=user).order_by('-name', 'id'),
+            ),
+            ('recipes list', recipes.order_by('-id')),
+            (
+                'recipes by tags',
+                recipes.filter(tags__id__in=tag_ids).order_by('-id'),
+            ),
+            (
+                'recipes by ingredients',
+                recipes.filter(ingredients__id__in=ingredient_ids)
+                .order_by('-id'),
+            ),
+            (
+                'recipes under 30 minutes, cheapest first',
+                recipes.filter(time_minutes__lte=30).order_by('price', 'id'),
+            ),
+            (
+                'recipes by time, under a price',
+                recipes.filter(price__lte=20).order_by('time_minutes', 'id'),
+            ),
+        ]
+        return [(name, qs[:page_size]) for name, qs in queries]
+
+    def _analyze(self):
+        """Refresh the planner statistics after the data or indexes changed"""
+        with connection.cursor() as cursor:
+            if connection.vendor == 'postgresql':
+                for table in ANALYZED_TABLES:
+                    cursor.execute(f'ANALYZE {table}')
+            else:
+                cursor.execute('ANALYZE')
+
+    def _explain(self, queryset):
+        """Return the plan of a queryset, executed where the backend allows"""
+        if connection.vendor == 'postgresql':
+            return queryset.explain(analyze=True)
+        return queryset.explain()
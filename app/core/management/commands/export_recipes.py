@@ -0,0 +1,76 @@
+import os
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS
+
+from recipe import exports
+
+
+class Command(BaseCommand):
+    """Django Command to export the recipe books of users"""
+
+    help = (
+        'Write the tags, ingredients and recipes of every active user, or '
+        'of the given emails, to one NDJSON or CSV file per user'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--email', action='append', dest='emails',
+            help='Only export this user',
+        )
+        parser.add_argument(
+            '--format', choices=sorted(exports.CONTENT_TYPES),
+            default='ndjson',
+        )
+        parser.add_argument(
+            '--output-dir', default='.',
+            help='Directory receiving <user id>.<format>',
+        )
+        parser.add_argument(
+            '--chunk-size', type=int, default=500, help='Rows read per query'
+        )
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS)
+
+    def handle(self, *args, **options):
+        if options['chunk_size'] < 1:
+            raise CommandError('--chunk-size must be positive')
+        output_dir = options['output_dir']
+        os.makedirs(output_dir, exist_ok=True)
+
+        users = get_user_model().objects.using(options['database'])
+        users = users.order_by('id')
+        if options['emails']:
+            users = users.filter(email__in=options['emails'])
+            found = users.values_list('email', flat=True)
+            missing = set(options['emails']) - set(found)
+            if missing:
+                raise CommandError(
+                    f'Unknown users: {", ".join(sorted(missing))}'
+                )
+        else:
+            users = users.filter(is_active=True)
+
+        for user in users.iterator():
+            path = os.path.join(output_dir, f'{user.pk}.{options["format"]}')
+            size = self.write(path, exports.export(
+                user, options['format'], options['chunk_size'],
+                options['database'],
+            ))
+            self.stdout.write(f'{user.email}: {path} ({size} bytes)')
+
+    def write(self, path, chunks):
+        """Write the chunks next to `path`, move the file in place when done"""
+        tmp = f'{path}.tmp'
+        size = 0
+        try:
+            with open(tmp, 'wb') as f:
+                for chunk in chunks:
+                    f.write(chunk)
+                    size += len(chunk)
+            os.replace(tmp, path)
+        finally:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+        return size
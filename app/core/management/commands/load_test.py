@@ -0,0 +1,105 @@
+import http.client
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+from django.core.management.base import BaseCommand, CommandError
+
+
+def percentile(values, fraction):
+    """Return the value below which `fraction` of the sorted values fall"""
+    if not values:
+        return 0.0
+    index = min(len(values) - 1, int(round(fraction * (len(values) - 1))))
+    return values[index]
+
+
+class Command(BaseCommand):
+    """Django Command to measure the throughput of a running server"""
+
+    help = (
+        'Send concurrent keep-alive GET requests to urls and report '
+        'throughput and latency'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('urls', nargs='+')
+        parser.add_argument(
+            '--requests', type=int, default=1000, help='Requests per url'
+        )
+        parser.add_argument('--concurrency', type=int, default=8)
+        parser.add_argument(
+            '--token', help='Token sent in the Authorization header'
+        )
+        parser.add_argument('--timeout', type=float, default=30)
+
+    def handle(self, *args, **options):
+        headers = {'Accept': 'application/json'}
+        if options['token']:
+            headers['Authorization'] = f'Token {options["token"]}'
+
+        for url in options['urls']:
+            parts = urlsplit(url)
+            if parts.scheme not in ('http', 'https') or not parts.netloc:
+                raise CommandError(f'Not an absolute http(s) url: {url}')
+            self.stdout.write(self.style.MIGRATE_HEADING(f'== {url} =='))
+            latencies, errors, elapsed = self.run(parts, headers, options)
+            self.report(latencies, errors, elapsed)
+
+    def run(self, parts, headers, options):
+        """Send the requests from `concurrency` threads
+
+        Each thread keeps its own connection alive.
+        """
+        path = parts.path or '/'
+        if parts.query:
+            path = f'{path}?{parts.query}'
+        if parts.scheme == 'https':
+            connection_class = http.client.HTTPSConnection
+        else:
+            connection_class = http.client.HTTPConnection
+        local = threading.local()
+
+        def request(_):
+            conn = getattr(local, 'conn', None)
+            if conn is None:
+                conn = local.conn = connection_class(
+                    parts.netloc, timeout=options['timeout']
+                )
+            start = time.perf_counter()
+            try:
+                conn.request('GET', path, headers=headers)
+                response = conn.getresponse()
+                response.read()
+            except (OSError, http.client.HTTPException):
+                conn.close()
+                local.conn = None
+                return None
+            return time.perf_counter() - start, response.status
+
+        start = time.perf_counter()
+        workers = options['concurrency']
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(request, range(options['requests'])))
+        elapsed = time.perf_counter() - start
+
+        latencies = sorted(
+            result[0] for result in results if result and result[1] < 400
+        )
+        errors = len(results) - len(latencies)
+        return latencies, errors, elapsed
+
+    def report(self, latencies, errors, elapsed):
+        total = len(latencies) + errors
+        self.stdout.write(f'{"requests":<12} {total:>10} ({errors} errors)')
+        self.stdout.write(f'{"throughput":<12} {total / elapsed:>10.1f} req/s')
+        if latencies:
+            mean = statistics.mean(latencies)
+            self.stdout.write(f'{"mean":<12} {mean * 1e3:>10.1f} ms')
+            for label, fraction in (
+                ('p50', 0.5), ('p95', 0.95), ('p99', 0.99),
+            ):
+                value = percentile(latencies, fraction)
+                self.stdout.write(f'{label:<12} {value * 1e3:>10.1f} ms')
@@ -0,0 +1,180 @@
+import io
+from collections import Counter
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core import profiling
+
+# Positions in the rows of `Command.totals`
+SORT_KEYS = {'tottime': 2, 'cumtime': 3}
+NOT_CALLED = (0, 0, 0.0, 0.0)
+
+
+def function_name(func):
+    filename, line, name = func
+    if filename == '~':
+        return name
+    return f'{filename}:{line}({name})'
+
+
+class Command(BaseCommand):
+    """Django Command to read the request profiles stored by core.profiling"""
+
+    help = 'List, dump, diff or delete the stored request profiles'
+
+    def add_arguments(self, parser):
+        actions = parser.add_subparsers(dest='action', required=True)
+
+        listing = actions.add_parser(
+            'list', help='List the stored profiles, oldest first'
+        )
+        listing.add_argument(
+            '--view', help='Only list the profiles of this view name'
+        )
+
+        dump = actions.add_parser(
+            'dump',
+            help='Print the call statistics and SQL timeline of a profile',
+        )
+        dump.add_argument(
+            'profile', help="Profile id, unique prefix of one or 'latest'"
+        )
+        dump.add_argument(
+            '--sort', default='cumulative', help='pstats sort key'
+        )
+        dump.add_argument(
+            '--limit', type=int, default=30, help='Functions printed'
+        )
+        dump.add_argument(
+            '--callees', action='store_true',
+            help='Also print what each function called',
+        )
+        dump.add_argument(
+            '--output', help='Also write the statistics to this pstats file'
+        )
+
+        diff = actions.add_parser(
+            'diff', help='Compare the functions and SQL of two profiles'
+        )
+        diff.add_argument('before')
+        diff.add_argument('after')
+        diff.add_argument(
+            '--sort', choices=sorted(SORT_KEYS), default='cumtime'
+        )
+        diff.add_argument(
+            '--limit', type=int, default=30, help='Functions printed'
+        )
+
+        actions.add_parser('clear', help='Delete every stored profile')
+
+    def handle(self, *args, **options):
+        self.store = profiling.get_store()
+        getattr(self, f'handle_{options["action"]}')(options)
+
+    def load(self, ref):
+        try:
+            return self.store.load(ref)
+        except KeyError:
+            raise CommandError(f'No single profile matches {ref!r}')
+
+    def describe(self, record):
+        return (
+            f'{record["id"]} {record["method"]} {record["path"]} '
+            f'({record["view"]}) {record["status"]} '
+            f'{record["duration"] * 1000:.1f} ms, '
+            f'{record["query_count"]} queries in '
+            f'{record["query_time"] * 1000:.1f} ms, {record["trigger"]}'
+        )
+
+    def handle_list(self, options):
+        for profile_id in self.store.ids():
+            record = self.load(profile_id)
+            if options['view'] is None or record['view'] == options['view']:
+                self.stdout.write(self.describe(record))
+
+    def handle_dump(self, options):
+        record = self.load(options['profile'])
+        self.stdout.write(self.describe(record))
+
+        out = io.StringIO()
+        stats = profiling.to_pstats(record, stream=out)
+        stats.sort_stats(options['sort']).print_stats(options['limit'])
+        if options['callees']:
+            stats.print_callees(options['limit'])
+        self.stdout.write(out.getvalue())
+        if options['output']:
+            stats.dump_stats(options['output'])
+
+        self.stdout.write('SQL timeline:')
+        for offset, elapsed, alias, sql in record['queries']:
+            self.stdout.write(
+                f'  +{offset * 1000:8.1f} ms {elapsed * 1000:7.1f} ms '
+                f'[{alias}] {sql}'
+            )
+        missing = record['query_count'] - len(record['queries'])
+        if missing > 0:
+            self.stdout.write(f'  ... {missing} more')
+
+    def handle_diff(self, options):
+        before = self.load(options['before'])
+        after = self.load(options['after'])
+        self.stdout.write(f'- {self.describe(before)}')
+        self.stdout.write(f'+ {self.describe(after)}')
+
+        index = SORT_KEYS[options['sort']]
+        old, new = self.totals(before), self.totals(after)
+
+        def delta(func):
+            return (
+                new.get(func, NOT_CALLED)[index]
+                - old.get(func, NOT_CALLED)[index]
+            )
+
+        changes = sorted(
+            old.keys() | new.keys(),
+            key=lambda func: abs(delta(func)),
+            reverse=True,
+        )
+        self.stdout.write(
+            f'\n{"before ms":>10} {"after ms":>10} {"delta ms":>10} '
+            f'{"calls":>13}  function'
+        )
+        for func in changes[:options['limit']]:
+            a, b = old.get(func, NOT_CALLED), new.get(func, NOT_CALLED)
+            calls = f'{a[0]}->{b[0]}'
+            self.stdout.write(
+                f'{a[index] * 1000:10.2f} {b[index] * 1000:10.2f} '
+                f'{delta(func) * 1000:+10.2f} '
+                f'{calls:>13}  {function_name(func)}'
+            )
+
+        # Statements run a different number of times, N+1 queries show up here
+        old_sql = Counter(sql for *_, sql in before['queries'])
+        new_sql = Counter(sql for *_, sql in after['queries'])
+        changed = [
+            sql for sql in old_sql.keys() | new_sql.keys()
+            if old_sql[sql] != new_sql[sql]
+        ]
+        changed.sort(
+            key=lambda sql: abs(new_sql[sql] - old_sql[sql]), reverse=True
+        )
+        self.stdout.write('\nSQL run a different number of times:')
+        for sql in changed:
+            self.stdout.write(
+                f'  {old_sql[sql]:>5} -> {new_sql[sql]:<5} {sql}'
+            )
+
+    def totals(self, record):
+        """Return the totals of every function of a profile
+
+        As `{function: (calls, primitive calls, tottime, cumtime)}`.
+        """
+        return {
+            tuple(row[:3]): (row[4], row[3], row[5], row[6])
+            for row in record['stats']
+        }
+
+    def handle_clear(self, options):
+        count = len(self.store.ids())
+        self.store.clear()
+        self.stdout.write(f'Deleted {count} profiles')
@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+
+from core.models import RevokedToken
+
+
+class Command(BaseCommand):
+    """Django Command to delete the auth token records no longer needed"""
+
+    help = (
+        'Delete the revocations of expired signed tokens, and optionally '
+        'every legacy token'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--legacy', action='store_true',
+            help=(
+                'Also delete the never expiring tokens issued before signed '
+                'tokens'
+            ),
+        )
+
+    def handle(self, *args, **options):
+        expired = RevokedToken.objects.filter(expires_at__lte=timezone.now())
+        deleted, _ = expired.delete()
+        self.stdout.write(f'Deleted {deleted} expired revocations')
+        if options['legacy']:
+            deleted, _ = Token.objects.all().delete()
+            self.stdout.write(f'Deleted {deleted} legacy tokens')
@@ -0,0 +1,346 @@
+import logging
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.db.backends.signals import connection_created
+from rest_framework import serializers
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    # The middleware removes itself from the stack when this is off
+    'ENABLED': False,
+    # Requests slower than this log their SQL
+    'SLOW_REQUEST_SECONDS': 1.0,
+    # Seconds between two slow request logs of a process
+    'SLOW_LOG_INTERVAL': 10,
+    # Statements kept per request for the slow request log
+    'SLOW_LOG_MAX_QUERIES': 200,
+    # Client addresses allowed to read /metrics, None for any
+    'ALLOWED_IPS': ('127.0.0.1', '::1'),
+}
+
+# Upper bounds in seconds of the request latency histogram buckets
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+# Other methods are recorded as 'other' so clients cannot add series at will
+METHODS = frozenset((
+    'GET', 'HEAD', 'POST', 'PUT', 'PATCH', 'DELETE', 'OPTIONS', 'TRACE',
+))
+
+POOL_ENGINE = 'core.backends.postgresql_pool'
+
+_phases = ContextVar('metrics_phases', default=None)
+_recorder = ContextVar('metrics_recorder', default=None)
+
+
+def get_setting(name):
+    """Return a METRICS setting falling back to our defaults"""
+    return getattr(settings, 'METRICS', {}).get(name, DEFAULTS[name])
+
+
+@contextmanager
+def timed(phase):
+    """Add the time spent in the block to `phase` of the current request
+
+    Nothing is recorded outside of a measured request.
+    """
+    phases = _phases.get()
+    if phases is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        phases[phase] = phases.get(phase, 0.0) + time.perf_counter() - start
+
+
+class TimedDataMixin:
+    """Add the time spent producing `data` to the 'serialize' phase"""
+
+    @property
+    def data(self):
+        with timed('serialize'):
+            return super().data
+
+
+class TimedListSerializer(TimedDataMixin, serializers.ListSerializer):
+    """List serializer of the serializers using `TimedDataMixin`"""
+
+
+class QueryRecorder:
+    """`execute_wrapper` counting the queries of a request and their time
+
+    The first `keep` statements are kept as `(offset, duration, alias, sql)`,
+    offset being the seconds from the creation of the recorder.
+    """
+
+    def __init__(self, keep):
+        self.keep = keep
+        self.count = 0
+        self.duration = 0.0
+        self.statements = []
+        self.origin = time.perf_counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - start
+            self.count += 1
+            self.duration += elapsed
+            if len(self.statements) < self.keep:
+                self.statements.append((
+                    start - self.origin, elapsed,
+                    context['connection'].alias, sql,
+                ))
+
+
+def record_query(execute, sql, params, many, context):
+    """`execute_wrapper` left on every connection, counting for a request"""
+    recorder = _recorder.get()
+    if recorder is None:
+        return execute(sql, params, many, context)
+    return recorder(execute, sql, params, many, context)
+
+
+def install_query_recorder(connection, **kwargs):
+    """Add `record_query` to a connection once, see `connection_created`"""
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+class Registry:
+    """Per-process request metrics by view, method and status"""
+
+    def __init__(self, buckets):
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self._series = {}
+
+    def observe(self, labels, duration, queries, query_time, phases, size):
+        index = bisect_left(self.buckets, duration)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = {
+                    'buckets': [0] * (len(self.buckets) + 1), 'count': 0,
+                    'duration': 0.0, 'queries': 0, 'query_time': 0.0,
+                    'phases': {}, 'bytes': 0,
+                }
+            series['buckets'][index] += 1
+            series['count'] += 1
+            series['duration'] += duration
+            series['queries'] += queries
+            series['query_time'] += query_time
+            series['bytes'] += size
+            for phase, seconds in phases.items():
+                total = series['phases'].get(phase, 0.0) + seconds
+                series['phases'][phase] = total
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                labels: dict(
+                    series, buckets=list(series['buckets']),
+                    phases=dict(series['phases']),
+                )
+                for labels, series in self._series.items()
+            }
+
+    def clear(self):
+        with self._lock:
+            self._series.clear()
+
+
+registry = Registry(BUCKETS)
+
+
+def _labels(view, method, status):
+    return f'view="{view}",method="{method}",status="{status}"'
+
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def exposition():
+    """Render the metrics of this process in the Prometheus text format"""
+    snapshot = sorted(registry.snapshot().items())
+    lines = []
+
+    def family(name, kind, help_text, samples):
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} {kind}')
+        lines.extend(f'{sample} {_number(value)}' for sample, value in samples)
+
+    def per_series(key):
+        return [(_labels(*labels), series[key]) for labels, series in snapshot]
+
+    name = 'http_request_duration_seconds'
+    bounds = registry.buckets + ('+Inf',)
+    histogram = []
+    for labels, series in snapshot:
+        label = _labels(*labels)
+        cumulative = 0
+        for bound, count in zip(bounds, series['buckets']):
+            cumulative += count
+            histogram.append(
+                (f'{name}_bucket{{{label},le="{bound}"}}', cumulative)
+            )
+        histogram.append((f'{name}_sum{{{label}}}', series['duration']))
+        histogram.append((f'{name}_count{{{label}}}', series['count']))
+    family(name, 'histogram', 'Request latency.', histogram)
+
+    for name, key, help_text in (
+        ('db_queries_total', 'queries', 'SQL queries run by requests.'),
+        ('db_query_duration_seconds_total', 'query_time',
+         'Time requests spent in SQL queries.'),
+        ('http_response_bytes_total', 'bytes',
+         'Bytes of non streaming response bodies.'),
+    ):
+        family(name, 'counter', help_text, [
+            (f'{name}{{{label}}}', value) for label, value in per_series(key)
+        ])
+
+    name = 'http_request_phase_seconds_total'
+    family(name, 'counter', 'Time requests spent serializing and rendering.', [
+        (f'{name}{{{_labels(*labels)},phase="{phase}"}}', seconds)
+        for labels, series in snapshot
+        for phase, seconds in sorted(series['phases'].items())
+    ])
+
+    pools = _pool_stats()
+    if pools:
+        for stat in ('size', 'in_use', 'idle', 'waits', 'timeouts',
+                     'wait_time_total', 'saturation'):
+            family(f'db_pool_{stat}', 'gauge', f'Connection pool {stat}.', [
+                (f'db_pool_{stat}{{alias="{alias}"}}', stats[stat])
+                for alias, stats in sorted(pools.items())
+            ])
+
+    return '\n'.join(lines) + '\n'
+
+
+def _pool_stats():
+    databases = settings.DATABASES.values()
+    if not any(db['ENGINE'] == POOL_ENGINE for db in databases):
+        return {}
+    from core.backends.postgresql_pool.base import pool_stats
+    return pool_stats()
+
+
+class MetricsMiddleware:
+    """Record the latency, SQL queries, serialization time and size of requests
+
+    Queries are counted by `record_query`, installed on every connection
+    once rather than wrapped around each request. The serialization time is
+    the time spent in `TimedDataMixin.data` and the fast path renderers. A
+    streaming response is recorded once its content was read, with the
+    queries and time spent producing it. Turned off, see `METRICS`, the
+    middleware is not even instantiated.
+    """
+
+    def __init__(self, get_response):
+        if not get_setting('ENABLED'):
+            raise MiddlewareNotUsed()
+        self.get_response = get_response
+        self.slow_seconds = get_setting('SLOW_REQUEST_SECONDS')
+        self.keep = get_setting('SLOW_LOG_MAX_QUERIES')
+        self.slow_logged_at = None
+        # Connections opened later get it from the signal
+        connection_created.connect(
+            install_query_recorder, dispatch_uid='core.metrics'
+        )
+        for conn in connections.all():
+            install_query_recorder(conn)
+
+    def __call__(self, request):
+        recorder = QueryRecorder(self.keep)
+        phases = {}
+        phases_token = _phases.set(phases)
+        recorder_token = _recorder.set(recorder)
+        start = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _recorder.reset(recorder_token)
+            _phases.reset(phases_token)
+        end = time.perf_counter()
+
+        if hasattr(request, '_metrics_render_start'):
+            phases['render'] = end - request._metrics_render_start
+        if response.streaming:
+            response.streaming_content = self.streamed(
+                request, response, response.streaming_content, recorder,
+                phases, start,
+            )
+        else:
+            self.record(
+                request, response, recorder, phases, end - start,
+                len(response.content),
+            )
+        return response
+
+    def streamed(self, request, response, content, recorder, phases, start):
+        """Yield the content of a streaming response, record it at the end"""
+        size = 0
+        phases_token = _phases.set(phases)
+        recorder_token = _recorder.set(recorder)
+        try:
+            for chunk in content:
+                size += len(chunk)
+                yield chunk
+        finally:
+            _recorder.reset(recorder_token)
+            _phases.reset(phases_token)
+            self.record(
+                request, response, recorder, phases,
+                time.perf_counter() - start, size,
+            )
+
+    def record(self, request, response, recorder, phases, duration, size):
+        match = getattr(request, 'resolver_match', None)
+        view = match.view_name if match is not None else 'unmatched'
+        method = request.method if request.method in METHODS else 'other'
+        registry.observe(
+            (view, method, response.status_code),
+            duration, recorder.count, recorder.duration, phases, size,
+        )
+        if duration >= self.slow_seconds:
+            self.log_slow_request(request, view, duration, recorder)
+
+    def process_template_response(self, request, response):
+        # Called right before DRF renders the response data to bytes
+        request._metrics_render_start = time.perf_counter()
+        return response
+
+    def log_slow_request(self, request, view, duration, recorder):
+        """Log the SQL of a slow request
+
+        At most once every SLOW_LOG_INTERVAL seconds.
+        """
+        now = time.monotonic()
+        interval = get_setting('SLOW_LOG_INTERVAL')
+        if (self.slow_logged_at is not None
+                and now - self.slow_logged_at < interval):
+            return
+        self.slow_logged_at = now
+        statements = '\n'.join(
+            f'  {elapsed * 1000:.1f} ms [{alias}] {sql}'
+            for _offset, elapsed, alias, sql in recorder.statements
+        )
+        logger.warning(
+            'Slow request %s %s (%s) took %.3f s '
+            'with %d queries in %.3f s\n%s',
+            request.method, request.get_full_path(), view, duration,
+            recorder.count, recorder.duration, statements,
+        )
@@ -0,0 +1,31 @@
+# Generated by Django 3.1.14 on 2026-10-16 22:39
+
+import core.models
+from django.db import migrations, models
+
+
+def mark_existing_images_ready(apps, schema_editor):
+    """Images uploaded before the pipeline existed are already final"""
+    Recipe = apps.get_model('core', 'Recipe')
+    Recipe.objects.exclude(image__isnull=True).exclude(image='').update(image_status='ready')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_composite_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='image_status',
+            field=models.CharField(choices=[('none', 'No image'), ('pending', 'Pending'), ('processing', 'Processing'), ('ready', 'Ready'), ('failed', 'Failed')], default='none', max_length=16),
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='image_upload',
+            field=models.FileField(blank=True, null=True, upload_to=core.models.recipe_upload_file_path),
+        ),
+        migrations.RunPython(mark_existing_images_ready, migrations.RunPython.noop),
+    ]
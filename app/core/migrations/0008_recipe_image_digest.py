@@ -0,0 +1,18 @@
+# Generated by Django 3.1.14 on 2026-10-16 22:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_recipe_image_pipeline'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='image_digest',
+            field=models.CharField(blank=True, max_length=64),
+        ),
+    ]
@@ -0,0 +1,87 @@
+# Generated by Django 3.1.14 on 2026-10-16 22:49
+
+import re
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+TSVECTOR_SQL = [
+    'ALTER TABLE core_recipe ADD COLUMN search_vector tsvector',
+    'CREATE INDEX core_recipe_search_vector_idx ON core_recipe USING GIN (search_vector)',
+    """
+    UPDATE core_recipe SET search_vector =
+        setweight(to_tsvector(%(config)s::regconfig, core_recipe.title), 'A') ||
+        setweight(to_tsvector(%(config)s::regconfig, coalesce((
+            SELECT string_agg(t.name, ' ') FROM core_tag t
+            JOIN core_recipe_tags rt ON rt.tag_id = t.id WHERE rt.recipe_id = core_recipe.id
+        ), '')), 'B') ||
+        setweight(to_tsvector(%(config)s::regconfig, coalesce((
+            SELECT string_agg(i.name, ' ') FROM core_ingredient i
+            JOIN core_recipe_ingredients ri ON ri.ingredient_id = i.id
+            WHERE ri.recipe_id = core_recipe.id
+        ), '')), 'C')
+    """,
+]
+
+
+def build_search_index(apps, schema_editor):
+    """Add the tsvector column on Postgres, fill the SearchTerm index elsewhere"""
+    if schema_editor.connection.vendor == 'postgresql':
+        config = getattr(settings, 'RECIPE_SEARCH', {}).get('CONFIG', 'english')
+        for sql in TSVECTOR_SQL:
+            schema_editor.execute(sql, {'config': config})
+        return
+
+    Recipe = apps.get_model('core', 'Recipe')
+    SearchTerm = apps.get_model('core', 'SearchTerm')
+    db = schema_editor.connection.alias
+    rows = []
+    for recipe in Recipe.objects.using(db).prefetch_related('tags', 'ingredients').iterator(chunk_size=2000):
+        weights = defaultdict(int)
+        sources = [(recipe.title, 10)]
+        sources += [(tag.name, 4) for tag in recipe.tags.all()]
+        sources += [(ingredient.name, 2) for ingredient in recipe.ingredients.all()]
+        for text, weight in sources:
+            for term in dict.fromkeys(term[:64] for term in re.findall(r'\w+', text.lower())):
+                weights[term] += weight
+        rows.extend(
+            SearchTerm(user_id=recipe.user_id, recipe_id=recipe.id, term=term, weight=weight)
+            for term, weight in weights.items()
+        )
+    SearchTerm.objects.using(db).bulk_create(rows, batch_size=5000)
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute('ALTER TABLE core_recipe DROP COLUMN search_vector')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_recipe_image_digest'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchTerm',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term', models.CharField(max_length=64)),
+                ('weight', models.PositiveSmallIntegerField()),
+                ('recipe', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='core.recipe')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='searchterm',
+            index=models.Index(fields=['user', 'term', 'recipe'], name='core_searchterm_user_term_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='searchterm',
+            constraint=models.UniqueConstraint(fields=('recipe', 'term'), name='core_searchterm_recipe_term_uniq'),
+        ),
+        migrations.RunPython(build_search_index, drop_search_index),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 3.1.14 on 2026-10-16 22:51
+
+from django.db import migrations
+
+TABLES = ('core_tag', 'core_ingredient')
+
+
+def create_prefix_indexes(apps, schema_editor):
+    """Index lower(name) for LIKE 'prefix%' scans, which Postgres needs pattern ops for"""
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for table in TABLES:
+        schema_editor.execute(
+            f'CREATE INDEX {table}_user_name_prefix_idx '
+            f'ON {table} (user_id, lower(name) text_pattern_ops)'
+        )
+
+
+def drop_prefix_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for table in TABLES:
+        schema_editor.execute(f'DROP INDEX {table}_user_name_prefix_idx')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_recipe_search'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_prefix_indexes, drop_prefix_indexes),
+    ]
@@ -3,6 +3,7 @@ import os
 
 from django.db import models
 from django.conf import settings
+from django.utils import timezone
 from django.contrib.auth.models import AbstractBaseUser, BaseUserManager, PermissionsMixin
 
 # Create your models here.
@@ -15,6 +16,13 @@ def recipe_image_file_path(instance, filename):
     return os.path.join('uploads/recipe/', filename)
 
 
+def recipe_upload_file_path(instance, filename):
+    """Return the file path for a raw upload waiting to be processed"""
+    ext = filename.split('.')[-1]
+    filename = f'{uuid.uuid4()}.{ext}'
+    return os.path.join('uploads/recipe/raw/', filename)
+
+
 class UserManager(BaseUserManager):
 
     def create_user(self, email, password=None, **extra_fields):
@@ -60,6 +68,13 @@ class Tag(models.Model):
         on_delete=models.CASCADE
     )
 
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['user', '-name', 'id'], name='core_tag_user_name_idx'
+            ),
+        ]
+
     def __str__(self):
         return self.name
 
@@ -73,6 +88,14 @@ class Ingredient(models.Model):
         on_delete=models.CASCADE
     )
 
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['user', '-name', 'id'],
+                name='core_ingredient_user_name_idx',
+            ),
+        ]
+
     def __str__(self):
         return self.name
 
@@ -80,6 +103,19 @@ class Ingredient(models.Model):
 class Recipe(models.Model):
     """Recipe model of our API"""
 
+    IMAGE_NONE = 'none'
+    IMAGE_PENDING = 'pending'
+    IMAGE_PROCESSING = 'processing'
+    IMAGE_READY = 'ready'
+    IMAGE_FAILED = 'failed'
+    IMAGE_STATUS_CHOICES = (
+        (IMAGE_NONE, 'No image'),
+        (IMAGE_PENDING, 'Pending'),
+        (IMAGE_PROCESSING, 'Processing'),
+        (IMAGE_READY, 'Ready'),
+        (IMAGE_FAILED, 'Failed'),
+    )
+
     user = models.ForeignKey(
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE
@@ -91,6 +127,81 @@ class Recipe(models.Model):
     ingredients = models.ManyToManyField('Ingredient')
     tags = models.ManyToManyField('Tag')
     image = models.ImageField(null=True, upload_to=recipe_image_file_path)
+    image_upload = models.FileField(
+        null=True, blank=True, upload_to=recipe_upload_file_path
+    )
+    image_status = models.CharField(
+        max_length=16, choices=IMAGE_STATUS_CHOICES, default=IMAGE_NONE
+    )
+    image_digest = models.CharField(max_length=64, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['user', 'id'], name='core_recipe_user_id_idx'
+            ),
+            models.Index(
+                fields=['user', 'time_minutes', 'id'],
+                name='core_recipe_user_time_idx',
+            ),
+            models.Index(
+                fields=['user', 'price', 'id'],
+                name='core_recipe_user_price_idx',
+            ),
+            models.Index(
+                fields=['user', 'title', 'id'],
+                name='core_recipe_user_title_idx',
+            ),
+        ]
 
     def __str__(self):
         return self.title
+
+
+class SearchTerm(models.Model):
+    """Inverted index of recipe words
+
+    Used for search on databases without tsvector.
+    """
+
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE
+    )
+    recipe = models.ForeignKey(
+        'Recipe', on_delete=models.CASCADE, related_name='+'
+    )
+    term = models.CharField(max_length=64)
+    weight = models.PositiveSmallIntegerField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['recipe', 'term'],
+                name='core_searchterm_recipe_term_uniq',
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=['user', 'term', 'recipe'],
+                name='core_searchterm_user_term_idx',
+            ),
+        ]
+
+    def __str__(self):
+        return self.term
+
+
+class RevokedToken(models.Model):
+    """Signed auth token revoked before it expired, see user.tokens"""
+
+    jti = models.BigIntegerField(unique=True)
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE
+    )
+    revoked_at = models.DateTimeField(default=timezone.now, db_index=True)
+    expires_at = models.DateTimeField(db_index=True)
+
+    def __str__(self):
+        return str(self.jti)
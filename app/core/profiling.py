@@ -0,0 +1,246 @@
+import cProfile
+import datetime
+import functools
+import gzip
+import itertools
+import json
+import logging
+import os
+import pstats
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+from django.utils.crypto import constant_time_compare
+
+from core.metrics import QueryRecorder
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    # Nothing is profiled when this is off
+    'ENABLED': False,
+    # Requests sending HEADER with this value are profiled, empty to never
+    # profile on demand
+    'SECRET': '',
+    'HEADER': 'X-Profile',
+    # Profile one request out of this many in every process, 0 for none
+    'SAMPLE_EVERY': 0,
+    # Directory of the stored profiles, the oldest are deleted past
+    # MAX_PROFILES
+    'DIRECTORY': '/vol/web/profiles',
+    'MAX_PROFILES': 50,
+    # Statements kept in the SQL timeline of a profile
+    'MAX_QUERIES': 500,
+}
+
+SUFFIX = '.json.gz'
+
+_requests = itertools.count(1)
+
+
+def get_setting(name):
+    """Return a PROFILING setting falling back to our defaults"""
+    return getattr(settings, 'PROFILING', {}).get(name, DEFAULTS[name])
+
+
+def should_profile(request):
+    """Return why the request is profiled, 'header' or 'sample', or None"""
+    if not get_setting('ENABLED'):
+        return None
+    secret = get_setting('SECRET')
+    if secret:
+        header = 'HTTP_' + get_setting('HEADER').upper().replace('-', '_')
+        value = request.META.get(header)
+        if value is not None and constant_time_compare(value, secret):
+            return 'header'
+    every = get_setting('SAMPLE_EVERY')
+    if every and next(_requests) % every == 0:
+        return 'sample'
+    return None
+
+
+def encode_stats(stats):
+    """Turn the `stats` of a profiler into JSON friendly rows"""
+    return [
+        [*func, cc, nc, tt, ct, [
+            [*caller, *timings] for caller, timings in callers.items()
+        ]]
+        for func, (cc, nc, tt, ct, callers) in stats.items()
+    ]
+
+
+def decode_stats(rows):
+    """Inverse of `encode_stats`"""
+    return {
+        tuple(row[:3]): (*row[3:7], {
+            tuple(caller[:3]): tuple(caller[3:]) for caller in row[7]
+        })
+        for row in rows
+    }
+
+
+class _LoadedProfile:
+    # What pstats.Stats expects from a profiler
+    def __init__(self, stats):
+        self.stats = stats
+
+    def create_stats(self):
+        pass
+
+
+def to_pstats(record, stream=None):
+    """Return the call statistics of a stored profile as `pstats.Stats`"""
+    profile = _LoadedProfile(decode_stats(record['stats']))
+    return pstats.Stats(profile, stream=stream)
+
+
+class ProfileStore:
+    """Ring buffer of gzipped JSON profiles in a directory
+
+    Profile ids sort by creation time, saving one deletes the oldest past
+    `max_profiles`. Several processes can share the directory.
+    """
+
+    def __init__(self, directory, max_profiles):
+        self.directory = directory
+        self.max_profiles = max_profiles
+
+    def ids(self):
+        """Return the ids of the stored profiles, oldest first"""
+        try:
+            names = os.listdir(self.directory)
+        except FileNotFoundError:
+            return []
+        return sorted(
+            name[:-len(SUFFIX)] for name in names if name.endswith(SUFFIX)
+        )
+
+    def path(self, profile_id):
+        return os.path.join(self.directory, profile_id + SUFFIX)
+
+    def resolve(self, ref):
+        """Return the id matching `ref`
+
+        `ref` is an id, a unique prefix of one or 'latest'.
+        """
+        ids = self.ids()
+        if ref == 'latest' and ids:
+            return ids[-1]
+        matches = [
+            profile_id for profile_id in ids if profile_id.startswith(ref)
+        ]
+        if ref in matches:
+            return ref
+        if len(matches) != 1:
+            raise KeyError(ref)
+        return matches[0]
+
+    def load(self, ref):
+        path = self.path(self.resolve(ref))
+        with gzip.open(path, 'rt', encoding='utf-8') as f:
+            return json.load(f)
+
+    def save(self, record):
+        """Store a profile under a new id and return it"""
+        now = datetime.datetime.utcnow()
+        profile_id = f'{now:%Y%m%dT%H%M%S%f}-{os.getpid()}'
+        record = {
+            'id': profile_id, 'created_at': now.isoformat() + 'Z', **record
+        }
+        os.makedirs(self.directory, exist_ok=True)
+        tmp = os.path.join(self.directory, f'.{profile_id}.tmp')
+        try:
+            with gzip.open(tmp, 'wt', encoding='utf-8') as f:
+                json.dump(record, f)
+            os.replace(tmp, self.path(profile_id))
+        finally:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+        self.prune()
+        return profile_id
+
+    def prune(self):
+        ids = self.ids()
+        for profile_id in ids[:max(0, len(ids) - self.max_profiles)]:
+            try:
+                os.remove(self.path(profile_id))
+            except FileNotFoundError:
+                # Pruned by another process
+                pass
+
+    def clear(self):
+        for profile_id in self.ids():
+            os.remove(self.path(profile_id))
+
+
+def get_store():
+    return ProfileStore(get_setting('DIRECTORY'), get_setting('MAX_PROFILES'))
+
+
+def profile_request(request, trigger, view, get_response):
+    """Run `get_response` under cProfile, recording its SQL, and store it"""
+    recorder = QueryRecorder(get_setting('MAX_QUERIES'))
+    profiler = cProfile.Profile()
+    with ExitStack() as stack:
+        for conn in connections.all():
+            stack.enter_context(conn.execute_wrapper(recorder))
+        try:
+            profiler.enable()
+        except ValueError:
+            # Another profiler is running in this thread
+            return get_response()
+        # The SQL timeline starts with the profile
+        start = recorder.origin = time.perf_counter()
+        try:
+            response = get_response()
+            # Include the rendering, later rendering leaves the content as is
+            render = getattr(response, 'render', None)
+            if callable(render) and not response.is_rendered:
+                response.render()
+        finally:
+            profiler.disable()
+        duration = time.perf_counter() - start
+
+    profiler.create_stats()
+    record = {
+        'view': view,
+        'method': request.method,
+        'path': request.get_full_path(),
+        'status': response.status_code,
+        'trigger': trigger,
+        'duration': duration,
+        'query_count': recorder.count,
+        'query_time': recorder.duration,
+        'queries': [list(statement) for statement in recorder.statements],
+        'stats': encode_stats(profiler.stats),
+    }
+    try:
+        response['X-Profile-Id'] = get_store().save(record)
+    except OSError:
+        logger.exception(
+            'Could not store the profile of %s %s',
+            request.method, request.path,
+        )
+    return response
+
+
+class ProfiledViewMixin:
+    """Profile the requests picked by `PROFILING`, see `should_profile`
+
+    The call statistics, the SQL timeline and the rendering of the response
+    are stored in a bounded directory, the id of the profile is returned in
+    the `X-Profile-Id` header. See the `profiles` command to read them.
+    """
+
+    def dispatch(self, request, *args, **kwargs):
+        trigger = should_profile(request)
+        if trigger is None:
+            return super().dispatch(request, *args, **kwargs)
+        match = getattr(request, 'resolver_match', None)
+        view = match.view_name if match is not None else type(self).__name__
+        dispatch = functools.partial(
+            super().dispatch, request, *args, **kwargs
+        )
+        return profile_request(request, trigger, view, dispatch)
@@ -0,0 +1,49 @@
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils import encoders
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+_encoder = encoders.JSONEncoder()
+
+
+def _default(obj):
+    """Encode what orjson does not know the way DRF's encoder does"""
+    return _encoder.default(obj)
+
+
+def dumps(data):
+    """Encode data to the same compact JSON bytes as JSONRenderer"""
+    return FastJSONRenderer().render(data)
+
+
+class FastJSONRenderer(JSONRenderer):
+    """JSONRenderer encoding with orjson when it is installed
+
+    The output is the one of JSONRenderer: datetimes, decimals and lazy
+    strings still go through DRF's encoder and the line separators stay
+    escaped. Indented output, ASCII only output and anything orjson refuses,
+    such as integers beyond 64 bits, fall back to the stdlib encoder.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        indent = self.get_indent(accepted_media_type, renderer_context or {})
+        if (
+            orjson is None or data is None or self.ensure_ascii
+            or not self.compact or indent is not None
+        ):
+            return super().render(data, accepted_media_type, renderer_context)
+        try:
+            ret = orjson.dumps(
+                data,
+                default=_default,
+                option=(
+                    orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+                ),
+            )
+        except orjson.JSONEncodeError:
+            return super().render(data, accepted_media_type, renderer_context)
+        ret = ret.replace(b'\xe2\x80\xa8', b'\\u2028')
+        return ret.replace(b'\xe2\x80\xa9', b'\\u2029')
@@ -0,0 +1,127 @@
+import contextvars
+import random
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+from rest_framework.permissions import SAFE_METHODS
+
+from core.caches import get_shared_cache
+
+DEFAULTS = {
+    # Aliases from settings.DATABASES serving reads, empty to disable routing
+    'REPLICAS': (),
+    # Seconds a user's reads stay on the primary after they wrote
+    'STICKY_SECONDS': 5,
+    # Alias from settings.CACHES remembering recent writers, it must be
+    # shared between processes for stickiness to hold across workers
+    'CACHE': 'shared',
+}
+
+_read_database = contextvars.ContextVar('read_database', default=None)
+
+
+def get_setting(name):
+    """Return a REPLICA_ROUTING setting falling back to our defaults"""
+    return getattr(settings, 'REPLICA_ROUTING', {}).get(name, DEFAULTS[name])
+
+
+def _sticky_key(user_id):
+    return f'replica-sticky:{user_id}'
+
+
+def get_cache():
+    return get_shared_cache(get_setting('CACHE'), 'REPLICA_ROUTING')
+
+
+def mark_written(user_id):
+    """Keep a user's reads on the primary until replicas caught up"""
+    if not get_setting('REPLICAS'):
+        return
+    get_cache().set(_sticky_key(user_id), True, get_setting('STICKY_SECONDS'))
+
+
+def is_sticky(user_id):
+    return bool(get_cache().get(_sticky_key(user_id)))
+
+
+def choose_read_database(request):
+    """Return the alias the reads of a request may use, None for the primary"""
+    replicas = get_setting('REPLICAS')
+    if not replicas or request.method not in SAFE_METHODS:
+        return None
+    user = getattr(request, 'user', None)
+    if user is not None and user.is_authenticated and is_sticky(user.pk):
+        return None
+    return random.choice(replicas)
+
+
+@contextmanager
+def read_from(alias):
+    """Route the reads made within the block to `alias`
+
+    None routes them to the primary.
+    """
+    token = _read_database.set(alias)
+    try:
+        yield
+    finally:
+        _read_database.reset(token)
+
+
+class ReplicaRouter:
+    """Send reads to the replica chosen for the current request
+
+    Writes go to the primary, and so does every query made outside of a
+    `ReplicaReadMixin` view.
+    """
+
+    def db_for_read(self, model, **hints):
+        if model._meta.app_label == 'django_cache':
+            # The database cache holds the state replicas may lag behind on
+            return DEFAULT_DB_ALIAS
+        return _read_database.get()
+
+    def db_for_write(self, model, **hints):
+        instance = hints.get('instance')
+        replicas = get_setting('REPLICAS')
+        if instance is not None and instance._state.db in replicas:
+            # Saving an instance read from a replica writes to the primary
+            return DEFAULT_DB_ALIAS
+        return None
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {DEFAULT_DB_ALIAS, *get_setting('REPLICAS')}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db in get_setting('REPLICAS'):
+            return False
+        return None
+
+
+class ReplicaReadMixin:
+    """Serve the reads of safe requests from a replica
+
+    The replica is chosen once authentication ran, so a user who wrote in
+    the last STICKY_SECONDS keeps reading from the primary. Every unsafe
+    request made by an authenticated user starts such a window.
+    """
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        self._read_database_token = _read_database.set(
+            choose_read_database(request)
+        )
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        token = getattr(self, '_read_database_token', None)
+        if token is not None:
+            _read_database.reset(token)
+            self._read_database_token = None
+        user = request.user
+        if request.method not in SAFE_METHODS and user.is_authenticated:
+            mark_written(user.pk)
+        return super().finalize_response(request, response, *args, **kwargs)
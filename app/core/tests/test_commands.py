@@ -1,8 +1,16 @@
+import json
+import os
+import tempfile
+from io import StringIO
 from unittest.mock import patch
 
+from django.contrib.auth import get_user_model
 from django.core.management import call_command
+from django.core.management.base import SystemCheckError
 from django.db.utils import OperationalError
-from django.test import TestCase
+from django.test import TestCase, override_settings
+
+from core.models import Recipe
 
 class CommandTests(TestCase):
 
@@ -21,3 +29,89 @@ class CommandTests(TestCase):
             gi.side_effect = [OperationalError]*5 + [True]
             call_command('wait_for_db')
             self.assertEqual(gi.call_count,6)
+
+    @override_settings(RECIPE_RESPONSE_CACHE={'CACHE': 'default'})
+    def test_check_refuses_process_local_cache(self):
+        """Test that shared state cannot be kept in a per-process cache"""
+        with self.assertRaisesMessage(SystemCheckError, 'core.E001'):
+            call_command('check')
+
+    def test_check_warns_of_database_response_cache(self):
+        """Test that a response cache costing queries is pointed out"""
+        out = StringIO()
+        call_command('check', stdout=out, stderr=out)
+
+        self.assertIn('core.W001', out.getvalue())
+
+    @override_settings(THROTTLING={'STORE': 'cache'})
+    def test_check_refuses_non_atomic_cache(self):
+        """Test that shared counters need a cache with atomic increments"""
+        with self.assertRaisesMessage(SystemCheckError, 'core.E002'):
+            call_command('check')
+
+    def test_explain_hot_paths(self):
+        """Test that the index benchmark prints both plans and cleans up"""
+        out = StringIO()
+        call_command(
+            'explain_hot_paths', recipes=40, tags=10, ingredients=10,
+            stdout=out,
+        )
+
+        output = out.getvalue()
+        self.assertIn('== recipes by tags ==', output)
+        self.assertIn('-- before --', output)
+        self.assertIn('-- after --', output)
+        self.assertFalse(get_user_model().objects.exists())
+
+    def test_benchmark(self):
+        """Test that the benchmark suites run and report every case"""
+        out = StringIO()
+        call_command('benchmark', 'auth', iterations=2, stdout=out)
+
+        self.assertIn('CachedTokenAuthentication (hit)', out.getvalue())
+
+    @patch('core.caches.has_atomic_incr', return_value=True)
+    def test_benchmark_throttling(self, has_atomic_incr):
+        """Test that the throttling suite measures both stores"""
+        out = StringIO()
+        call_command('benchmark', 'throttling', iterations=5, stdout=out)
+
+        self.assertIn('SlidingWindowThrottle (local)', out.getvalue())
+        self.assertIn('SlidingWindowThrottle (cache)', out.getvalue())
+
+    def test_benchmark_metrics(self):
+        """Test that the metrics suite measures the middleware"""
+        out = StringIO()
+        call_command('benchmark', 'metrics', iterations=5, stdout=out)
+
+        self.assertIn('MetricsMiddleware', out.getvalue())
+
+    def test_benchmark_login(self):
+        """Test that the login suite measures the hashers and the throttle"""
+        out = StringIO()
+        call_command('benchmark', 'login', iterations=2, stdout=out)
+
+        self.assertIn('argon2 verify', out.getvalue())
+        self.assertIn('throttled login', out.getvalue())
+
+    def test_export_recipes(self):
+        """Test that every active user gets an export file"""
+        user = get_user_model().objects.create_user(
+            'vedant@gmail.com', 'basscoder2808'
+        )
+        Recipe.objects.create(
+            user=user, title='Dal', time_minutes=30, price='2.00'
+        )
+        get_user_model().objects.create_user(
+            'inactive@gmail.com', 'basscoder2808', is_active=False
+        )
+
+        with tempfile.TemporaryDirectory() as tmp:
+            call_command(
+                'export_recipes', output_dir=tmp, chunk_size=1,
+                stdout=StringIO(),
+            )
+
+            self.assertEqual(os.listdir(tmp), [f'{user.pk}.ndjson'])
+            with open(os.path.join(tmp, f'{user.pk}.ndjson')) as f:
+                self.assertEqual(json.loads(f.read())['title'], 'Dal')
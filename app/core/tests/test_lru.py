@@ -0,0 +1,26 @@
+from django.test import SimpleTestCase
+
+from core.lru import LocalLRUCache
+
+
+class LocalLRUCacheTests(SimpleTestCase):
+    """Test the bounded in-process cache"""
+
+    def test_evicts_least_recently_used(self):
+        """The oldest untouched entry is dropped once the cache is full"""
+        cache = LocalLRUCache(max_entries=2, timeout=60)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        cache.get('a')
+        cache.set('c', 3)
+
+        self.assertEqual(cache.get('a'), 1)
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.get('c'), 3)
+
+    def test_entries_expire(self):
+        """Entries are not returned after their timeout"""
+        cache = LocalLRUCache(max_entries=2, timeout=-1)
+        cache.set('a', 1)
+
+        self.assertIsNone(cache.get('a'))
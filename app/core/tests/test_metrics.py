@@ -0,0 +1,136 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core import metrics
+from core.models import Tag
+
+RECIPES_URL = reverse('recipe:recipe-list')
+RECIPES_SERIES = ('recipe:recipe-list', 'GET', 200)
+METRICS_URL = reverse('metrics')
+
+
+@override_settings(METRICS={'ENABLED': True})
+class MetricsMiddlewareTests(TestCase):
+    """Test the request metrics and their endpoint"""
+
+    def setUp(self):
+        metrics.registry.clear()
+        self.user = get_user_model().objects.create_user(
+            'vedant@gmail.com', 'basscoder2808'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def tearDown(self):
+        metrics.registry.clear()
+
+    def test_request_is_recorded(self):
+        """Test that latency, queries, size and render time are recorded"""
+        res = self.client.get(RECIPES_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        series = metrics.registry.snapshot()[RECIPES_SERIES]
+        self.assertEqual(series['count'], 1)
+        self.assertGreater(series['queries'], 0)
+        self.assertEqual(series['bytes'], len(res.content))
+        self.assertIn('render', series['phases'])
+
+    def test_streaming_request_is_recorded(self):
+        """Test that a streamed list is recorded with its streaming queries"""
+        Tag.objects.create(user=self.user, name='Vegan')
+
+        res = self.client.get(RECIPES_URL, {'stream': 'true'})
+
+        self.assertTrue(res.streaming)
+        self.assertEqual(metrics.registry.snapshot(), {})
+        content = b''.join(res.streaming_content)
+        series = metrics.registry.snapshot()[RECIPES_SERIES]
+        self.assertEqual(series['count'], 1)
+        self.assertGreater(series['queries'], 0)
+        self.assertEqual(series['bytes'], len(content))
+
+    def test_unknown_method_grouped(self):
+        """Test that arbitrary methods share one series"""
+        for method in ('PROPFIND', 'BREW'):
+            self.client.generic(method, RECIPES_URL)
+
+        snapshot = metrics.registry.snapshot()
+        other = snapshot[('recipe:recipe-list', 'other', 405)]
+        self.assertEqual(other['count'], 2)
+        self.assertEqual([key for key in snapshot if key[1] != 'other'], [])
+
+    def test_exposition(self):
+        """Test that /metrics lists the series in the Prometheus format"""
+        self.client.get(RECIPES_URL)
+
+        res = self.client.get(METRICS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertTrue(
+            res['Content-Type'].startswith('text/plain; version=0.0.4')
+        )
+        body = res.content.decode()
+        labels = 'view="recipe:recipe-list",method="GET",status="200"'
+        latency = 'http_request_duration_seconds'
+        self.assertIn(f'{latency}_count{{{labels}}} 1', body)
+        self.assertIn(f'{latency}_bucket{{{labels},le="+Inf"}} 1', body)
+        self.assertIn(f'db_queries_total{{{labels}}}', body)
+        self.assertIn(
+            f'http_request_phase_seconds_total{{{labels},phase="render"}}',
+            body,
+        )
+
+    def test_serialize_phase(self):
+        """Test that the fast path rendering is timed on its own"""
+        Tag.objects.create(user=self.user, name='Vegan')
+
+        self.client.get(reverse('recipe:tag-list'))
+
+        series = metrics.registry.snapshot()[('recipe:tag-list', 'GET', 200)]
+        self.assertIn('serialize', series['phases'])
+
+    def test_serializer_data_phase(self):
+        """Test that the DRF serializers are timed too"""
+        self.client.get(reverse('user:me'))
+
+        series = metrics.registry.snapshot()[('user:me', 'GET', 200)]
+        self.assertIn('serialize', series['phases'])
+
+    @override_settings(METRICS={'ENABLED': True, 'ALLOWED_IPS': ['10.0.0.1']})
+    def test_exposition_allowed_ips(self):
+        """Test that /metrics is hidden from other addresses"""
+        res = self.client.get(METRICS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_exposition_loopback_only_by_default(self):
+        """Test that /metrics is only served to this host unless configured"""
+        res = self.client.get(METRICS_URL, REMOTE_ADDR='10.0.0.1')
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    @override_settings(METRICS={'ENABLED': True, 'SLOW_REQUEST_SECONDS': 0})
+    def test_slow_request_logs_sql(self):
+        """Test that a slow request logs its SQL"""
+        with self.assertLogs('core.metrics', 'WARNING') as logs:
+            self.client.get(RECIPES_URL)
+
+        self.assertIn('Slow request GET', logs.output[0])
+        self.assertIn('SELECT', logs.output[0])
+
+
+class MetricsDisabledTests(TestCase):
+    """Test that nothing is measured by default"""
+
+    def test_disabled(self):
+        """Test that the endpoint is hidden and requests are not recorded"""
+        metrics.registry.clear()
+
+        res = self.client.get(METRICS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(metrics.registry.snapshot(), {})
@@ -0,0 +1,147 @@
+import sqlite3
+import threading
+
+from django.test import SimpleTestCase
+
+from core.backends.pool import ConnectionPool, PoolTimeout
+
+
+class FakeClock:
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def sqlite_connect():
+    return sqlite3.connect(':memory:', check_same_thread=False)
+
+
+def sqlite_check(connection):
+    connection.execute('SELECT 1')
+    return True
+
+
+class ConnectionPoolTests(SimpleTestCase):
+
+    def test_connection_reused(self):
+        """Test that a released connection is handed out again"""
+        pool = ConnectionPool(sqlite_connect, max_size=2)
+        conn = pool.acquire()
+        pool.release(conn)
+
+        self.assertIs(pool.acquire(), conn)
+        self.assertEqual(pool.stats()['created'], 1)
+
+    def test_checkout_timeout(self):
+        """Test that checkouts beyond the pool size time out"""
+        pool = ConnectionPool(sqlite_connect, max_size=1, timeout=0.01)
+        pool.acquire()
+
+        with self.assertRaises(PoolTimeout):
+            pool.acquire()
+        self.assertEqual(pool.stats()['timeouts'], 1)
+
+    def test_waiting_checkout_gets_released_connection(self):
+        """Test that a waiting checkout gets a connection released meanwhile"""
+        pool = ConnectionPool(sqlite_connect, max_size=1, timeout=5)
+        conn = pool.acquire()
+        acquired = []
+        waiter = threading.Thread(
+            target=lambda: acquired.append(pool.acquire())
+        )
+        waiter.start()
+        while not pool._cond._waiters:
+            pass
+        pool.release(conn)
+        waiter.join()
+
+        self.assertEqual(acquired, [conn])
+        stats = pool.stats()
+        self.assertEqual(stats['waits'], 1)
+        self.assertGreater(stats['wait_time_max'], 0)
+        self.assertEqual(stats['saturation'], 1.0)
+
+    def test_recycled_by_age(self):
+        """Test that connections older than max_age are closed, not reused"""
+        clock = FakeClock()
+        pool = ConnectionPool(
+            sqlite_connect, max_size=1, max_age=60, clock=clock
+        )
+        conn = pool.acquire()
+        pool.release(conn)
+        clock.now = 61
+
+        self.assertIsNot(pool.acquire(), conn)
+        self.assertEqual(pool.stats()['discarded'], 1)
+        with self.assertRaises(sqlite3.ProgrammingError):
+            conn.execute('SELECT 1')
+
+    def test_dead_connection_replaced(self):
+        """Test that idle connections failing the health check are replaced"""
+        clock = FakeClock()
+        pool = ConnectionPool(
+            sqlite_connect, check=sqlite_check, max_size=1, check_interval=30,
+            clock=clock,
+        )
+        conn = pool.acquire()
+        pool.release(conn)
+        conn.close()
+
+        clock.now = 10
+        self.assertIs(pool.acquire(), conn)
+        pool.release(conn)
+        clock.now = 50
+        fresh = pool.acquire()
+
+        self.assertIsNot(fresh, conn)
+        sqlite_check(fresh)
+
+    def test_check_and_close_run_unlocked(self):
+        """Test that other threads use the pool while one is being checked"""
+        clock = FakeClock()
+        served = []
+
+        def serve_meanwhile(conn):
+            other = threading.Thread(
+                target=lambda: served.append(pool.release(pool.acquire()))
+            )
+            other.start()
+            other.join(5)
+            return False
+
+        pool = ConnectionPool(
+            sqlite_connect, check=serve_meanwhile, close=serve_meanwhile,
+            max_size=2, timeout=5, check_interval=30, clock=clock,
+        )
+        conn = pool.acquire()
+        pool.release(conn)
+        clock.now = 50
+
+        self.assertIsNot(pool.acquire(), conn)
+        self.assertEqual(len(served), 2)
+        self.assertEqual(pool.stats()['discarded'], 1)
+
+    def test_failed_reset_discards(self):
+        """Test that a connection the reset hook rejects is not reused"""
+        pool = ConnectionPool(
+            sqlite_connect, reset=lambda conn: False, max_size=1
+        )
+        conn = pool.acquire()
+        pool.release(conn)
+
+        self.assertEqual(pool.stats()['size'], 0)
+        self.assertIsNot(pool.acquire(), conn)
+
+    def test_failed_connect_frees_slot(self):
+        """Test that a failing connect does not leak a pool slot"""
+        def connect():
+            raise sqlite3.OperationalError('down')
+
+        pool = ConnectionPool(connect, max_size=1, timeout=0.01)
+        for _ in range(2):
+            with self.assertRaises(sqlite3.OperationalError):
+                pool.acquire()
+        self.assertEqual(pool.stats()['size'], 0)
@@ -0,0 +1,154 @@
+import os
+import tempfile
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core import profiling
+from core.models import Recipe
+
+RECIPES_URL = reverse('recipe:recipe-list')
+ME_URL = reverse('user:me')
+
+
+class ProfilingTests(TestCase):
+    """Test the request profiles and the profiles command"""
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+        self.enable(SECRET='letmein')
+
+        self.user = get_user_model().objects.create_user(
+            'vedant@gmail.com', 'basscoder2808'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def enable(self, **options):
+        settings = override_settings(PROFILING={
+            'ENABLED': True, 'DIRECTORY': self.directory, 'MAX_PROFILES': 3,
+            **options,
+        })
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+    def profile(self, url=RECIPES_URL):
+        res = self.client.get(url, HTTP_X_PROFILE='letmein')
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return res['X-Profile-Id']
+
+    def test_profile_on_header(self):
+        """Test that the header stores the call statistics and SQL"""
+        Recipe.objects.create(
+            user=self.user, title='Chole', time_minutes=30, price=5
+        )
+
+        profile_id = self.profile()
+
+        record = profiling.get_store().load(profile_id)
+        self.assertEqual(record['view'], 'recipe:recipe-list')
+        self.assertEqual(record['trigger'], 'header')
+        self.assertGreater(record['query_count'], 0)
+        self.assertEqual(len(record['queries']), record['query_count'])
+        functions = {row[2] for row in record['stats']}
+        self.assertIn('dispatch', functions)
+        stats = profiling.to_pstats(record, stream=StringIO())
+        self.assertGreater(stats.total_tt, 0)
+
+    def test_user_views_are_profiled(self):
+        """Test that the user views are profiled too"""
+        profile_id = self.profile(ME_URL)
+
+        record = profiling.get_store().load(profile_id)
+        self.assertEqual(record['view'], 'user:me')
+
+    def test_not_profiled(self):
+        """Test that requests without the right header are not profiled"""
+        res = self.client.get(RECIPES_URL)
+        self.assertNotIn('X-Profile-Id', res)
+
+        res = self.client.get(RECIPES_URL, HTTP_X_PROFILE='guess')
+        self.assertNotIn('X-Profile-Id', res)
+        self.assertEqual(profiling.get_store().ids(), [])
+
+    def test_disabled(self):
+        """Test that nothing is profiled when profiling is off"""
+        self.enable(ENABLED=False, SECRET='letmein')
+
+        res = self.client.get(RECIPES_URL, HTTP_X_PROFILE='letmein')
+
+        self.assertNotIn('X-Profile-Id', res)
+
+    def test_sampling(self):
+        """Test that one request out of SAMPLE_EVERY is profiled"""
+        self.enable(SECRET='', SAMPLE_EVERY=2)
+
+        profiled = [
+            'X-Profile-Id' in self.client.get(RECIPES_URL) for _ in range(4)
+        ]
+
+        self.assertEqual(profiled.count(True), 2)
+
+    def test_ring_buffer(self):
+        """Test that only the newest MAX_PROFILES are kept"""
+        ids = [self.profile() for _ in range(5)]
+
+        self.assertEqual(profiling.get_store().ids(), ids[2:])
+        self.assertEqual(len(os.listdir(self.directory)), 3)
+
+    def test_dump_command(self):
+        """Test that a profile is dumped with its statistics and SQL"""
+        profile_id = self.profile()
+        output = os.path.join(self.directory, 'out.prof')
+        out = StringIO()
+
+        call_command(
+            'profiles', 'dump', 'latest', '--limit', '5', '--output', output,
+            stdout=out,
+        )
+
+        self.assertIn(profile_id, out.getvalue())
+        self.assertIn('function calls', out.getvalue())
+        self.assertIn('SQL timeline:', out.getvalue())
+        self.assertIn('SELECT', out.getvalue())
+        self.assertTrue(os.path.exists(output))
+
+    def test_diff_command(self):
+        """Test that a diff shows the functions and the SQL that changed"""
+        before = self.profile()
+        for i in range(3):
+            Recipe.objects.create(
+                user=self.user, title=f'Recipe {i}', time_minutes=5, price=1
+            )
+        after = self.profile()
+        out = StringIO()
+
+        call_command(
+            'profiles', 'diff', before, after, '--limit', '5', stdout=out
+        )
+
+        self.assertIn(f'- {before}', out.getvalue())
+        self.assertIn(f'+ {after}', out.getvalue())
+        self.assertIn('delta ms', out.getvalue())
+
+    def test_list_and_clear_commands(self):
+        """Test that the profiles are listed and deleted"""
+        profile_id = self.profile()
+        out = StringIO()
+
+        call_command('profiles', 'list', stdout=out)
+        call_command('profiles', 'clear', stdout=out)
+
+        self.assertIn(profile_id, out.getvalue())
+        self.assertIn('Deleted 1 profiles', out.getvalue())
+        with self.assertRaises(CommandError):
+            call_command('profiles', 'dump', profile_id, stdout=out)
@@ -0,0 +1,100 @@
+import datetime
+import io
+import uuid
+from collections import OrderedDict
+from decimal import Decimal
+from unittest import mock, skipUnless
+
+from django.test import SimpleTestCase
+from django.utils.translation import gettext_lazy as _
+
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+from core import parsers, renderers
+from core.parsers import FastJSONParser
+from core.renderers import FastJSONRenderer
+
+DATA = [
+    OrderedDict([
+        ('id', 1), ('title', 'Crème brûlée "quoted" '),
+        ('price', Decimal('5.50')),
+    ]),
+    {
+        'when': datetime.datetime(
+            2021, 3, 4, 5, 6, 7, 123456, tzinfo=datetime.timezone.utc
+        ),
+        'day': datetime.date(2021, 3, 4),
+        'uuid': uuid.UUID(int=1),
+        'lazy': _('Not found.'),
+        1: [True, None, 2.5, '\u2028'],
+    },
+]
+
+
+class FastJSONRendererTests(SimpleTestCase):
+    """Test that the fast renderer produces the bytes of DRF's renderer"""
+
+    def test_same_output(self):
+        self.assertEqual(
+            FastJSONRenderer().render(DATA), JSONRenderer().render(DATA)
+        )
+
+    @skipUnless(renderers.orjson, 'orjson is not installed')
+    def test_encoded_by_orjson(self):
+        with mock.patch.object(
+            JSONRenderer, 'render', side_effect=AssertionError
+        ):
+            FastJSONRenderer().render(DATA)
+
+    def test_out_of_range_integer(self):
+        data = {'big': 2 ** 70}
+        self.assertEqual(
+            FastJSONRenderer().render(data), JSONRenderer().render(data)
+        )
+
+    def test_same_output_indented(self):
+        context = {'indent': 2}
+        self.assertEqual(
+            FastJSONRenderer().render(DATA, 'application/json', context),
+            JSONRenderer().render(DATA, 'application/json', context),
+        )
+
+    def test_empty(self):
+        self.assertEqual(FastJSONRenderer().render(None), b'')
+
+    def test_without_orjson(self):
+        with mock.patch.object(renderers, 'orjson', None):
+            self.assertEqual(
+                renderers.dumps(DATA), JSONRenderer().render(DATA)
+            )
+
+
+class FastJSONParserTests(SimpleTestCase):
+    """Test that the fast parser accepts and rejects what DRF's parser does"""
+
+    def parse(self, parser, body):
+        return parser.parse(
+            io.BytesIO(body), 'application/json', {'encoding': 'utf-8'}
+        )
+
+    def test_round_trip(self):
+        body = (
+            '{"title": "Crème brûlée", "tags": [1, 2], "price": "5.50", '
+            '"ratio": 0.5}'
+        ).encode()
+        self.assertEqual(
+            self.parse(FastJSONParser(), body), self.parse(JSONParser(), body)
+        )
+
+    def test_invalid(self):
+        for body in (b'{"title": ', b'{"price": NaN}', b'\xff'):
+            with self.subTest(body=body), self.assertRaises(ParseError):
+                self.parse(FastJSONParser(), body)
+
+    def test_without_orjson(self):
+        with mock.patch.object(parsers, 'orjson', None):
+            self.assertEqual(
+                self.parse(FastJSONParser(), b'[1, "a"]'), [1, 'a']
+            )
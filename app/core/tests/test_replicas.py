@@ -0,0 +1,104 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.core.exceptions import ImproperlyConfigured
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.test import RequestFactory, TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+
+from core.models import Tag
+from core.replicas import (
+    ReplicaRouter, choose_read_database, mark_written, read_from,
+)
+
+# A separate, empty, SQLite database stands in for a lagging replica
+connections.databases.setdefault('replica', {
+    'ENGINE': 'django.db.backends.sqlite3',
+    'NAME': ':memory:',
+})
+
+TAGS_URL = reverse('recipe:tag-list')
+ROUTING = {'REPLICAS': ['replica'], 'STICKY_SECONDS': 60, 'CACHE': 'shared'}
+
+
+@override_settings(REPLICA_ROUTING=ROUTING)
+class ReplicaRouterTests(TestCase):
+    databases = {'default', 'replica'}
+
+    def setUp(self):
+        self.router = ReplicaRouter()
+        self.factory = RequestFactory()
+        self.user = get_user_model().objects.create_user(
+            'test@test.com', 'testpass'
+        )
+
+    def test_reads_follow_request_database(self):
+        """Test that reads go to the chosen replica, writes to the primary"""
+        self.assertIsNone(self.router.db_for_read(Tag))
+        with read_from('replica'):
+            self.assertEqual(self.router.db_for_read(Tag), 'replica')
+        self.assertIsNone(self.router.db_for_read(Tag))
+
+        tag = Tag(user=self.user, name='Vegan')
+        tag._state.db = 'replica'
+        self.assertEqual(
+            self.router.db_for_write(Tag, instance=tag), DEFAULT_DB_ALIAS
+        )
+
+    def test_database_cache_uses_primary(self):
+        """Test that the database cache is never read from a lagging replica"""
+        cache_model = caches['shared'].cache_model_class
+        with read_from('replica'):
+            self.assertEqual(
+                self.router.db_for_read(cache_model), DEFAULT_DB_ALIAS
+            )
+
+    def test_unsafe_methods_use_primary(self):
+        """Test that only safe requests are routed to a replica"""
+        request = self.factory.get('/')
+        request.user = self.user
+        self.assertEqual(choose_read_database(request), 'replica')
+
+        request = self.factory.post('/')
+        request.user = self.user
+        self.assertIsNone(choose_read_database(request))
+
+    def test_recent_writer_uses_primary(self):
+        """Test that a user who just wrote reads from the primary"""
+        request = self.factory.get('/')
+        request.user = self.user
+        mark_written(self.user.pk)
+
+        self.assertIsNone(choose_read_database(request))
+
+    @override_settings(REPLICA_ROUTING={**ROUTING, 'CACHE': 'default'})
+    def test_process_local_cache_refused(self):
+        """Test that recent writers are not remembered in one process only"""
+        with self.assertRaises(ImproperlyConfigured):
+            mark_written(self.user.pk)
+
+    def test_no_migrations_on_replicas(self):
+        """Test that replicas are never migrated"""
+        self.assertFalse(self.router.allow_migrate('replica', 'core'))
+        self.assertIsNone(self.router.allow_migrate(DEFAULT_DB_ALIAS, 'core'))
+
+    @mock.patch.object(
+        transaction, 'on_commit', lambda func, using=None: func()
+    )
+    def test_api_reads_from_replica_until_user_writes(self):
+        """Test that list reads hit the replica, the primary after a write"""
+        client = APIClient()
+        client.force_authenticate(self.user)
+        Tag.objects.create(user=self.user, name='Vegan')
+
+        res = client.get(TAGS_URL)
+        self.assertEqual(res.data['results'], [])
+
+        client.post(TAGS_URL, {'name': 'Dessert'})
+        res = client.get(TAGS_URL)
+        self.assertEqual(
+            [tag['name'] for tag in res.data['results']], ['Vegan', 'Dessert']
+        )
@@ -0,0 +1,89 @@
+import os
+import shutil
+import tempfile
+from unittest.mock import patch
+
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from core.db import check_persistent_connections
+
+
+SAMPLE = 'uploads/recipe/sample.txt'
+RAW_UPLOAD = 'uploads/recipe/raw/upload.jpg'
+RENDITION = 'renditions/ab/abc/128.jpg'
+
+
+class ServeMediaTests(TestCase):
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root)
+        self.settings_override = override_settings(MEDIA_ROOT=self.media_root)
+        self.settings_override.enable()
+        self.addCleanup(self.settings_override.disable)
+        for name in (SAMPLE, RAW_UPLOAD, RENDITION):
+            os.makedirs(
+                os.path.join(self.media_root, os.path.dirname(name)),
+                exist_ok=True,
+            )
+            with open(os.path.join(self.media_root, name), 'w') as f:
+                f.write('content')
+
+    def test_serve_media_file(self):
+        """Test that media files are served with long lived cache headers"""
+        res = self.client.get(reverse('media', args=[SAMPLE]))
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(b''.join(res.streaming_content), b'content')
+        self.assertIn('immutable', res['Cache-Control'])
+        self.assertIn('Last-Modified', res)
+
+    def test_serve_media_not_modified(self):
+        """Test that a conditional request for an unchanged file gets a 304"""
+        res = self.client.get(reverse('media', args=[SAMPLE]))
+        res = self.client.get(
+            reverse('media', args=[SAMPLE]),
+            HTTP_IF_MODIFIED_SINCE=res['Last-Modified'],
+        )
+
+        self.assertEqual(res.status_code, 304)
+
+    def test_serve_media_outside_root(self):
+        """Test that paths escaping the media root or missing files 404"""
+        missing = self.client.get(reverse('media', args=['missing.txt']))
+        escaping = self.client.get('/media/../settings.py')
+
+        self.assertEqual(missing.status_code, 404)
+        self.assertEqual(escaping.status_code, 404)
+
+    def test_serve_media_only_processed_images(self):
+        """Test that renditions are served but raw uploads are not"""
+        rendition = self.client.get(reverse('media', args=[RENDITION]))
+        raw = self.client.get(reverse('media', args=[RAW_UPLOAD]))
+
+        self.assertEqual(rendition.status_code, 200)
+        self.assertEqual(raw.status_code, 404)
+
+    @override_settings(MEDIA_ACCEL_REDIRECT_PREFIX='/protected/')
+    def test_serve_media_accel_redirect(self):
+        """Test that the file is handed to the front end server if set up"""
+        res = self.client.get(reverse('media', args=[SAMPLE]))
+
+        self.assertEqual(res['X-Accel-Redirect'], f'/protected/{SAMPLE}')
+        self.assertEqual(res.content, b'')
+
+
+class PersistentConnectionTests(TestCase):
+
+    @override_settings(DB_HEALTH_CHECK_INTERVAL=0)
+    def test_dead_connection_closed(self):
+        """Test that an unusable idle connection is closed before requests"""
+        connection.ensure_connection()
+        with patch.object(connection, 'in_atomic_block', False), \
+                patch.object(connection, 'is_usable', return_value=False), \
+                patch.object(connection, 'close') as close:
+            check_persistent_connections()
+
+        close.assert_called_once_with()
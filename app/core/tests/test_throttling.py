@@ -0,0 +1,118 @@
+from types import SimpleNamespace
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ImproperlyConfigured
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.settings import api_settings
+from rest_framework.test import APIClient, APIRequestFactory
+
+from core import throttling
+from core.models import Recipe
+
+RATES = {'test_read': '10/min', 'test_write': '2/min'}
+
+
+class ThrottledView:
+    throttle_scope = 'test'
+    action = 'list'
+
+
+class SlidingWindowThrottleTests(TestCase):
+    """Test the sliding window counter"""
+
+    def setUp(self):
+        throttling.get_store().clear()
+        self.request = APIRequestFactory().get('/')
+        self.request.user = SimpleNamespace(is_authenticated=True, pk=1)
+        self.clock = 600.0
+
+    def check(self, request=None):
+        throttle = throttling.SlidingWindowThrottle()
+        throttle.timer = lambda: self.clock
+        with mock.patch.dict(api_settings.DEFAULT_THROTTLE_RATES, RATES):
+            allowed = throttle.allow_request(
+                request or self.request, ThrottledView()
+            )
+        return allowed, throttle
+
+    def test_limit_and_wait(self):
+        for _ in range(10):
+            self.assertTrue(self.check()[0])
+        allowed, throttle = self.check()
+
+        self.assertFalse(allowed)
+        # The 10 requests of this window decay below the limit only once the
+        # next window has fully started
+        self.assertAlmostEqual(throttle.wait(), 60 + 6)
+
+    def test_previous_window_decays(self):
+        for _ in range(10):
+            self.check()
+        self.clock += 60 + 30
+
+        allowed, throttle = self.check()
+        self.assertTrue(allowed)
+        for _ in range(4):
+            self.check()
+        allowed, throttle = self.check()
+
+        # Half of the previous 10 plus the 5 made in this window
+        self.assertFalse(allowed)
+        self.assertAlmostEqual(throttle.wait(), 6)
+
+    def test_separate_write_budget(self):
+        write = APIRequestFactory().post('/')
+        write.user = self.request.user
+        self.assertTrue(self.check(write)[0])
+        self.assertTrue(self.check(write)[0])
+
+        self.assertFalse(self.check(write)[0])
+        self.assertTrue(self.check()[0])
+
+    @override_settings(THROTTLING={'STORE': 'cache'})
+    @mock.patch('core.caches.has_atomic_incr', return_value=True)
+    def test_cache_store(self, has_atomic_incr):
+        for _ in range(10):
+            self.assertTrue(self.check()[0])
+
+        self.assertFalse(self.check()[0])
+
+    @override_settings(THROTTLING={'STORE': 'cache'})
+    def test_non_atomic_cache_refused(self):
+        # The database cache of the tests reads then writes the counts
+        with self.assertRaises(ImproperlyConfigured):
+            self.check()
+
+
+class ThrottledApiTests(TestCase):
+    """Test the throttles of the recipe endpoints"""
+
+    def setUp(self):
+        throttling.get_store().clear()
+        self.user = get_user_model().objects.create_user(
+            'vedant@gmail.com', 'basscoder2808'
+        )
+        self.recipe = Recipe.objects.create(
+            user=self.user, title='Dal', time_minutes=5, price='5.00'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_upload_budget(self):
+        url = reverse('recipe:recipe-upload-image', args=[self.recipe.id])
+        payload = {'image': 'notimage'}
+        rates = {'recipe_upload': '1/hour'}
+        with mock.patch.dict(api_settings.DEFAULT_THROTTLE_RATES, rates):
+            self.client.post(url, payload, format='multipart')
+            res = self.client.post(url, payload, format='multipart')
+            listing = self.client.get(reverse('recipe:recipe-list'))
+
+            self.assertEqual(
+                res.status_code, status.HTTP_429_TOO_MANY_REQUESTS
+            )
+            self.assertGreater(int(res['Retry-After']), 0)
+            self.assertEqual(listing.status_code, status.HTTP_200_OK)
@@ -0,0 +1,191 @@
+import time
+
+from django.conf import settings
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.settings import api_settings
+from rest_framework.throttling import BaseThrottle
+
+from core.caches import get_atomic_cache
+
+DEFAULTS = {
+    # 'local' counts in every process, so a client gets the rate once per
+    # process, 'cache' shares the counts through CACHE
+    'STORE': 'local',
+    # Alias from settings.CACHES, shared and with atomic increments (memcached)
+    'CACHE': 'shared',
+    # Keys the local store holds before it drops the stale ones
+    'LOCAL_MAX_ENTRIES': 100000,
+}
+
+DURATIONS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+
+def get_setting(name):
+    """Return a THROTTLING setting falling back to our defaults"""
+    return getattr(settings, 'THROTTLING', {}).get(name, DEFAULTS[name])
+
+
+def parse_rate(rate):
+    """Turn `'<requests>/<period>'` into `(requests, seconds)`
+
+    Such as `'100/min'` into `(100, 60)`.
+    """
+    num, period = rate.split('/')
+    return int(num), DURATIONS[period[0]]
+
+
+class LocalWindowStore:
+    """Per-process window counters in a plain dict
+
+    There is no lock, a race between two threads can lose an increment which
+    only makes the limit slightly more lenient. Every process counts on its
+    own so a client gets up to the rate times the number of processes.
+    """
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self._windows = {}
+
+    def get(self, key, index):
+        """Return the `(previous, current)` counts of window `index`"""
+        entry = self._windows.get(key)
+        if entry is None:
+            return 0, 0
+        if entry[0] == index:
+            return entry[1], entry[2]
+        if entry[0] == index - 1:
+            return entry[2], 0
+        return 0, 0
+
+    def incr(self, key, index, window):
+        entry = self._windows.get(key)
+        if entry is not None and entry[0] == index:
+            entry[2] += 1
+            return
+        previous, _current = self.get(key, index)
+        if len(self._windows) >= self.max_entries:
+            self._prune(index)
+        self._windows[key] = [index, previous, 1]
+
+    def _prune(self, index):
+        stale = [
+            key for key, entry in list(self._windows.items())
+            if entry[0] < index - 1
+        ]
+        for key in stale:
+            self._windows.pop(key, None)
+        if len(self._windows) >= self.max_entries:
+            self._windows.clear()
+
+    def clear(self):
+        self._windows.clear()
+
+
+class CacheWindowStore:
+    """Window counters shared by every process through a Django cache"""
+
+    def __init__(self, alias):
+        self.alias = alias
+
+    @property
+    def cache(self):
+        return get_atomic_cache(self.alias, 'THROTTLING')
+
+    def get(self, key, index):
+        previous, current = f'{key}:{index - 1}', f'{key}:{index}'
+        counts = self.cache.get_many([previous, current])
+        return counts.get(previous, 0), counts.get(current, 0)
+
+    def incr(self, key, index, window):
+        cache_key = f'{key}:{index}'
+        try:
+            self.cache.incr(cache_key)
+        except ValueError:
+            if not self.cache.add(cache_key, 1, 2 * window):
+                self.cache.incr(cache_key)
+
+
+_local_store = None
+
+
+def get_store():
+    global _local_store
+    if get_setting('STORE') == 'cache':
+        return CacheWindowStore(get_setting('CACHE'))
+    if _local_store is None:
+        _local_store = LocalWindowStore(get_setting('LOCAL_MAX_ENTRIES'))
+    return _local_store
+
+
+class SlidingWindowThrottle(BaseThrottle):
+    """Limit requests per client with a sliding window counter
+
+    The count of the previous fixed window is weighted by how much of it
+    still overlaps the sliding window and added to the count of the current
+    one, which smooths out the bursts fixed windows allow at their edges with
+    two counters per client.
+
+    Views pick the budget with `throttle_scope`: safe requests use the
+    `<scope>_read` rate, the others `<scope>_write`, and actions listed in
+    `throttle_action_scopes` their own `<scope>_<name>` rate. Every view
+    counts on its own, authenticated clients by user and anonymous ones by
+    address.
+    """
+
+    cache_format = 'throttle:%(scope)s:%(view)s:%(ident)s'
+    timer = time.time
+
+    def get_scope(self, request, view):
+        base = getattr(view, 'throttle_scope', None)
+        if base is None:
+            return None
+        action = getattr(view, 'action', None)
+        suffix = getattr(view, 'throttle_action_scopes', {}).get(action)
+        if suffix is None:
+            suffix = 'read' if request.method in SAFE_METHODS else 'write'
+        return f'{base}_{suffix}'
+
+    def get_ident(self, request):
+        user = getattr(request, 'user', None)
+        if user is not None and user.is_authenticated:
+            return f'user-{user.pk}'
+        return super().get_ident(request)
+
+    def allow_request(self, request, view):
+        scope = self.get_scope(request, view)
+        rates = api_settings.DEFAULT_THROTTLE_RATES
+        rate = rates.get(scope) if scope else None
+        if rate is None:
+            return True
+        self.num_requests, self.window = parse_rate(rate)
+
+        self.now = self.timer()
+        self.index = int(self.now // self.window)
+        key = self.cache_format % {
+            'scope': scope, 'view': type(view).__name__,
+            'ident': self.get_ident(request),
+        }
+        store = get_store()
+        self.previous, self.current = store.get(key, self.index)
+        # Let the request through only if it fits within the rate
+        if self.estimate() + 1 > self.num_requests:
+            return False
+        store.incr(key, self.index, self.window)
+        return True
+
+    def estimate(self):
+        elapsed = self.now / self.window - self.index
+        return self.previous * (1 - elapsed) + self.current
+
+    def wait(self):
+        """Seconds until the estimate leaves room for one more request"""
+        window_start = self.index * self.window
+        room = self.num_requests - 1
+        if room < 0:
+            return None
+        if self.current > room:
+            # Once this window ends its count becomes the decaying one
+            ends = window_start + self.window
+            return ends - self.now + self.window * (1 - room / self.current)
+        fraction = 1 - (room - self.current) / self.previous
+        return max(0.0, window_start + self.window * fraction - self.now)
@@ -0,0 +1,90 @@
+import mimetypes
+import posixpath
+from datetime import datetime, timezone
+from pathlib import Path
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, Http404, HttpResponse
+from django.utils._os import safe_join
+from django.views.decorators.http import condition, require_safe
+
+from core import metrics as request_metrics
+
+# Directories of the processed recipe images, renditions live below the other
+IMAGES_DIRECTORY = 'uploads/recipe'
+RENDITIONS_DIRECTORY = 'renditions'
+
+
+def _is_served(path):
+    """Whether a media file is public
+
+    Raw uploads waiting to be processed are not.
+    """
+    directory = posixpath.dirname(path)
+    return (
+        directory == IMAGES_DIRECTORY
+        or directory.startswith(f'{RENDITIONS_DIRECTORY}/')
+    )
+
+
+def _media_path(path):
+    """Return the absolute path of a served media file, refuse anything else"""
+    path = posixpath.normpath(path).lstrip('/')
+    if not _is_served(path):
+        raise Http404('Media file not found')
+    try:
+        fullpath = Path(safe_join(settings.MEDIA_ROOT, path))
+    except (SuspiciousFileOperation, ValueError):
+        raise Http404('Media file not found')
+    if not fullpath.is_file():
+        raise Http404('Media file not found')
+    return path, fullpath
+
+
+def _last_modified(request, path):
+    try:
+        mtime = _media_path(path)[1].stat().st_mtime
+    except Http404:
+        return None
+    return datetime.fromtimestamp(mtime, tz=timezone.utc)
+
+
+@require_safe
+@condition(last_modified_func=_last_modified)
+def serve_media(request, path):
+    """Serve an uploaded file
+
+    Behind nginx the response only carries an X-Accel-Redirect header pointing
+    at MEDIA_ACCEL_REDIRECT_PREFIX and nginx sends the file. Otherwise the
+    file is streamed with FileResponse, which lets the server use sendfile
+    through wsgi.file_wrapper. Only processed images and their renditions
+    are served, their names never change content so they can be cached for
+    good.
+    """
+    path, fullpath = _media_path(path)
+
+    prefix = getattr(settings, 'MEDIA_ACCEL_REDIRECT_PREFIX', None)
+    if prefix:
+        content_type = mimetypes.guess_type(str(fullpath))[0]
+        response = HttpResponse(content_type=content_type)
+        response['X-Accel-Redirect'] = f'{prefix.rstrip("/")}/{path}'
+    else:
+        response = FileResponse(fullpath.open('rb'))
+
+    response['Cache-Control'] = 'public, max-age=31536000, immutable'
+    return response
+
+
+@require_safe
+def metrics(request):
+    """Expose the request metrics of this process in the Prometheus format"""
+    if not request_metrics.get_setting('ENABLED'):
+        raise Http404('Metrics are disabled')
+    allowed = request_metrics.get_setting('ALLOWED_IPS')
+    if allowed is not None and request.META.get('REMOTE_ADDR') not in allowed:
+        raise Http404('Metrics are disabled')
+    return HttpResponse(
+        request_metrics.exposition(),
+        content_type='text/plain; version=0.0.4; charset=utf-8',
+    )
@@ -0,0 +1,207 @@
+import secrets
+import threading
+from bisect import bisect_left, insort
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models.functions import Lower
+
+from core.caches import get_shared_cache
+from core.lru import LocalLRUCache
+
+DEFAULTS = {
+    # Serve matches from per-user sorted arrays kept in every process
+    'LOCAL_INDEX': True,
+    # Alias from settings.CACHES holding the generations the local indexes are
+    # checked against, it must be shared for a write to reach every worker
+    'CACHE': 'shared',
+    # Users whose index a process keeps, the least recently used are dropped
+    'MAX_USERS': 64,
+    # Seconds an index is kept even if the user's data did not change
+    'TIMEOUT': 600,
+    'LIMIT': 10,
+    'MAX_LIMIT': 50,
+}
+
+
+def get_setting(name):
+    """Return a RECIPE_AUTOCOMPLETE setting falling back to our defaults"""
+    options = getattr(settings, 'RECIPE_AUTOCOMPLETE', {})
+    return options.get(name, DEFAULTS[name])
+
+
+class PrefixIndex:
+    """Names of a user's tags or ingredients sorted case insensitively
+
+    A lookup is a binary search for the prefix followed by reading the next
+    `limit` entries, so its cost does not depend on the number of names.
+    Changes are applied in place, under a lock lookups also take so they
+    never see a half applied change.
+    """
+
+    __slots__ = ('entries', '_keys', '_lock')
+
+    def __init__(self, rows):
+        # (lowercased name, id, name), ties ordered by id like the database
+        self.entries = sorted((name.lower(), pk, name) for pk, name in rows)
+        self._keys = {pk: key for key, pk, _name in self.entries}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def change(self, pk, name=None):
+        """Rename `pk` to `name`, add it if missing or remove it without one"""
+        with self._lock:
+            key = self._keys.pop(pk, None)
+            if key is not None:
+                del self.entries[bisect_left(self.entries, (key, pk))]
+            if name is not None:
+                key = name.lower()
+                insort(self.entries, (key, pk, name))
+                self._keys[pk] = key
+
+    def search(self, prefix, limit):
+        """Return `(id, name)` of the first `limit` names with `prefix`"""
+        prefix = prefix.lower()
+        matches = []
+        with self._lock:
+            entries = self.entries
+            start = bisect_left(entries, (prefix,))
+            for key, pk, name in entries[start:start + limit]:
+                if not key.startswith(prefix):
+                    break
+                matches.append((pk, name))
+        return matches
+
+
+def parse_limit(value):
+    """Return the number of matches asked for within our bounds"""
+    try:
+        limit = int(value)
+    except (TypeError, ValueError):
+        return get_setting('LIMIT')
+    if limit <= 0:
+        return get_setting('LIMIT')
+    return min(limit, get_setting('MAX_LIMIT'))
+
+
+_indexes = None
+
+
+def get_local_cache():
+    global _indexes
+    if _indexes is None:
+        _indexes = LocalLRUCache(
+            get_setting('MAX_USERS'), get_setting('TIMEOUT')
+        )
+    return _indexes
+
+
+def get_cache():
+    return get_shared_cache(get_setting('CACHE'), 'RECIPE_AUTOCOMPLETE')
+
+
+def _index_key(model, user_id):
+    return f'{model._meta.label_lower}:{user_id}'
+
+
+def _generation_key(model, user_id):
+    return f'autocomplete-generation:{_index_key(model, user_id)}'
+
+
+def get_generation(model, user_id):
+    """Return the counter of the writes to a user's tags or ingredients
+
+    It starts at a random value so an index can not match again after the
+    shared cache lost the counter.
+    """
+    cache = get_cache()
+    key = _generation_key(model, user_id)
+    generation = cache.get(key)
+    if generation is None:
+        cache.add(key, secrets.randbits(48), None)
+        generation = cache.get(key)
+    return generation
+
+
+def bump_generation(model, user_id):
+    """Make every process rebuild the index of a user's objects
+
+    Return the new counter.
+    """
+    cache = get_cache()
+    key = _generation_key(model, user_id)
+    try:
+        return cache.incr(key)
+    except ValueError:
+        get_generation(model, user_id)
+        return cache.incr(key)
+
+
+def object_changed(instance, deleted=False, using=None):
+    """Follow a saved or deleted tag or ingredient in the index of this process
+
+    The counter is bumped right away, so no process keeps serving its index,
+    and once more after the commit, when this process patches its own index
+    rather than rebuilding it. The patch is skipped, and the index rebuilt,
+    if another write bumped the counter in between. This relies on `incr`
+    being atomic, as it is with memcached.
+    """
+    model, user_id = type(instance), instance.user_id
+    # Deleting clears the primary key of the instance
+    pk, name = instance.pk, None if deleted else instance.name
+    first = bump_generation(model, user_id)
+    transaction.on_commit(
+        lambda: apply_change(model, user_id, first, pk, name), using=using
+    )
+
+
+def apply_change(model, user_id, first, pk, name):
+    """Patch the local index once the write bumping to `first` committed"""
+    second = bump_generation(model, user_id)
+    if second != first + 1:
+        return
+    cache = get_local_cache()
+    key = _index_key(model, user_id)
+    entry = cache.get(key)
+    # Built before the write or after it but before the commit
+    if entry is not None and entry[0] in (first - 1, first):
+        entry[1].change(pk, name)
+        cache.set(key, (second, entry[1]))
+
+
+def get_index(queryset, model, user_id):
+    """Return the prefix index of a user's objects, rebuilt after changes
+
+    Indexes are tagged with the shared counter of the writes to the user's
+    objects of that model, see `object_changed`. Other processes rebuild
+    their index on their next lookup after a write.
+    """
+    token = get_generation(model, user_id)
+    key = _index_key(model, user_id)
+    cache = get_local_cache()
+    entry = cache.get(key)
+    if entry is not None and entry[0] == token:
+        return entry[1]
+    index = PrefixIndex(queryset.values_list('id', 'name').iterator())
+    cache.set(key, (token, index))
+    return index
+
+
+def complete(queryset, user_id, prefix, limit):
+    """Return `(id, name)` of a user's first names starting with `prefix`
+
+    Without the local index this is an indexed range scan, see the
+    `lower(name)` pattern indexes of migration 0010.
+    """
+    if get_setting('LOCAL_INDEX'):
+        index = get_index(queryset, queryset.model, user_id)
+        return index.search(prefix, limit)
+    return list(
+        queryset
+        .annotate(name_lower=Lower('name'))
+        .filter(name_lower__startswith=prefix.lower())
+        .order_by('name_lower', 'id')
+        .values_list('id', 'name')[:limit]
+    )
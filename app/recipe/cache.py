@@ -0,0 +1,107 @@
+import hashlib
+import time
+import uuid
+
+from django.conf import settings
+from django.db import transaction
+from django.utils.cache import (
+    get_conditional_response, patch_cache_control, patch_vary_headers,
+)
+from django.utils.http import http_date
+
+from rest_framework.response import Response
+
+from core.caches import get_shared_cache
+
+DEFAULTS = {
+    # Alias from settings.CACHES holding the generations and the responses, it
+    # must be shared between processes for a write to reach every worker
+    'CACHE': 'shared',
+    # Seconds a cached list response is kept
+    'TIMEOUT': 300,
+}
+
+
+def get_setting(name):
+    """Return a RECIPE_RESPONSE_CACHE setting falling back to our defaults"""
+    options = getattr(settings, 'RECIPE_RESPONSE_CACHE', {})
+    return options.get(name, DEFAULTS[name])
+
+
+def get_cache():
+    return get_shared_cache(get_setting('CACHE'), 'RECIPE_RESPONSE_CACHE')
+
+
+def _generation_key(user_id):
+    return f'recipe-generation:{user_id}'
+
+
+def bump_generation(user_id):
+    """Invalidate every cached list of a user
+
+    The generation is a random token rather than a counter so a stale entry
+    can never be matched again, even if the cache lost the previous value.
+    """
+    generation = (uuid.uuid4().hex, int(time.time()))
+    get_cache().set(_generation_key(user_id), generation, None)
+    return generation
+
+
+def bump_generation_on_commit(user_id, using=None):
+    """Invalidate every cached list of a user once the write is committed
+
+    Bumping earlier would let a request running before the commit cache the
+    old rows under the new generation. Outside a transaction it bumps now.
+    """
+    transaction.on_commit(lambda: bump_generation(user_id), using=using)
+
+
+def get_generation(user_id):
+    """Return the `(token, last modified timestamp)` of a user's data"""
+    cache = get_cache()
+    generation = cache.get(_generation_key(user_id))
+    if generation is None:
+        generation = (uuid.uuid4().hex, int(time.time()))
+        cache.add(_generation_key(user_id), generation, None)
+        generation = cache.get(_generation_key(user_id)) or generation
+    return generation
+
+
+class CachedListMixin:
+    """Serve lists from a per-user cache and answer conditional requests
+
+    Responses are keyed by the user's generation, the requested url and the
+    accepted media type, so any write bumping the generation (see
+    `recipe.signals`) makes every cached list of that user unreachable.
+    """
+
+    def list(self, request, *args, **kwargs):
+        token, modified = get_generation(request.user.pk)
+        accept = request.META.get('HTTP_ACCEPT', '')
+        variant = hashlib.sha256(
+            f'{request.get_full_path()}|{accept}'.encode('utf-8')
+        ).hexdigest()[:32]
+        etag = f'"{token}-{variant}"'
+
+        response = get_conditional_response(
+            request, etag=etag, last_modified=modified
+        )
+        if response is None:
+            cache = get_cache()
+            key = (
+                f'recipe-response:{self.basename}:{request.user.pk}:'
+                f'{token}:{variant}'
+            )
+            data = cache.get(key)
+            if data is None:
+                response = super().list(request, *args, **kwargs)
+                if not response.streaming:
+                    cache.set(key, response.data, get_setting('TIMEOUT'))
+            else:
+                response = Response(data)
+
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(modified)
+        patch_cache_control(response, private=True, no_cache=True)
+        patch_vary_headers(response, ('Authorization', 'Accept'))
+        return response
@@ -0,0 +1,127 @@
+import csv
+import io
+
+from django.db.models import Prefetch, prefetch_related_objects
+
+from core.models import Ingredient, Recipe, Tag
+from core.renderers import dumps
+from recipe.streaming import batched
+
+CONTENT_TYPES = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv',
+}
+
+CSV_COLUMNS = (
+    'type', 'id', 'name', 'time_minutes', 'price', 'link', 'tags',
+    'ingredients',
+)
+
+# Bytes gathered before a chunk is handed to the response or the file
+BUFFER_SIZE = 64 * 1024
+
+
+def export_records(user, chunk_size=500, using=None):
+    """Yield every tag, ingredient and recipe of a user as plain dicts
+
+    Rows are read through server side cursors `chunk_size` at a time and the
+    tags and ingredients of every chunk of recipes are loaded with one
+    prefetch query each, so memory does not grow with the number of recipes.
+    Recipes reference their tags and ingredients by id.
+    """
+    for model, kind in ((Tag, 'tag'), (Ingredient, 'ingredient')):
+        rows = (
+            model.objects.using(using)
+            .filter(user=user)
+            .order_by('id')
+            .values_list('id', 'name')
+            .iterator(chunk_size=chunk_size)
+        )
+        for pk, name in rows:
+            yield {'type': kind, 'id': pk, 'name': name}
+
+    recipes = (
+        Recipe.objects.using(using)
+        .filter(user=user)
+        .order_by('id')
+        .only('id', 'title', 'time_minutes', 'price', 'link')
+        .iterator(chunk_size=chunk_size)
+    )
+    prefetches = [
+        Prefetch(
+            name, queryset=model.objects.using(using).only('id').order_by('id')
+        )
+        for name, model in (('tags', Tag), ('ingredients', Ingredient))
+    ]
+    for batch in batched(recipes, chunk_size):
+        prefetch_related_objects(batch, *prefetches)
+        for recipe in batch:
+            yield {
+                'type': 'recipe',
+                'id': recipe.id,
+                'title': recipe.title,
+                'time_minutes': recipe.time_minutes,
+                'price': str(recipe.price),
+                'link': recipe.link,
+                'tags': [tag.id for tag in recipe.tags.all()],
+                'ingredients': [
+                    ingredient.id for ingredient in recipe.ingredients.all()
+                ],
+            }
+
+
+def _buffered(chunks):
+    """Join small byte strings into chunks of about BUFFER_SIZE"""
+    buffer = []
+    size = 0
+    for chunk in chunks:
+        buffer.append(chunk)
+        size += len(chunk)
+        if size >= BUFFER_SIZE:
+            yield b''.join(buffer)
+            buffer = []
+            size = 0
+    if buffer:
+        yield b''.join(buffer)
+
+
+def encode_ndjson(records):
+    """Yield one JSON document per line"""
+    return _buffered(dumps(record) + b'\n' for record in records)
+
+
+def _csv_lines(records):
+    out = io.StringIO()
+    writer = csv.writer(out)
+    writer.writerow(CSV_COLUMNS)
+    for record in records:
+        if record['type'] == 'recipe':
+            record = dict(
+                record, name=record['title'],
+                tags=' '.join(map(str, record['tags'])),
+                ingredients=' '.join(map(str, record['ingredients'])),
+            )
+        writer.writerow([record.get(column, '') for column in CSV_COLUMNS])
+        yield out.getvalue().encode('utf-8')
+        out.seek(0)
+        out.truncate()
+
+
+def encode_csv(records):
+    """Yield a CSV table with one row per record
+
+    The `name` of a recipe row holds its title, its tag and ingredient ids are
+    separated by spaces.
+    """
+    return _buffered(_csv_lines(records))
+
+
+ENCODERS = {
+    'ndjson': encode_ndjson,
+    'csv': encode_csv,
+}
+
+
+def export(user, export_format, chunk_size=500, using=None):
+    """Yield the encoded export of a user's recipe book"""
+    return ENCODERS[export_format](export_records(user, chunk_size, using))
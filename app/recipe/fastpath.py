@@ -0,0 +1,258 @@
+from collections import defaultdict
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db import models
+from django.http import Http404
+from rest_framework import serializers
+from rest_framework.response import Response
+
+from core.metrics import timed
+
+# Fields whose to_representation returns the database value unchanged
+IDENTITY_FIELDS = (
+    serializers.CharField, serializers.IntegerField, serializers.BooleanField,
+)
+
+COLUMN, MANY_PKS, MANY_NESTED, METHOD = range(4)
+
+
+class Unsupported(Exception):
+    """The serializer uses a field the fast path cannot render"""
+
+
+class RowProxy:
+    """Attribute access to a values() row, passed to method fields"""
+
+    __slots__ = ('_row',)
+
+    def __init__(self, row):
+        self._row = row
+
+    def __getattr__(self, name):
+        try:
+            return self._row[name]
+        except KeyError:
+            raise AttributeError(name)
+
+
+def _column(name, field, model):
+    """Return the column backing a plain field and its conversion
+
+    The conversion is None where the field renders the value as is.
+    """
+    if isinstance(field, (serializers.FileField, serializers.RelatedField)):
+        raise Unsupported(name)
+    try:
+        model_field = model._meta.get_field(field.source)
+    except FieldDoesNotExist:
+        raise Unsupported(name)
+    if not model_field.concrete or model_field.is_relation:
+        raise Unsupported(name)
+    if type(field) in IDENTITY_FIELDS:
+        return model_field.attname, None
+    return model_field.attname, field.to_representation
+
+
+def _convert(value, convert):
+    return value if value is None or convert is None else convert(value)
+
+
+class FastRepresentation:
+    """Render the output of a model serializer straight from values() rows
+
+    The serializer's bound fields, already trimmed to the request's field
+    selection, are compiled once into a plan of column reads and the same
+    conversions the fields apply. Many-to-many relations are read per page
+    with one query on their through table, ordered by the related id as the
+    serializer prefetches order them.
+    """
+
+    def __init__(self, serializer_class, context=None):
+        self.serializer = serializer_class(context=context or {})
+        self.model = serializer_class.Meta.model
+        self.pk = self.model._meta.pk.attname
+        self.columns = {self.pk}
+        self.relations = {}
+        self.plan = []
+
+        sources = getattr(serializer_class, 'method_field_sources', {})
+        for name, field in self.serializer.fields.items():
+            if field.write_only:
+                continue
+            if isinstance(field, serializers.SerializerMethodField):
+                if name not in sources:
+                    raise Unsupported(name)
+                self.columns.update(sources[name])
+                method = getattr(self.serializer, field.method_name)
+                self.plan.append((name, METHOD, method))
+            elif isinstance(field, serializers.ManyRelatedField):
+                self.relations[name] = self._relation(name, field, ())
+                self.plan.append((name, MANY_PKS, None))
+            elif isinstance(field, serializers.ListSerializer):
+                related_model = self._m2m_field(name, field).related_model
+                nested = [
+                    (child_name, *_column(child_name, child, related_model))
+                    for child_name, child in field.child.fields.items()
+                    if not child.write_only
+                ]
+                self.relations[name] = self._relation(
+                    name, field, [column for _n, column, _c in nested]
+                )
+                self.plan.append((name, MANY_NESTED, [
+                    (n, convert) for n, _column, convert in nested
+                ]))
+            else:
+                column, convert = _column(name, field, self.model)
+                self.columns.add(column)
+                self.plan.append((name, COLUMN, (column, convert)))
+
+    @classmethod
+    def supports(cls, serializer_class, context=None):
+        """Whether every field of the serializer can be rendered from rows"""
+        try:
+            cls(serializer_class, context)
+        except Unsupported:
+            return False
+        return True
+
+    def _m2m_field(self, name, field):
+        try:
+            model_field = self.model._meta.get_field(field.source)
+        except FieldDoesNotExist:
+            raise Unsupported(name)
+        if not isinstance(model_field, models.ManyToManyField):
+            raise Unsupported(name)
+        return model_field
+
+    def _relation(self, name, field, columns):
+        """Return the through model query parts loading a relation"""
+        model_field = self._m2m_field(name, field)
+        owner = f'{model_field.m2m_field_name()}_id'
+        target = model_field.m2m_reverse_field_name()
+        lookups = (
+            tuple(f'{target}__{column}' for column in columns)
+            or (f'{target}_id',)
+        )
+        return model_field.remote_field.through, owner, f'{target}_id', lookups
+
+    def prepare(self, queryset, extra=()):
+        """Turn a queryset into the values() rows to render
+
+        The columns in `extra` are selected too.
+        """
+        columns = self.columns | set(extra)
+        return queryset.prefetch_related(None).values(*columns)
+
+    def render(self, rows, using=None):
+        """Return the representation of every row
+
+        The relations are read from the database `using`.
+        """
+        with timed('serialize'):
+            return self._render(rows, using)
+
+    def _render(self, rows, using):
+        pk = self.pk
+        ids = [row[pk] for row in rows]
+        maps = {
+            name: self._load(ids, using, *relation)
+            for name, relation in self.relations.items()
+        }
+
+        data = []
+        for row in rows:
+            item = {}
+            for name, kind, arg in self.plan:
+                if kind == COLUMN:
+                    item[name] = _convert(row[arg[0]], arg[1])
+                elif kind == MANY_PKS:
+                    item[name] = [
+                        values[0] for values in maps[name].get(row[pk], ())
+                    ]
+                elif kind == MANY_NESTED:
+                    item[name] = [
+                        {
+                            key: _convert(value, convert)
+                            for (key, convert), value in zip(arg, values)
+                        }
+                        for values in maps[name].get(row[pk], ())
+                    ]
+                else:
+                    item[name] = arg(RowProxy(row))
+            data.append(item)
+        return data
+
+    def _load(self, ids, using, through, owner, order, lookups):
+        """Return `{owner id: [related values]}` ordered by the related id"""
+        grouped = defaultdict(list)
+        if not ids:
+            return grouped
+        rows = (
+            through.objects.db_manager(using)
+            .filter(**{f'{owner}__in': ids})
+            .order_by(order)
+            .values_list(owner, *lookups)
+        )
+        for row in rows:
+            grouped[row[0]].append(row[1:])
+        return grouped
+
+
+class FastReadMixin:
+    """Base of the view mixins rendering reads with `FastRepresentation`"""
+
+    # Set to False to always render through the serializer
+    fast_reads = True
+
+    def get_fast_representation(self):
+        """Return the compiled serializer of this request
+
+        None renders through the serializer.
+        """
+        if not self.fast_reads:
+            return None
+        try:
+            return FastRepresentation(
+                self.get_serializer_class(), self.get_serializer_context()
+            )
+        except Unsupported:
+            return None
+
+
+class FastListMixin(FastReadMixin):
+    """List from values() rows when the serializer can be compiled"""
+
+    def list(self, request, *args, **kwargs):
+        fast = self.get_fast_representation()
+        if fast is None:
+            return super().list(request, *args, **kwargs)
+
+        ordering = {name.lstrip('-') for name in self.get_ordering()}
+        rows = fast.prepare(
+            self.filter_queryset(self.get_queryset()), ordering
+        )
+        page = self.paginate_queryset(rows)
+        if page is not None:
+            return self.get_paginated_response(fast.render(page))
+        return Response(fast.render(list(rows)))
+
+
+class FastRetrieveMixin(FastReadMixin):
+    """Retrieve from a values() row when the serializer can be compiled"""
+
+    def retrieve(self, request, *args, **kwargs):
+        fast = self.get_fast_representation()
+        if fast is None:
+            return super().retrieve(request, *args, **kwargs)
+
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        rows = fast.prepare(self.filter_queryset(self.get_queryset()))
+        try:
+            lookup = {self.lookup_field: self.kwargs[lookup_url_kwarg]}
+            row = rows.filter(**lookup).first()
+        except (TypeError, ValueError, ValidationError):
+            row = None
+        if row is None:
+            raise Http404
+        self.check_object_permissions(request, row)
+        return Response(fast.render([row])[0])
@@ -0,0 +1,167 @@
+from django.db.models import Count, Exists, OuterRef
+from django.utils.translation import gettext_lazy as _
+
+from rest_framework import serializers
+from rest_framework.exceptions import ValidationError
+from rest_framework.filters import BaseFilterBackend
+
+from core.models import Recipe
+from recipe import search
+from recipe.pagination import MAX_INT, MIN_INT
+
+MATCH_ANY = 'any'
+MATCH_ALL = 'all'
+
+
+def params_to_ints(value, param):
+    """Convert a comma separated list of ids from the query string to ints"""
+    message = _('Expected a comma separated list of ids.')
+    try:
+        ids = {int(str_id) for str_id in value.split(',') if str_id.strip()}
+    except ValueError:
+        raise ValidationError({param: message})
+    if any(not MIN_INT <= pk <= MAX_INT for pk in ids):
+        raise ValidationError({param: message})
+    return sorted(ids)
+
+
+class RecipeRelationFilterBackend(BaseFilterBackend):
+    """Filter recipes by `?tags=` and `?ingredients=` ids
+
+    `?match=any` (the default) keeps recipes linked to at least one of the ids
+    through an EXISTS subquery, `?match=all` keeps recipes linked to every id
+    through a grouped `HAVING COUNT` subquery. Neither joins the through table
+    into the outer query so recipes are never duplicated.
+    """
+
+    match_query_param = 'match'
+    relations = (
+        ('tags', Recipe.tags.through, 'tag_id'),
+        ('ingredients', Recipe.ingredients.through, 'ingredient_id'),
+    )
+
+    def filter_queryset(self, request, queryset, view):
+        match = request.query_params.get(self.match_query_param, MATCH_ANY)
+        if match not in (MATCH_ANY, MATCH_ALL):
+            raise ValidationError({
+                self.match_query_param: _('Expected "any" or "all".')
+            })
+
+        for param, through, column in self.relations:
+            value = request.query_params.get(param)
+            if not value:
+                continue
+            ids = params_to_ints(value, param)
+            if not ids:
+                continue
+            if match == MATCH_ALL:
+                queryset = queryset.filter(
+                    id__in=self._match_all(through, column, ids)
+                )
+            else:
+                queryset = queryset.filter(
+                    self._match_any(through, column, ids)
+                )
+        return queryset
+
+    def _match_any(self, through, column, ids):
+        """EXISTS (a link from the recipe to any of the ids)"""
+        return Exists(through.objects.filter(
+            recipe_id=OuterRef('pk'), **{f'{column}__in': ids}
+        ))
+
+    def _match_all(self, through, column, ids):
+        """Recipe ids linked to every one of the ids"""
+        return (
+            through.objects
+            .filter(**{f'{column}__in': ids})
+            .values('recipe_id')
+            .annotate(matched=Count(column))
+            .filter(matched=len(ids))
+            .values('recipe_id')
+        )
+
+
+class RecipeSearchFilterBackend(BaseFilterBackend):
+    """Full text search of recipes by `?q=`
+
+    Matches are annotated with their `rank`, views order by it while a query
+    is present, see `recipe.search`.
+    """
+
+    search_param = 'q'
+
+    def filter_queryset(self, request, queryset, view):
+        query = request.query_params.get(self.search_param, '').strip()
+        if not query:
+            return queryset
+        return search.search(queryset, query, request.user)
+
+
+class RecipeRangeFilterBackend(BaseFilterBackend):
+    """Filter recipes by `?max_time=` minutes and a price range
+
+    The range is given by `?min_price=` and `?max_price=`.
+    """
+
+    # Bounds may exceed the largest stored price, only cents are checked
+    params = (
+        (
+            'max_time', 'time_minutes__lte',
+            serializers.IntegerField(min_value=0, max_value=MAX_INT),
+        ),
+        (
+            'min_price', 'price__gte',
+            serializers.DecimalField(None, decimal_places=2, min_value=0),
+        ),
+        (
+            'max_price', 'price__lte',
+            serializers.DecimalField(None, decimal_places=2, min_value=0),
+        ),
+    )
+
+    def filter_queryset(self, request, queryset, view):
+        filters = {}
+        errors = {}
+        for param, lookup, field in self.params:
+            value = request.query_params.get(param, '').strip()
+            if not value:
+                continue
+            try:
+                filters[lookup] = field.run_validation(value)
+            except ValidationError as e:
+                errors[param] = e.detail
+        if errors:
+            raise ValidationError(errors)
+        return queryset.filter(**filters)
+
+
+class RecipeOrderingFilterBackend(BaseFilterBackend):
+    """Order recipes by one of the whitelisted `?ordering=` fields
+
+    The id breaks ties in the same direction so the ordering matches one of
+    the `(user, field, id)` indexes and is walked without sorting.
+    """
+
+    ordering_param = 'ordering'
+    ordering_fields = ('price', 'time_minutes', 'title', 'id')
+
+    def get_ordering(self, request, view):
+        """Return the requested ordering, None when the view default applies"""
+        value = request.query_params.get(self.ordering_param, '').strip()
+        if not value:
+            return None
+        name = value[1:] if value.startswith('-') else value
+        if name not in self.ordering_fields:
+            raise ValidationError({self.ordering_param: _(
+                'Expected one of %(fields)s, optionally prefixed with "-".'
+            ) % {'fields': ', '.join(self.ordering_fields)}})
+        if name == 'id':
+            return (value,)
+        return (value, '-id' if value.startswith('-') else 'id')
+
+    def filter_queryset(self, request, queryset, view):
+        ordering = self.get_ordering(request, view)
+        if ordering is None:
+            return queryset
+        return queryset.order_by(*ordering)
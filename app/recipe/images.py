@@ -0,0 +1,297 @@
+import functools
+import hashlib
+import io
+import logging
+import os
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from PIL import Image, ImageOps, features
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connections, transaction
+
+from core.models import Recipe
+from recipe.cache import bump_generation_on_commit
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    # Threads decoding and re-encoding uploads in every worker process
+    'WORKERS': 2,
+    # Longest side of the stored image in pixels
+    'MAX_SIZE': 2048,
+    'JPEG_QUALITY': 85,
+    # Refuse uploads whose header announces more pixels than this
+    'MAX_PIXELS': 50_000_000,
+    # Process uploads in the request thread, used by the tests
+    'EAGER': False,
+    # Longest side in pixels of the derived renditions
+    'RENDITION_SIZES': (128, 512, 1024),
+    'RENDITION_FORMATS': ('webp', 'jpeg'),
+    'RENDITION_QUALITY': 80,
+}
+
+EXTENSIONS = {'jpeg': 'jpg', 'webp': 'webp'}
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_setting(name):
+    """Return a RECIPE_IMAGE_PIPELINE setting falling back to our defaults"""
+    options = getattr(settings, 'RECIPE_IMAGE_PIPELINE', {})
+    return options.get(name, DEFAULTS[name])
+
+
+def get_executor():
+    """Return the process wide pool running the image jobs"""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=get_setting('WORKERS'),
+                    thread_name_prefix='recipe-image',
+                )
+    return _executor
+
+
+def inspect_upload(upload):
+    """Read an upload's header and return its format and size
+
+    The image itself is not decoded.
+    """
+    with Image.open(upload) as img:
+        fmt, size = img.format, img.size
+    upload.seek(0)
+    if size[0] * size[1] > get_setting('MAX_PIXELS'):
+        raise ValueError('Image is too large')
+    return fmt, size
+
+
+def enqueue(recipe_id, upload_name):
+    """Schedule the processing of a recipe's raw upload after the commit"""
+    if get_setting('EAGER'):
+        process_recipe_image(recipe_id, upload_name)
+        return
+    transaction.on_commit(
+        lambda: get_executor().submit(_run_job, recipe_id, upload_name)
+    )
+
+
+def _run_job(recipe_id, upload_name):
+    """Executor entry point, worker threads own their database connections"""
+    try:
+        process_recipe_image(recipe_id, upload_name)
+    except Exception:
+        # The executor would keep the exception in a future nobody reads
+        logger.exception('The image job of recipe %s failed', recipe_id)
+    finally:
+        connections.close_all()
+
+
+def process_recipe_image(recipe_id, upload_name):
+    """Decode, orient, resize and re-encode the raw upload of a recipe
+
+    The result is only written if the recipe still waits for that upload, a
+    newer one replacing it meanwhile wins. Either way the job deletes its raw
+    upload once no recipe refers to it.
+    """
+    claimed = Recipe.objects.filter(
+        pk=recipe_id, image_upload=upload_name,
+        image_status=Recipe.IMAGE_PENDING,
+    ).update(image_status=Recipe.IMAGE_PROCESSING)
+    if not claimed:
+        _discard_upload(upload_name)
+        return
+
+    processing = Recipe.objects.filter(
+        pk=recipe_id, image_upload=upload_name,
+        image_status=Recipe.IMAGE_PROCESSING,
+    )
+    stored = None
+    try:
+        recipe = Recipe.objects.get(pk=recipe_id)
+        previous = recipe.image.name or None
+        with default_storage.open(upload_name, 'rb') as raw:
+            content = render_image(raw)
+        digest = generate_renditions(content)
+        stored = recipe.image.storage.save(
+            recipe.image.field.generate_filename(recipe, 'image.jpg'), content
+        )
+        finished = processing.update(
+            image=stored, image_upload=None, image_status=Recipe.IMAGE_READY,
+            image_digest=digest,
+        )
+    except Exception:
+        logger.exception('Processing the image of recipe %s failed', recipe_id)
+        if processing.update(
+            image_upload=None, image_status=Recipe.IMAGE_FAILED
+        ):
+            bump_generation_on_commit(
+                Recipe.objects.values_list('user_id', flat=True)
+                .get(pk=recipe_id)
+            )
+        if stored:
+            default_storage.delete(stored)
+        _discard_upload(upload_name)
+        return
+
+    if finished:
+        # Updates send no signal, refresh the cached lists showing the image
+        bump_generation_on_commit(recipe.user_id)
+        if previous:
+            default_storage.delete(previous)
+    else:
+        # Superseded by a newer upload while it was processed
+        default_storage.delete(stored)
+    _discard_upload(upload_name)
+
+
+def _discard_upload(upload_name):
+    """Delete a raw upload unless a recipe still waits for it"""
+    if not Recipe.objects.filter(image_upload=upload_name).exists():
+        default_storage.delete(upload_name)
+
+
+def render_image(fp):
+    """Return the stored JPEG rendition of an image file"""
+    max_size = get_setting('MAX_SIZE')
+    with Image.open(fp) as img:
+        # Let the JPEG decoder downscale while decoding instead of afterwards
+        img.draft('RGB', (max_size, max_size))
+        img = ImageOps.exif_transpose(img)
+        img.thumbnail((max_size, max_size), Image.LANCZOS)
+        img = flatten(img)
+
+        out = io.BytesIO()
+        img.save(
+            out, 'JPEG', quality=get_setting('JPEG_QUALITY'), optimize=True,
+            progressive=True,
+        )
+    return ContentFile(out.getvalue())
+
+
+def flatten(img):
+    """Convert an image to RGB, compositing transparency onto white"""
+    if (img.mode in ('RGBA', 'LA')
+            or (img.mode == 'P' and 'transparency' in img.info)):
+        img = img.convert('RGBA')
+        background = Image.new('RGB', img.size, (255, 255, 255))
+        background.paste(img, mask=img.split()[-1])
+        return background
+    if img.mode != 'RGB':
+        return img.convert('RGB')
+    return img
+
+
+@functools.lru_cache(maxsize=None)
+def can_encode_webp():
+    """Whether this Pillow build has WebP support, checked once per process"""
+    return features.check('webp')
+
+
+def rendition_formats():
+    """Return the configured rendition formats this Pillow build can encode"""
+    return [
+        fmt for fmt in get_setting('RENDITION_FORMATS')
+        if fmt != 'webp' or can_encode_webp()
+    ]
+
+
+def rendition_path(digest, size, fmt):
+    """Return the storage path of a rendition, named after the source"""
+    return f'renditions/{digest[:2]}/{digest}/{size}.{EXTENSIONS[fmt]}'
+
+
+def generate_renditions(content):
+    """Write the missing renditions of an image and return its content digest
+
+    Renditions live under the digest of the image they derive from, so the
+    same picture is only ever resized and encoded once.
+    """
+    data = content.read() if hasattr(content, 'read') else content
+    if hasattr(content, 'seek'):
+        content.seek(0)
+    digest = hashlib.sha256(data).hexdigest()
+
+    formats = rendition_formats()
+    wanted = [
+        (size, fmt)
+        for size in get_setting('RENDITION_SIZES')
+        for fmt in formats
+        if not default_storage.exists(rendition_path(digest, size, fmt))
+    ]
+    if not wanted:
+        return digest
+
+    with Image.open(io.BytesIO(data)) as source:
+        source = flatten(source)
+        for size in sorted({size for size, _ in wanted}, reverse=True):
+            img = source.copy()
+            img.thumbnail((size, size), Image.LANCZOS)
+            for wanted_size, fmt in wanted:
+                if wanted_size != size:
+                    continue
+                out = io.BytesIO()
+                img.save(
+                    out, fmt.upper(), quality=get_setting('RENDITION_QUALITY')
+                )
+                save_rendition(
+                    rendition_path(digest, size, fmt), out.getvalue()
+                )
+            # Downscale the next, smaller, size from this one
+            source = img
+    return digest
+
+
+def save_rendition(path, data):
+    """Write a rendition to its exact path, replacing a copy another job wrote
+
+    Jobs handling the same picture write the same bytes to the same path. On
+    the local filesystem the file is written aside and moved in place, so a
+    reader never sees a partial file. Other storages pick a new name when the
+    path is taken, that copy is deleted rather than left behind.
+    """
+    try:
+        target = default_storage.path(path)
+    except NotImplementedError:
+        name = default_storage.save(path, ContentFile(data))
+        if name != path:
+            default_storage.delete(name)
+        return
+
+    directory = os.path.dirname(target)
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        mode = getattr(default_storage, 'file_permissions_mode', None)
+        os.chmod(tmp, mode or 0o644)
+        os.replace(tmp, target)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+
+def rendition_urls(digest, request=None):
+    """Return `{size: {format: url}}` for the renditions of an image"""
+    if not digest:
+        return {}
+
+    def build(path):
+        url = default_storage.url(path)
+        return request.build_absolute_uri(url) if request is not None else url
+
+    formats = rendition_formats()
+    return {
+        str(size): {
+            fmt: build(rendition_path(digest, size, fmt)) for fmt in formats
+        }
+        for size in get_setting('RENDITION_SIZES')
+    }
@@ -0,0 +1,185 @@
+import json
+import math
+from base64 import b64decode, b64encode
+from collections import OrderedDict
+
+from django.core.exceptions import ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+from django.utils.translation import gettext_lazy as _
+
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+# JSON values an ordering field can be compared with, lists and objects are not
+CURSOR_VALUE_TYPES = (str, int, float)
+# Integers a database column can hold, larger ones fail when the query runs
+MIN_INT, MAX_INT = -2 ** 63, 2 ** 63 - 1
+
+
+class KeysetPagination(BasePagination):
+    """Cursor pagination over a composite, unique keyset ordering
+
+    The cursor stores the ordering values of the last row that was sent, so
+    every page is a single indexed range scan no matter how deep it is.
+    """
+
+    page_size = 100
+    max_page_size = 1000
+    page_size_query_param = 'page_size'
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = _('Invalid cursor')
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.ordering = self.get_ordering(view)
+        self.base_url = request.build_absolute_uri()
+
+        position, self.reverse = self.decode_cursor(request)
+
+        ordering = self.ordering
+        if self.reverse:
+            ordering = tuple(_flip(field) for field in ordering)
+
+        queryset = queryset.order_by(*ordering)
+        if position is not None:
+            try:
+                queryset = queryset.filter(
+                    self._keyset_filter(ordering, position)
+                )
+            except (TypeError, ValueError, ValidationError):
+                # A value the field cannot hold
+                raise NotFound(self.invalid_cursor_message)
+
+        rows = list(queryset[:self.page_size + 1])
+        has_more = len(rows) > self.page_size
+        self.page = rows[:self.page_size]
+        if self.reverse:
+            self.page.reverse()
+
+        if self.reverse:
+            self.has_next = position is not None
+            self.has_previous = has_more
+        else:
+            self.has_next = has_more
+            self.has_previous = position is not None
+
+        return self.page
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data),
+        ]))
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'properties': {
+                'next': {'type': 'string', 'nullable': True},
+                'previous': {'type': 'string', 'nullable': True},
+                'results': schema,
+            },
+        }
+
+    def get_page_size(self, request):
+        """Return the page size requested by the client within our bounds"""
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        if size <= 0:
+            return self.page_size
+        return min(size, self.max_page_size)
+
+    def get_ordering(self, view):
+        """Return the view ordering, made unique by ending it on the id"""
+        ordering = tuple(view.get_ordering())
+        if ordering[-1].lstrip('-') != 'id':
+            ordering += ('id',)
+        return ordering
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous or not self.page:
+            return None
+        return self.encode_cursor(self.page[0], reverse=True)
+
+    def encode_cursor(self, row, reverse):
+        """Return a url pointing past the given row"""
+        values = [
+            _row_value(row, field.lstrip('-')) for field in self.ordering
+        ]
+        payload = json.dumps(
+            {'v': values, 'r': int(reverse)}, cls=DjangoJSONEncoder
+        )
+        cursor = b64encode(payload.encode('utf-8')).decode('ascii')
+        return replace_query_param(
+            self.base_url, self.cursor_query_param, cursor
+        )
+
+    def decode_cursor(self, request):
+        """Return the keyset position and direction encoded in the request"""
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return None, False
+
+        try:
+            payload = json.loads(
+                b64decode(encoded.encode('ascii')).decode('utf-8')
+            )
+            values = payload['v']
+            reverse = bool(payload['r'])
+        except (TypeError, ValueError, KeyError, UnicodeError):
+            raise NotFound(self.invalid_cursor_message)
+
+        if not isinstance(values, list) or len(values) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+        if not all(_is_cursor_value(value) for value in values):
+            raise NotFound(self.invalid_cursor_message)
+        return values, reverse
+
+    def _keyset_filter(self, ordering, position):
+        """Build the row comparison `(a, b, c) > (x, y, z)`
+
+        Each field compares in its own direction.
+        """
+        condition = Q()
+        equal = Q()
+        for field, value in zip(ordering, position):
+            name = field.lstrip('-')
+            lookup = 'lt' if field.startswith('-') else 'gt'
+            condition |= equal & Q(**{f'{name}__{lookup}': value})
+            equal &= Q(**{name: value})
+        return condition
+
+
+def _is_cursor_value(value):
+    """Whether a decoded cursor value can be compared with a column"""
+    if isinstance(value, bool) or not isinstance(value, CURSOR_VALUE_TYPES):
+        return False
+    if isinstance(value, int):
+        return MIN_INT <= value <= MAX_INT
+    if isinstance(value, float):
+        return math.isfinite(value)
+    return True
+
+
+def _flip(field):
+    """Reverse the direction of an ordering field"""
+    return field[1:] if field.startswith('-') else f'-{field}'
+
+
+def _row_value(row, name):
+    """Read an ordering value from a model instance or a values() row"""
+    if isinstance(row, dict):
+        return row[name]
+    return getattr(row, name)
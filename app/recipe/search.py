@@ -0,0 +1,187 @@
+import re
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.db.models import (
+    BooleanField, Count, DecimalField, IntegerField, OuterRef, Subquery, Sum,
+    Value,
+)
+from django.db.models.expressions import RawSQL
+
+from core.models import Ingredient, Recipe, SearchTerm, Tag
+
+DEFAULTS = {
+    # Postgres text search configuration used to build and query the vectors
+    'CONFIG': 'english',
+}
+
+# Postgres weight of each indexed source, and the fallback index equivalent
+# keeping the ratios of ts_rank's default weights
+SOURCES = (
+    ('title', 'A', 10),
+    ('tags', 'B', 4),
+    ('ingredients', 'C', 2),
+)
+
+TERM_RE = re.compile(r'\w+')
+MAX_TERM_LENGTH = SearchTerm._meta.get_field('term').max_length
+
+UPDATE_VECTORS_SQL = """
+UPDATE {recipe} SET search_vector =
+    setweight(to_tsvector(%(config)s::regconfig, {recipe}.title), 'A') ||
+    setweight(to_tsvector(%(config)s::regconfig, coalesce((
+        SELECT string_agg(t.name, ' ') FROM {tag} t
+        JOIN {recipe_tags} rt ON rt.tag_id = t.id
+        WHERE rt.recipe_id = {recipe}.id
+    ), '')), 'B') ||
+    setweight(to_tsvector(%(config)s::regconfig, coalesce((
+        SELECT string_agg(i.name, ' ') FROM {ingredient} i
+        JOIN {recipe_ingredients} ri ON ri.ingredient_id = i.id
+        WHERE ri.recipe_id = {recipe}.id
+    ), '')), 'C')
+WHERE {recipe}.id = ANY(%(ids)s)
+"""
+
+
+def get_setting(name):
+    """Return a RECIPE_SEARCH setting falling back to our defaults"""
+    return getattr(settings, 'RECIPE_SEARCH', {}).get(name, DEFAULTS[name])
+
+
+def uses_tsvector(using):
+    """Whether a database keeps recipe vectors, not the SearchTerm index"""
+    return connections[using].vendor == 'postgresql'
+
+
+def tokenize(text):
+    """Split text into the lower case terms of the fallback index"""
+    return list(dict.fromkeys(
+        term[:MAX_TERM_LENGTH] for term in TERM_RE.findall(text.lower())
+    ))
+
+
+def linked_recipe_ids(model, ids, using=DEFAULT_DB_ALIAS):
+    """Return the ids of the recipes linked to the given tags or ingredients"""
+    field = 'tags' if model is Tag else 'ingredients'
+    through = getattr(Recipe, field).through
+    column = f'{model._meta.model_name}_id'
+    return list(
+        through.objects.using(using)
+        .filter(**{f'{column}__in': ids})
+        .values_list('recipe_id', flat=True)
+        .distinct()
+    )
+
+
+def reindex_recipes(recipe_ids, using=DEFAULT_DB_ALIAS):
+    """Rebuild the search entries of the given recipes"""
+    recipe_ids = sorted(set(recipe_ids))
+    if not recipe_ids:
+        return
+    if uses_tsvector(using):
+        _update_vectors(recipe_ids, using)
+    else:
+        _update_terms(recipe_ids, using)
+
+
+def _update_vectors(recipe_ids, using):
+    connection = connections[using]
+    qn = connection.ops.quote_name
+    sql = UPDATE_VECTORS_SQL.format(
+        recipe=qn(Recipe._meta.db_table),
+        tag=qn(Tag._meta.db_table),
+        ingredient=qn(Ingredient._meta.db_table),
+        recipe_tags=qn(Recipe.tags.through._meta.db_table),
+        recipe_ingredients=qn(Recipe.ingredients.through._meta.db_table),
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(
+            sql, {'config': get_setting('CONFIG'), 'ids': recipe_ids}
+        )
+
+
+def _update_terms(recipe_ids, using):
+    texts = defaultdict(lambda: defaultdict(list))
+    owners = {}
+    for pk, user_id, title in (
+        Recipe.objects.using(using)
+        .filter(id__in=recipe_ids)
+        .values_list('id', 'user_id', 'title')
+    ):
+        owners[pk] = user_id
+        texts[pk]['title'].append(title)
+    for field in ('tags', 'ingredients'):
+        through = getattr(Recipe, field).through
+        for pk, text in (
+            through.objects.using(using)
+            .filter(recipe_id__in=recipe_ids)
+            .values_list('recipe_id', f'{field[:-1]}__name')
+        ):
+            texts[pk][field].append(text)
+
+    rows = []
+    for pk, user_id in owners.items():
+        weights = defaultdict(int)
+        for source, _label, weight in SOURCES:
+            for text in texts[pk][source]:
+                for term in tokenize(text):
+                    weights[term] += weight
+        rows.extend(
+            SearchTerm(user_id=user_id, recipe_id=pk, term=term, weight=weight)
+            for term, weight in weights.items()
+        )
+
+    with transaction.atomic(using=using):
+        SearchTerm.objects.using(using).filter(
+            recipe_id__in=recipe_ids
+        ).delete()
+        SearchTerm.objects.using(using).bulk_create(rows, batch_size=5000)
+
+
+def search(queryset, query, user):
+    """Filter recipes to the matches of a query, annotated with their `rank`
+
+    Every word of the query must match the title, a tag or an ingredient.
+    """
+    if uses_tsvector(queryset.db):
+        return _search_vectors(queryset, query)
+
+    terms = tokenize(query)
+    if not terms:
+        return queryset.annotate(
+            rank=Value(0, output_field=IntegerField())
+        ).none()
+    matches = (
+        SearchTerm.objects
+        .filter(user=user, term__in=terms)
+        .values('recipe_id')
+        .annotate(matched=Count('term'))
+        .filter(matched=len(terms))
+        .values('recipe_id')
+    )
+    rank = (
+        SearchTerm.objects
+        .filter(recipe_id=OuterRef('pk'), term__in=terms)
+        .values('recipe_id')
+        .annotate(rank=Sum('weight'))
+        .values('rank')
+    )
+    return queryset.filter(id__in=matches).annotate(
+        rank=Subquery(rank, output_field=IntegerField())
+    )
+
+
+def _search_vectors(queryset, query):
+    table = connections[queryset.db].ops.quote_name(Recipe._meta.db_table)
+    column = f'{table}.search_vector'
+    tsquery = 'plainto_tsquery(%s::regconfig, %s)'
+    params = (get_setting('CONFIG'), query)
+    # Rounded so the rank survives the round trip through a pagination cursor
+    rank = RawSQL(
+        f'round(ts_rank({column}, {tsquery})::numeric, 6)', params,
+        output_field=DecimalField(max_digits=12, decimal_places=6),
+    )
+    return queryset.filter(
+        RawSQL(f'{column} @@ {tsquery}', params, output_field=BooleanField())
+    ).annotate(rank=rank)
@@ -1,36 +1,187 @@
+from collections import OrderedDict
+from itertools import chain
+
+from PIL import Image
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Prefetch
+from django.utils.translation import gettext_lazy as _
+
 from rest_framework import serializers
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.settings import api_settings
 
+from core.metrics import TimedDataMixin, TimedListSerializer
 from core.models import Tag, Ingredient, Recipe
+from recipe import images
+from recipe.fields import UserPrimaryKeyRelatedField
+
+
+def _split_param(value):
+    return {name.strip() for name in (value or '').split(',') if name.strip()}
+
+
+class SelectableFieldsMixin:
+    """Render only the fields selected by `?fields=` and/or `?omit=`
+
+    Only safe requests are trimmed, and only the top level serializer, nested
+    serializers render in full.
+    """
+
+    fields_query_param = 'fields'
+    omit_query_param = 'omit'
+
+    @classmethod
+    def get_selected_fields(cls, request):
+        """Return the names of the fields to render in declaration order
+
+        None renders every field.
+        """
+        if request is None or request.method not in SAFE_METHODS:
+            return None
+        params = getattr(request, 'query_params', request.GET)
+        wanted = _split_param(params.get(cls.fields_query_param))
+        omitted = _split_param(params.get(cls.omit_query_param))
+        if not wanted and not omitted:
+            return None
+
+        available = list(cls().fields)
+        unknown = sorted((wanted | omitted) - set(available))
+        if unknown:
+            message = _('Unknown field(s): %s.') % ', '.join(unknown)
+            raise serializers.ValidationError({
+                cls.fields_query_param: [message]
+            })
+        return [
+            name for name in available
+            if (not wanted or name in wanted) and name not in omitted
+        ]
+
+    def get_fields(self):
+        fields = super().get_fields()
+        parent = self.parent
+        if isinstance(parent, serializers.ListSerializer):
+            parent = parent.parent
+        if parent is not None:
+            return fields
+        selected = self.get_selected_fields(self.context.get('request'))
+        if selected is None:
+            return fields
+        return OrderedDict((name, fields[name]) for name in selected)
+
+
+class EagerLoadingMixin(SelectableFieldsMixin):
+    """Let a serializer declare what it reads so views only load that
+
+    The prefetches of relations that are not rendered are skipped and
+    columns that are not rendered are deferred with `only()`.
+    """
+
+    # Model fields read by the method fields, which have no source
+    method_field_sources = {}
+
+    @classmethod
+    def get_prefetches(cls):
+        """Return the Prefetch objects needed to render this serializer"""
+        return []
+
+    @classmethod
+    def get_model_fields(cls, fields):
+        """Return the concrete model fields read to render the given fields"""
+        declared = cls().fields
+        model_fields = {'pk'}
+        for name in fields:
+            field = declared[name]
+            if name in cls.method_field_sources:
+                model_fields.update(cls.method_field_sources[name])
+            elif isinstance(field, (serializers.ManyRelatedField,
+                                    serializers.ListSerializer)):
+                continue
+            elif field.source != '*':
+                model_fields.add(field.source.split('.')[0])
+        return model_fields
 
+    @classmethod
+    def setup_eager_loading(cls, queryset, fields=None, ordering=()):
+        """Apply the serializer's prefetches, and `only()` for a selection
 
-class TagSerializers(serializers.ModelSerializer):
+        Fields in `ordering` stay loaded so the rows can still be paginated.
+        """
+        prefetches = [
+            prefetch for prefetch in cls.get_prefetches()
+            if fields is None or prefetch.prefetch_to in fields
+        ]
+        if prefetches:
+            queryset = queryset.prefetch_related(*prefetches)
+        if fields is not None:
+            concrete = {
+                field.name for field in queryset.model._meta.concrete_fields
+            }
+            ordering = {name.lstrip('-') for name in ordering} & concrete
+            queryset = queryset.only(*cls.get_model_fields(fields) | ordering)
+        return queryset
+
+
+class TagSerializers(TimedDataMixin, EagerLoadingMixin,
+                     serializers.ModelSerializer):
     """Serializers for our Tag model"""
 
     class Meta:
         model = Tag
         fields = ('id', 'name')
         read_only_fields = ('id',)
+        list_serializer_class = TimedListSerializer
 
 
-class IngredientSerializer(serializers.ModelSerializer):
+class IngredientSerializer(TimedDataMixin, EagerLoadingMixin,
+                           serializers.ModelSerializer):
     """Serializer for our Ingredient model"""
 
     class Meta:
         model = Ingredient
         fields = ('id', 'name')
         read_only_fields = ('id',)
+        list_serializer_class = TimedListSerializer
 
 
-class RecipeSerializer(serializers.ModelSerializer):
+class RecipeSerializer(TimedDataMixin, EagerLoadingMixin,
+                       serializers.ModelSerializer):
     """Serializer for our Recipe model"""
 
-    ingredients = serializers.PrimaryKeyRelatedField(many=True, queryset=Ingredient.objects.all())
-    tags = serializers.PrimaryKeyRelatedField(many=True, queryset=Tag.objects.all())
+    ingredients = UserPrimaryKeyRelatedField(
+        many=True, queryset=Ingredient.objects.all()
+    )
+    tags = UserPrimaryKeyRelatedField(many=True, queryset=Tag.objects.all())
+    image_renditions = serializers.SerializerMethodField()
 
     class Meta:
         model = Recipe
-        fields = ('id', 'title', 'ingredients', 'tags', 'time_minutes', 'price', 'link')
-        read_only_fields = ('id',)
+        fields = (
+            'id', 'title', 'ingredients', 'tags', 'time_minutes', 'price',
+            'link', 'image_status', 'image_renditions',
+        )
+        read_only_fields = ('id', 'image_status')
+        list_serializer_class = TimedListSerializer
+
+    method_field_sources = {'image_renditions': ('image_digest',)}
+
+    def get_image_renditions(self, obj):
+        """Urls of the resized copies of the recipe image"""
+        return images.rendition_urls(
+            obj.image_digest, self.context.get('request')
+        )
+
+    @classmethod
+    def get_prefetches(cls):
+        """Only the primary keys of the related objects are rendered"""
+        return [
+            Prefetch(
+                'ingredients',
+                queryset=Ingredient.objects.only('id').order_by('id'),
+            ),
+            Prefetch('tags', queryset=Tag.objects.only('id').order_by('id')),
+        ]
 
 
 class RecipeDetailSerializer(RecipeSerializer):
@@ -39,11 +190,278 @@ class RecipeDetailSerializer(RecipeSerializer):
     ingredients = IngredientSerializer(many=True, read_only=True)
     tags = TagSerializers(many=True, read_only=True)
 
+    @classmethod
+    def get_prefetches(cls):
+        """The nested serializers render the id and the name"""
+        return [
+            Prefetch(
+                'ingredients',
+                queryset=Ingredient.objects.only('id', 'name').order_by('id'),
+            ),
+            Prefetch(
+                'tags', queryset=Tag.objects.only('id', 'name').order_by('id')
+            ),
+        ]
+
+
+class UploadedImageField(serializers.FileField):
+    """Accept a raw upload into `source` but render the processed `image`"""
+
+    def get_attribute(self, instance):
+        return instance.image
+
 
-class RecipeImageSerializer(serializers.ModelSerializer):
-    """Serializer for uploading an image"""
+class RecipeImageSerializer(TimedDataMixin, serializers.ModelSerializer):
+    """Serializer for uploading an image
+
+    The upload is only checked from its header here, decoding and resizing
+    happen in the background, see `recipe.images`.
+    """
+
+    image = UploadedImageField(source='image_upload')
+
+    image_renditions = serializers.SerializerMethodField()
 
     class Meta:
         model = Recipe
-        fields = ('id', 'image')
-        read_only_fields = ('id',)
+        fields = ('id', 'image', 'image_status', 'image_renditions')
+        read_only_fields = ('id', 'image_status')
+
+    def update(self, instance, validated_data):
+        """Write the upload and its status only
+
+        A job may be storing the previous image meanwhile.
+        """
+        for attr, value in validated_data.items():
+            setattr(instance, attr, value)
+        instance.save(update_fields=list(validated_data))
+        return instance
+
+    def get_image_renditions(self, obj):
+        """Urls of the resized copies of the recipe image"""
+        return images.rendition_urls(
+            obj.image_digest, self.context.get('request')
+        )
+
+    def validate_image(self, value):
+        try:
+            images.inspect_upload(value)
+        except (OSError, ValueError, Image.DecompressionBombError):
+            raise serializers.ValidationError(
+                serializers.ImageField.default_error_messages['invalid_image']
+            )
+        return value
+
+
+def bulk_create_with_pks(model, objs):
+    """Bulk create objects making sure their primary keys are set"""
+    if connection.features.can_return_rows_from_bulk_insert:
+        return model.objects.bulk_create(objs, batch_size=1000)
+    for obj in objs:
+        obj.save(force_insert=True)
+    return objs
+
+
+class BulkListSerializer(TimedListSerializer):
+    """Validate a whole batch in one pass and write it with bulk queries
+
+    Errors are reported per item, aligned with the submitted list, and nothing
+    is written unless every item is valid. When updating, `instance` is the
+    list of the user's objects matching the submitted ids.
+    """
+
+    default_error_messages = {
+        'max_items': _('Expected at most {max_items} items but got {count}.'),
+        'not_found': _('Not found.'),
+    }
+
+    def to_internal_value(self, data):
+        if not isinstance(data, list) or not data:
+            return super().to_internal_value(data)
+
+        max_items = getattr(settings, 'BULK_MAX_ITEMS', 10000)
+        if len(data) > max_items:
+            message = self.error_messages['max_items'].format(
+                max_items=max_items, count=len(data)
+            )
+            raise serializers.ValidationError({
+                api_settings.NON_FIELD_ERRORS_KEY: [message]
+            })
+
+        items = []
+        errors = []
+        for item in data:
+            try:
+                items.append(self.child.run_validation(item))
+                errors.append({})
+            except serializers.ValidationError as exc:
+                items.append(None)
+                errors.append(exc.detail)
+
+        self.validate_batch(items, errors)
+        if any(errors):
+            raise serializers.ValidationError(errors)
+        return items
+
+    def validate_batch(self, items, errors):
+        """Validate the items against each other and the database
+
+        Problems are added to the `errors` of the item.
+        """
+        if self.instance is None:
+            return
+        found = {obj.id for obj in self.instance}
+        for item, item_errors in zip(items, errors):
+            if item is None:
+                continue
+            if 'id' not in item:
+                required = self.child.fields['id'].error_messages['required']
+                item_errors['id'] = [required]
+            elif item['id'] not in found:
+                item_errors['id'] = [self.error_messages['not_found']]
+
+    def create(self, validated_data):
+        model = self.child.Meta.model
+        for attrs in validated_data:
+            attrs.pop('id', None)
+        return bulk_create_with_pks(
+            model, [model(**attrs) for attrs in validated_data]
+        )
+
+    def update(self, instance, validated_data):
+        by_id = {obj.id: obj for obj in instance}
+        updated = []
+        fields = set()
+        for attrs in validated_data:
+            obj = by_id[attrs.pop('id')]
+            for attr, value in attrs.items():
+                setattr(obj, attr, value)
+                fields.add(attr)
+            updated.append(obj)
+
+        if fields:
+            self.child.Meta.model.objects.bulk_update(
+                updated, fields, batch_size=1000
+            )
+        return updated
+
+
+class TagBulkSerializer(TagSerializers):
+    """Serializer for one tag of a bulk request"""
+
+    id = serializers.IntegerField(required=False)
+
+    class Meta(TagSerializers.Meta):
+        read_only_fields = ()
+        list_serializer_class = BulkListSerializer
+
+
+class IngredientBulkSerializer(IngredientSerializer):
+    """Serializer for one ingredient of a bulk request"""
+
+    id = serializers.IntegerField(required=False)
+
+    class Meta(IngredientSerializer.Meta):
+        read_only_fields = ()
+        list_serializer_class = BulkListSerializer
+
+
+class RecipeBulkListSerializer(BulkListSerializer):
+    """Bulk list serializer that also writes the recipe tags and ingredients
+
+    Every referenced id is resolved with a single query per relation and the
+    links are written with one bulk insert into each through table.
+    """
+
+    relations = (
+        ('tags', Tag, Recipe.tags.through, 'tag_id'),
+        (
+            'ingredients', Ingredient, Recipe.ingredients.through,
+            'ingredient_id',
+        ),
+    )
+
+    def validate_batch(self, items, errors):
+        super().validate_batch(items, errors)
+        user = self.context['request'].user
+        messages = serializers.PrimaryKeyRelatedField.default_error_messages
+        for field, model, _through, _column in self.relations:
+            wanted = set(chain.from_iterable(
+                item.get(field, ()) for item in items if item
+            ))
+            if not wanted:
+                continue
+            found = set(
+                model.objects.filter(user=user, id__in=wanted)
+                .values_list('id', flat=True)
+            )
+            for item, item_errors in zip(items, errors):
+                if not item:
+                    continue
+                missing = sorted(set(item.get(field, ())) - found)
+                if missing:
+                    item_errors[field] = [
+                        messages['does_not_exist'].format(pk_value=pk)
+                        for pk in missing
+                    ]
+
+    def create(self, validated_data):
+        links = [self._pop_links(attrs) for attrs in validated_data]
+        recipes = super().create(validated_data)
+        self._write_links(recipes, links)
+        return recipes
+
+    def update(self, instance, validated_data):
+        links = [self._pop_links(attrs) for attrs in validated_data]
+        recipes = super().update(instance, validated_data)
+        for field, _model, through, _column in self.relations:
+            changed = [
+                recipe.id for recipe, link in zip(recipes, links)
+                if field in link
+            ]
+            if changed:
+                through.objects.filter(recipe_id__in=changed).delete()
+        self._write_links(recipes, links)
+        return recipes
+
+    def _pop_links(self, attrs):
+        return {
+            field: attrs.pop(field)
+            for field, _model, _through, _column in self.relations
+            if field in attrs
+        }
+
+    def _write_links(self, recipes, links):
+        for field, _model, through, column in self.relations:
+            rows = [
+                through(recipe_id=recipe.id, **{column: pk})
+                for recipe, link in zip(recipes, links)
+                for pk in sorted(set(link.get(field, ())))
+            ]
+            if rows:
+                through.objects.bulk_create(rows, batch_size=5000)
+
+
+class RecipeBulkSerializer(RecipeSerializer):
+    """Serializer for one recipe of a bulk request
+
+    Related ids are plain integers here, the list serializer resolves them for
+    the whole batch at once.
+    """
+
+    id = serializers.IntegerField(required=False)
+    ingredients = serializers.ListField(
+        child=serializers.IntegerField(), required=False
+    )
+    tags = serializers.ListField(
+        child=serializers.IntegerField(), required=False
+    )
+
+    class Meta(RecipeSerializer.Meta):
+        read_only_fields = ('image_status',)
+        list_serializer_class = RecipeBulkListSerializer
+
+    @classmethod
+    def get_prefetches(cls):
+        """Bulk updates only read the recipe rows"""
+        return []
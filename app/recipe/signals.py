@@ -0,0 +1,141 @@
+import functools
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.contrib.auth import get_user_model
+from django.db.models.signals import (
+    m2m_changed, post_delete, post_save, pre_delete,
+)
+from django.dispatch import receiver
+
+from core.models import Tag, Ingredient, Recipe
+from recipe import autocomplete, search
+from recipe.cache import bump_generation_on_commit
+
+_bulk = ContextVar('recipe_bulk_writes', default=False)
+
+
+@contextmanager
+def bulk_writes():
+    """Skip the receivers below, bulk views do their work once per batch"""
+    token = _bulk.set(True)
+    try:
+        yield
+    finally:
+        _bulk.reset(token)
+
+
+def per_instance(receiver_func):
+    """Make a receiver do nothing inside `bulk_writes`"""
+    @functools.wraps(receiver_func)
+    def wrapper(*args, **kwargs):
+        if not _bulk.get():
+            receiver_func(*args, **kwargs)
+    return wrapper
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_save, sender=Ingredient)
+@receiver(post_save, sender=Recipe)
+@receiver(post_delete, sender=Tag)
+@receiver(post_delete, sender=Ingredient)
+@receiver(post_delete, sender=Recipe)
+@per_instance
+def invalidate_on_write(sender, instance, using=None, **kwargs):
+    """Invalidate the cached lists of the owner of a changed object"""
+    bump_generation_on_commit(instance.user_id, using=using)
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_save, sender=Ingredient)
+@per_instance
+def complete_saved(sender, instance, using=None, **kwargs):
+    """Follow a saved tag or ingredient in the autocomplete index"""
+    autocomplete.object_changed(instance, using=using)
+
+
+@receiver(post_delete, sender=Tag)
+@receiver(post_delete, sender=Ingredient)
+@per_instance
+def complete_deleted(sender, instance, using=None, **kwargs):
+    """Drop a deleted tag or ingredient from the autocomplete index"""
+    autocomplete.object_changed(instance, deleted=True, using=using)
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+@per_instance
+def invalidate_on_link(sender, instance, action, using=None, **kwargs):
+    """Invalidate the cached lists when tags or ingredients are (un)linked"""
+    if action.startswith('post_'):
+        bump_generation_on_commit(instance.user_id, using=using)
+
+
+@receiver(post_save, sender=get_user_model())
+def start_generation(sender, instance, created, using=None, **kwargs):
+    """Give new users a fresh generation"""
+    if created:
+        bump_generation_on_commit(instance.pk, using=using)
+
+
+@receiver(post_save, sender=Recipe)
+@per_instance
+def index_recipe(sender, instance, created, update_fields=None, using=None,
+                 **kwargs):
+    """Index the title of a saved recipe"""
+    if update_fields is not None and 'title' not in update_fields:
+        return
+    search.reindex_recipes([instance.pk], using=using)
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+@per_instance
+def index_links(sender, instance, action, reverse, pk_set, using, **kwargs):
+    """Reindex the recipes gaining or losing a tag or an ingredient"""
+    if not reverse:
+        if action.startswith('post_'):
+            search.reindex_recipes([instance.pk], using=using)
+        return
+    # Linking from the tag or ingredient side, pk_set holds recipe ids
+    if action == 'pre_clear':
+        instance._search_cleared_ids = search.linked_recipe_ids(
+            type(instance), [instance.pk], using
+        )
+    elif action == 'post_clear':
+        search.reindex_recipes(
+            getattr(instance, '_search_cleared_ids', ()), using=using
+        )
+    elif action.startswith('post_'):
+        search.reindex_recipes(pk_set, using=using)
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_save, sender=Ingredient)
+@per_instance
+def index_renamed(sender, instance, created, using, **kwargs):
+    """Reindex the recipes of a tag or ingredient that may have been renamed"""
+    if not created:
+        search.reindex_recipes(
+            search.linked_recipe_ids(sender, [instance.pk], using),
+            using=using,
+        )
+
+
+@receiver(pre_delete, sender=Tag)
+@receiver(pre_delete, sender=Ingredient)
+@per_instance
+def remember_linked(sender, instance, using, **kwargs):
+    instance._search_linked_ids = search.linked_recipe_ids(
+        sender, [instance.pk], using
+    )
+
+
+@receiver(post_delete, sender=Tag)
+@receiver(post_delete, sender=Ingredient)
+@per_instance
+def index_deleted(sender, instance, using, **kwargs):
+    """Drop a deleted tag or ingredient from the recipes it was linked to"""
+    search.reindex_recipes(
+        getattr(instance, '_search_linked_ids', ()), using=using
+    )
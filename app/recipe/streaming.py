@@ -0,0 +1,82 @@
+from itertools import islice
+
+from django.db.models import prefetch_related_objects
+from django.http import StreamingHttpResponse
+
+from core.renderers import dumps
+from recipe.fastpath import FastReadMixin
+
+TRUE_VALUES = ('1', 'true', 'yes')
+
+
+def batched(iterable, size):
+    """Yield lists of up to `size` items of an iterable"""
+    iterator = iter(iterable)
+    batch = list(islice(iterator, size))
+    while batch:
+        yield batch
+        batch = list(islice(iterator, size))
+
+
+class StreamingListMixin(FastReadMixin):
+    """Stream the whole, unpaginated, list as one JSON array
+
+    Asked for with `?stream=true`.
+
+    Rows are read with a server side cursor `stream_chunk_size` at a time and
+    every chunk is rendered and encoded on its own, so memory stays bounded
+    whatever the size of the list. Only JSON responses are streamed.
+    """
+
+    stream_query_param = 'stream'
+    stream_chunk_size = 500
+
+    def stream_requested(self, request):
+        value = request.query_params.get(self.stream_query_param, '')
+        return (
+            value.strip().lower() in TRUE_VALUES
+            and request.accepted_renderer.format == 'json'
+        )
+
+    def list(self, request, *args, **kwargs):
+        if not self.stream_requested(request):
+            return super().list(request, *args, **kwargs)
+
+        queryset = self.filter_queryset(self.get_queryset())
+        if self.paginator:
+            ordering = self.paginator.get_ordering(self)
+        else:
+            ordering = self.get_ordering()
+        queryset = queryset.order_by(*ordering)
+        # The body is generated after the view returned, pin the database the
+        # request was routed to
+        chunks = self.stream_chunks(queryset.using(queryset.db))
+        return StreamingHttpResponse(chunks, content_type='application/json')
+
+    def stream_chunks(self, queryset):
+        """Yield the encoded JSON array of every object in the queryset"""
+        yield b'['
+        separator = b''
+        for data in self.stream_batches(queryset):
+            if data:
+                yield separator + dumps(data)[1:-1]
+                separator = b','
+        yield b']'
+
+    def stream_batches(self, queryset):
+        """Yield the representation of the queryset one chunk at a time"""
+        size = self.stream_chunk_size
+        fast = self.get_fast_representation()
+        if fast is not None:
+            ordering = {name.lstrip('-') for name in queryset.query.order_by}
+            rows = fast.prepare(queryset, ordering).iterator(chunk_size=size)
+            for batch in batched(rows, size):
+                yield fast.render(batch, using=queryset.db)
+            return
+
+        # iterator() skips prefetch_related, prefetch every chunk instead
+        lookups = queryset._prefetch_related_lookups
+        rows = queryset.prefetch_related(None).iterator(chunk_size=size)
+        for batch in batched(rows, size):
+            prefetch_related_objects(batch, *lookups)
+            yield self.get_serializer(batch, many=True).data
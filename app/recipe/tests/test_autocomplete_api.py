@@ -0,0 +1,204 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Tag, Ingredient
+from recipe import autocomplete
+from recipe.autocomplete import PrefixIndex
+
+TAGS_AUTOCOMPLETE_URL = reverse('recipe:tag-autocomplete')
+INGREDIENTS_AUTOCOMPLETE_URL = reverse('recipe:ingredient-autocomplete')
+
+
+class PrefixIndexTests(TestCase):
+
+    def test_search_prefix(self):
+        """Test that the first names with the prefix are returned in order"""
+        index = PrefixIndex([
+            (1, 'Basil'), (2, 'bay leaf'), (3, 'Apple'), (4, 'Beef'),
+            (5, 'Bacon'),
+        ])
+
+        self.assertEqual(
+            index.search('ba', 10),
+            [(5, 'Bacon'), (1, 'Basil'), (2, 'bay leaf')]
+        )
+        self.assertEqual(index.search('BA', 2), [(5, 'Bacon'), (1, 'Basil')])
+        self.assertEqual(index.search('c', 10), [])
+        self.assertEqual(index.search('', 1), [(3, 'Apple')])
+
+    def test_change(self):
+        """Test that renames, additions and removals keep the names sorted"""
+        index = PrefixIndex([(1, 'Basil'), (2, 'bay leaf'), (3, 'Apple')])
+
+        index.change(3, 'Bacon')
+        index.change(4, 'basil')
+        index.change(2)
+        index.change(5)
+
+        self.assertEqual(
+            index.search('', 10), [(3, 'Bacon'), (1, 'Basil'), (4, 'basil')]
+        )
+        self.assertEqual(
+            index.search('basil', 10), [(1, 'Basil'), (4, 'basil')]
+        )
+
+    def test_change_matches_rebuild(self):
+        """Test that a patched index equals one built from the new names"""
+        rows = [(pk, f'Name {pk % 7}') for pk in range(1, 50)]
+        index = PrefixIndex(rows)
+
+        for pk in range(1, 50, 3):
+            index.change(pk, f'name {pk % 5}')
+            rows[pk - 1] = (pk, f'name {pk % 5}')
+
+        self.assertEqual(index.entries, PrefixIndex(rows).entries)
+
+
+class AutocompleteApiTests(TestCase):
+    """Test the tag and ingredient autocomplete endpoints"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'vedant@gmail.com',
+            'basscoder2808'
+        )
+        self.client.force_authenticate(self.user)
+
+    def names(self, url, **params):
+        res = self.client.get(url, params)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return [item['name'] for item in res.data]
+
+    def test_autocomplete_tags(self):
+        """Test that tags are matched by case insensitive prefix"""
+        for name in ('Dessert', 'Dinner', 'Breakfast', 'dairy free'):
+            Tag.objects.create(user=self.user, name=name)
+
+        self.assertEqual(
+            self.names(TAGS_AUTOCOMPLETE_URL, prefix='d'),
+            ['dairy free', 'Dessert', 'Dinner']
+        )
+        self.assertEqual(self.names(TAGS_AUTOCOMPLETE_URL, q='DI'), ['Dinner'])
+        self.assertEqual(
+            self.names(TAGS_AUTOCOMPLETE_URL, prefix='d', limit=2),
+            ['dairy free', 'Dessert']
+        )
+
+    def test_autocomplete_limited_to_user(self):
+        """Test that other users' ingredients are never suggested"""
+        other = get_user_model().objects.create_user(
+            'other@gmail.com', 'testpass'
+        )
+        Ingredient.objects.create(user=other, name='Salt')
+        Ingredient.objects.create(user=self.user, name='Saffron')
+
+        self.assertEqual(
+            self.names(INGREDIENTS_AUTOCOMPLETE_URL, prefix='sa'), ['Saffron']
+        )
+
+    def test_autocomplete_follows_writes(self):
+        """Test that the local index follows changes to the user's data"""
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        self.assertEqual(
+            self.names(TAGS_AUTOCOMPLETE_URL, prefix='ve'), ['Vegan']
+        )
+
+        Tag.objects.create(user=self.user, name='Vegetarian')
+        tag.delete()
+
+        self.assertEqual(
+            self.names(TAGS_AUTOCOMPLETE_URL, prefix='ve'), ['Vegetarian']
+        )
+
+    @override_settings(RECIPE_AUTOCOMPLETE={'LOCAL_INDEX': False})
+    def test_autocomplete_from_database(self):
+        """Test that the database lookup returns the same matches"""
+        for name in ('Dessert', 'Dinner', 'Breakfast', 'dairy free'):
+            Tag.objects.create(user=self.user, name=name)
+
+        self.assertEqual(
+            self.names(TAGS_AUTOCOMPLETE_URL, prefix='d'),
+            ['dairy free', 'Dessert', 'Dinner']
+        )
+
+    def test_autocomplete_follows_bulk_writes(self):
+        """Test that bulk created tags, which send no signals, are suggested"""
+        Tag.objects.create(user=self.user, name='Vegan')
+        self.assertEqual(
+            self.names(TAGS_AUTOCOMPLETE_URL, prefix='ve'), ['Vegan']
+        )
+
+        res = self.client.post(
+            reverse('recipe:tag-bulk'), [{'name': 'Vegetarian'}], format='json'
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(
+            self.names(TAGS_AUTOCOMPLETE_URL, prefix='ve'),
+            ['Vegan', 'Vegetarian']
+        )
+
+    @override_settings(RECIPE_AUTOCOMPLETE={'CACHE': 'default'})
+    def test_process_local_cache_refused(self):
+        """Test that the generations are never kept in a per-process cache"""
+        with self.assertRaises(ImproperlyConfigured):
+            autocomplete.get_generation(Tag, self.user.pk)
+
+
+@mock.patch.object(
+    autocomplete.transaction, 'on_commit', lambda func, using=None: func()
+)
+class IncrementalIndexTests(TestCase):
+    """Test that committed writes patch the index of the writing process"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            'vedant@gmail.com', 'basscoder2808'
+        )
+        self.tag = Tag.objects.create(user=self.user, name='Vegan')
+        self.queryset = Tag.objects.filter(user=self.user)
+        autocomplete.get_local_cache().clear()
+        autocomplete.get_index(self.queryset, Tag, self.user.pk)
+
+    def search(self, prefix):
+        """Return the matching names and whether the index was rebuilt"""
+        with CaptureQueriesContext(connection) as queries:
+            index = autocomplete.get_index(self.queryset, Tag, self.user.pk)
+        rebuilt = any(
+            'core_tag' in query['sql'] for query in queries.captured_queries
+        )
+        return [name for _pk, name in index.search(prefix, 10)], rebuilt
+
+    def test_writes_patch_index(self):
+        """Test that saves and deletes are applied without a rebuild"""
+        Tag.objects.create(user=self.user, name='Vegetarian')
+        self.tag.name = 'Vanilla'
+        self.tag.save()
+
+        self.assertEqual(self.search('v'), (['Vanilla', 'Vegetarian'], False))
+
+        self.tag.delete()
+
+        self.assertEqual(self.search('v'), (['Vegetarian'], False))
+
+    def test_concurrent_write_rebuilds(self):
+        """Test that a write of another process in between forces a rebuild"""
+        first = autocomplete.bump_generation(Tag, self.user.pk)
+        tag = Tag(user=self.user, name='Vegetarian')
+        Tag.objects.bulk_create([tag])
+        # Another process writing before this one committed
+        autocomplete.bump_generation(Tag, self.user.pk)
+        Tag.objects.filter(user=self.user, name='Vegan').update(name='Vanilla')
+        autocomplete.apply_change(Tag, self.user.pk, first, tag.pk, tag.name)
+
+        self.assertEqual(self.search('v'), (['Vanilla', 'Vegetarian'], True))
@@ -0,0 +1,208 @@
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Tag, Ingredient
+
+RECIPES_BULK_URL = reverse('recipe:recipe-bulk')
+TAGS_BULK_URL = reverse('recipe:tag-bulk')
+
+
+def sample_recipe(user, **params):
+    """Creating and returning a sample recipe"""
+    defaults = {
+        'title': 'Sample Recipe',
+        'time_minutes': 5,
+        'price': 5.00
+    }
+    defaults.update(params)
+
+    return Recipe.objects.create(user=user, **defaults)
+
+
+class PrivateBulkApiTests(TestCase):
+    """Test the bulk endpoints for an authenticated user"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'vedant@gmail.com',
+            'basscoder2808'
+        )
+        self.client.force_authenticate(self.user)
+
+    def test_bulk_create_tags(self):
+        """Test creating a batch of tags"""
+        payload = [{'name': 'Vegan'}, {'name': 'Dessert'}]
+
+        res = self.client.post(TAGS_BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(
+            [tag['name'] for tag in res.data], ['Vegan', 'Dessert']
+        )
+        self.assertEqual(Tag.objects.filter(user=self.user).count(), 2)
+
+    def test_bulk_create_recipes_with_links(self):
+        """Test creating a batch of recipes with their tags and ingredients"""
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        ingredient = Ingredient.objects.create(user=self.user, name='Kale')
+        payload = [
+            {
+                'title': f'Recipe {i}',
+                'time_minutes': 10,
+                'price': '5.00',
+                'tags': [tag.id],
+                'ingredients': [ingredient.id],
+            }
+            for i in range(5)
+        ]
+
+        res = self.client.post(RECIPES_BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(res.data), 5)
+        for recipe in Recipe.objects.filter(user=self.user):
+            self.assertEqual(list(recipe.tags.all()), [tag])
+            self.assertEqual(list(recipe.ingredients.all()), [ingredient])
+
+    def test_bulk_create_resolves_links_in_one_query(self):
+        """The number of queries does not depend on the number of links"""
+        tags = [
+            Tag.objects.create(user=self.user, name=f'Tag {i}')
+            for i in range(10)
+        ]
+
+        def create(tag_count):
+            payload = [
+                {
+                    'title': 'Recipe',
+                    'time_minutes': 10,
+                    'price': '5.00',
+                    'tags': [tag.id for tag in tags[:tag_count]],
+                }
+                for _ in range(3)
+            ]
+            with CaptureQueriesContext(connection) as ctx:
+                res = self.client.post(
+                    RECIPES_BULK_URL, payload, format='json'
+                )
+            self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+            return len(ctx.captured_queries)
+
+        self.assertEqual(create(2), create(10))
+
+    def test_bulk_tag_writes_in_constant_queries(self):
+        """Renaming or deleting linked tags does not query once per tag"""
+        recipe = sample_recipe(user=self.user)
+
+        def linked_tags(count):
+            Tag.objects.bulk_create(
+                Tag(user=self.user, name=f'Tag {i}') for i in range(count)
+            )
+            tags = list(Tag.objects.filter(user=self.user))
+            recipe.tags.set(tags)
+            return tags
+
+        def rename_and_delete(tags):
+            renames = [{'id': tag.id, 'name': 'Renamed'} for tag in tags]
+            res = self.client.patch(TAGS_BULK_URL, renames, format='json')
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            ids = [tag.id for tag in tags]
+            res = self.client.delete(TAGS_BULK_URL, ids, format='json')
+            self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
+
+        # The first writes also create the user's cache entries
+        rename_and_delete(linked_tags(5))
+        tags = linked_tags(5)
+        with CaptureQueriesContext(connection) as ctx:
+            rename_and_delete(tags)
+        tags = linked_tags(50)
+        with self.assertNumQueries(len(ctx.captured_queries)):
+            rename_and_delete(tags)
+        self.assertFalse(Tag.objects.exists())
+
+    def test_bulk_create_reports_item_errors(self):
+        """Invalid items are reported by position and nothing is written"""
+        user2 = get_user_model().objects.create_user(
+            'jolly@gmail.com', 'basscoder'
+        )
+        other_tag = Tag.objects.create(user=user2, name='Not mine')
+        payload = [
+            {'title': 'Valid', 'time_minutes': 10, 'price': '5.00'},
+            {'title': '', 'time_minutes': 10, 'price': '5.00'},
+            {
+                'title': 'Stolen tag', 'time_minutes': 10, 'price': '5.00',
+                'tags': [other_tag.id],
+            },
+        ]
+
+        res = self.client.post(RECIPES_BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(res.data[0], {})
+        self.assertIn('title', res.data[1])
+        self.assertIn('tags', res.data[2])
+        self.assertFalse(Recipe.objects.exists())
+
+    def test_bulk_update_recipes(self):
+        """Test updating fields and links of a batch of recipes"""
+        recipe1 = sample_recipe(user=self.user)
+        recipe2 = sample_recipe(user=self.user)
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        recipe2.tags.add(tag)
+        payload = [
+            {'id': recipe1.id, 'title': 'Renamed', 'tags': [tag.id]},
+            {'id': recipe2.id, 'tags': []},
+        ]
+
+        res = self.client.patch(RECIPES_BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        recipe1.refresh_from_db()
+        self.assertEqual(recipe1.title, 'Renamed')
+        self.assertEqual(list(recipe1.tags.all()), [tag])
+        self.assertFalse(recipe2.tags.exists())
+
+    def test_bulk_update_unknown_recipe(self):
+        """Updating a recipe of another user is reported as not found"""
+        user2 = get_user_model().objects.create_user(
+            'jolly@gmail.com', 'basscoder'
+        )
+        recipe = sample_recipe(user=user2)
+
+        payload = [{'id': recipe.id, 'title': 'Mine'}]
+        res = self.client.patch(RECIPES_BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('id', res.data[0])
+
+    def test_bulk_delete_recipes(self):
+        """Test deleting a batch of recipes"""
+        recipe1 = sample_recipe(user=self.user)
+        recipe2 = sample_recipe(user=self.user)
+        recipe3 = sample_recipe(user=self.user)
+
+        res = self.client.delete(
+            RECIPES_BULK_URL, [recipe1.id, recipe2.id], format='json'
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertEqual(list(Recipe.objects.all()), [recipe3])
+
+    def test_bulk_delete_boolean_ids(self):
+        """Test that true and false are not taken for the ids 1 and 0"""
+        recipe = sample_recipe(user=self.user)
+
+        res = self.client.delete(
+            RECIPES_BULK_URL, [True, recipe.id], format='json'
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(res.data, [{'id': ['Not found.']}, {}])
+        self.assertTrue(Recipe.objects.filter(id=recipe.id).exists())
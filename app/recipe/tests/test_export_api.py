@@ -0,0 +1,97 @@
+import csv
+import io
+import json
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Ingredient, Recipe, Tag
+
+EXPORT_URL = reverse('recipe:recipe-export')
+
+
+class RecipeExportApiTests(TestCase):
+    """Test the streamed export of a user's recipe book"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            'vedant@gmail.com', 'basscoder2808'
+        )
+        self.tags = [
+            Tag.objects.create(user=self.user, name=name)
+            for name in ('Vegan', 'Dessert')
+        ]
+        self.ingredient = Ingredient.objects.create(
+            user=self.user, name='Sel, "fin"'
+        )
+        self.recipes = []
+        for i in range(3):
+            recipe = Recipe.objects.create(
+                user=self.user, title=f'Recipe {i}', time_minutes=i,
+                price=f'{i}.50',
+            )
+            recipe.tags.set(self.tags[:i])
+            self.recipes.append(recipe)
+        self.recipes[2].ingredients.add(self.ingredient)
+
+        other = get_user_model().objects.create_user(
+            'other@gmail.com', 'basscoder2808'
+        )
+        Recipe.objects.create(
+            user=other, title='Hidden', time_minutes=1, price='1.00'
+        )
+
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_export_ndjson(self):
+        res = self.client.get(EXPORT_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertTrue(res.streaming)
+        self.assertEqual(res['Content-Type'], 'application/x-ndjson')
+        lines = b''.join(res.streaming_content).splitlines()
+        records = [json.loads(line) for line in lines]
+        self.assertEqual(
+            [r['type'] for r in records],
+            ['tag'] * 2 + ['ingredient'] + ['recipe'] * 3
+        )
+        self.assertEqual(
+            records[0], {'type': 'tag', 'id': self.tags[0].id, 'name': 'Vegan'}
+        )
+        self.assertEqual(records[-1], {
+            'type': 'recipe', 'id': self.recipes[2].id, 'title': 'Recipe 2',
+            'time_minutes': 2,
+            'price': '2.50', 'link': '', 'tags': [tag.id for tag in self.tags],
+            'ingredients': [self.ingredient.id],
+        })
+
+    def test_export_csv(self):
+        res = self.client.get(EXPORT_URL, {'export_format': 'csv'})
+
+        self.assertEqual(res['Content-Type'], 'text/csv')
+        content = b''.join(res.streaming_content).decode()
+        rows = list(csv.DictReader(io.StringIO(content)))
+        self.assertEqual(len(rows), 6)
+        self.assertEqual(rows[2]['name'], 'Sel, "fin"')
+        self.assertEqual(rows[4]['name'], 'Recipe 1')
+        self.assertEqual(rows[4]['tags'], str(self.tags[0].id))
+
+    def test_export_queries_per_chunk(self):
+        """Test that relations are prefetched per chunk, not per recipe"""
+        for i in range(20):
+            Recipe.objects.create(
+                user=self.user, title=f'More {i}', time_minutes=i, price='1.00'
+            )
+        # tags, ingredients, recipes and two prefetches for each chunk of 500
+        with self.assertNumQueries(5):
+            b''.join(self.client.get(EXPORT_URL).streaming_content)
+
+    def test_invalid_format(self):
+        res = self.client.get(EXPORT_URL, {'export_format': 'xml'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
@@ -0,0 +1,150 @@
+import json
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient, APIRequestFactory
+
+from core.models import Recipe, Tag, Ingredient
+from recipe import serializers
+from recipe.fastpath import FastRepresentation
+from recipe.views import RecipeViewSet
+
+RECIPES_URL = reverse('recipe:recipe-list')
+
+
+class FastRepresentationTests(TestCase):
+    """Test that the fast path renders exactly what the serializers render"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            'vedant@gmail.com', 'basscoder2808'
+        )
+        tags = [
+            Tag.objects.create(user=self.user, name=f'Tag {i}')
+            for i in range(3)
+        ]
+        ingredients = [
+            Ingredient.objects.create(user=self.user, name=f'Ingrédient {i}')
+            for i in range(3)
+        ]
+        for i in range(4):
+            recipe = Recipe.objects.create(
+                user=self.user, title=f'Recipe "{i}"', time_minutes=i * 7,
+                price=f'{i * 3.5:.2f}',
+                link='https://example.com' if i % 2 else '',
+                image_digest='ab' * 32 if i == 1 else '',
+            )
+            recipe.tags.set(tags[i % 3:])
+            recipe.ingredients.set(ingredients[:i])
+        self.context = {'request': APIRequestFactory().get('/')}
+
+    def assertSameJson(self, serializer_class, queryset, context=None):
+        context = context if context is not None else self.context
+        instances = serializer_class.setup_eager_loading(queryset)
+        serializer = serializer_class(instances, many=True, context=context)
+        expected = JSONRenderer().render(serializer.data)
+
+        fast = FastRepresentation(serializer_class, context)
+        rows = list(fast.prepare(queryset))
+        actual = JSONRenderer().render(fast.render(rows))
+
+        self.assertEqual(actual, expected)
+
+    def test_recipe_serializer(self):
+        self.assertSameJson(
+            serializers.RecipeSerializer, Recipe.objects.order_by('id')
+        )
+
+    def test_recipe_detail_serializer(self):
+        self.assertSameJson(
+            serializers.RecipeDetailSerializer, Recipe.objects.order_by('-id')
+        )
+
+    def test_tag_and_ingredient_serializers(self):
+        self.assertSameJson(
+            serializers.TagSerializers, Tag.objects.order_by('-name', 'id')
+        )
+        self.assertSameJson(
+            serializers.IngredientSerializer, Ingredient.objects.order_by('id')
+        )
+
+    def test_selected_fields(self):
+        """Test that the fast path honours ?fields="""
+        request = APIRequestFactory().get('/', {'fields': 'title,tags,price'})
+        self.assertSameJson(
+            serializers.RecipeSerializer, Recipe.objects.order_by('id'),
+            {'request': request}
+        )
+
+    def test_unsupported_serializer(self):
+        """Test that serializers with file fields are left to DRF"""
+        self.assertFalse(
+            FastRepresentation.supports(serializers.RecipeImageSerializer)
+        )
+
+    def test_api_uses_fast_path(self):
+        """Test that the list endpoint renders the bytes of the serializer"""
+        client = APIClient()
+        client.force_authenticate(self.user)
+        res = client.get(RECIPES_URL)
+
+        recipes = serializers.RecipeSerializer.setup_eager_loading(
+            Recipe.objects.order_by('-id')
+        )
+        expected = serializers.RecipeSerializer(
+            recipes, many=True, context={'request': res.wsgi_request}
+        ).data
+        self.assertEqual(res.content, JSONRenderer().render(
+            {'next': None, 'previous': None, 'results': expected}
+        ))
+
+
+class StreamingListTests(TestCase):
+    """Test streaming the recipe list with ?stream=true"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            'vedant@gmail.com', 'basscoder2808'
+        )
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        for i in range(5):
+            recipe = Recipe.objects.create(
+                user=self.user, title=f'Recipe {i}', time_minutes=i,
+                price=f'{i}.50',
+            )
+            recipe.tags.add(tag)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def assertStreamsList(self, params):
+        res = self.client.get(RECIPES_URL, {**params, 'page_size': 100})
+        expected = res.json()['results']
+        with mock.patch.object(RecipeViewSet, 'stream_chunk_size', 2):
+            res = self.client.get(RECIPES_URL, {**params, 'stream': 'true'})
+
+        self.assertTrue(res.streaming)
+        self.assertEqual(res['Content-Type'], 'application/json')
+        self.assertEqual(json.loads(b''.join(res.streaming_content)), expected)
+
+    def test_stream_list(self):
+        self.assertStreamsList({})
+
+    def test_stream_filtered_and_ordered(self):
+        self.assertStreamsList({
+            'ordering': 'price', 'max_time': 3, 'fields': 'id,title,tags',
+        })
+
+    def test_stream_through_serializer(self):
+        """Test the fallback used when the fast path is disabled"""
+        with mock.patch.object(RecipeViewSet, 'fast_reads', False):
+            self.assertStreamsList({})
+
+    def test_stream_empty(self):
+        Recipe.objects.all().delete()
+        res = self.client.get(RECIPES_URL, {'stream': '1'})
+
+        self.assertEqual(b''.join(res.streaming_content), b'[]')
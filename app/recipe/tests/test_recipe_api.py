@@ -1,17 +1,25 @@
 import tempfile
 import os
+from unittest import mock
 
 from PIL import Image
 
 from django.contrib.auth import get_user_model
-from django.test import TestCase
+from django.core.cache.backends.db import DatabaseCache
+from django.core.exceptions import ImproperlyConfigured
+from django.core.files.storage import default_storage
+from django.db import connection, transaction
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 
 from rest_framework import status
-from rest_framework.test import APIClient
+from rest_framework.test import APIClient, APIRequestFactory
 
 from core.models import Recipe, Tag, Ingredient
 
+from recipe import cache as response_cache
+from recipe import images
 from recipe.serializers import RecipeSerializer, RecipeDetailSerializer
 
 RECIPIES_URL = reverse('recipe:recipe-list')
@@ -28,6 +36,14 @@ def detail_url(recipe_id):
     return reverse('recipe:recipe-detail', args=[recipe_id])
 
 
+def recipe_queries(queries):
+    """Return the captured queries other than the shared cache's"""
+    return [
+        query['sql'] for query in queries
+        if 'shared_cache' not in query['sql']
+    ]
+
+
 def sample_recipe(user, **params):
     """Creating and returning a sample recipe"""
     defaults = {
@@ -67,6 +83,9 @@ class PublicRecipeApiTest(TestCase):
         self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
 
 
+@mock.patch.object(
+    response_cache.transaction, 'on_commit', lambda func, using=None: func()
+)
 class PrivateRecipeApiTest(TestCase):
     """Private test which required a logged in user"""
 
@@ -90,7 +109,7 @@ class PrivateRecipeApiTest(TestCase):
         serializer = RecipeSerializer(recipies, many=True)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data['results'], serializer.data)
 
     def test_recipe_linited_to_user(self):
         """Test that a user can retrieve his recipies only"""
@@ -109,8 +128,147 @@ class PrivateRecipeApiTest(TestCase):
         serializer = RecipeSerializer(recipies, many=True)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(res.data), 1)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(len(res.data['results']), 1)
+        self.assertEqual(res.data['results'], serializer.data)
+
+    def _count_list_queries(self, recipe_count):
+        """Create recipes with relations and count the queries of a list"""
+        for i in range(recipe_count):
+            recipe = sample_recipe(user=self.user, title=f'Recipe {i}')
+            recipe.tags.add(sample_tag(user=self.user, name=f'Tag {i}'))
+            recipe.ingredients.add(
+                sample_ingredient(user=self.user, name=f'Ingredient {i}')
+            )
+
+        with CaptureQueriesContext(connection) as ctx:
+            res = self.client.get(RECIPIES_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return len(ctx.captured_queries)
+
+    def test_list_query_count_is_constant(self):
+        """Test that listing recipes does not issue a query per recipe"""
+        few = self._count_list_queries(2)
+        many = self._count_list_queries(20)
+
+        self.assertEqual(few, many)
+
+    def test_detail_query_count_is_constant(self):
+        """Test that the nested detail does not issue a query per relation"""
+        recipe = sample_recipe(user=self.user)
+        recipe.tags.add(sample_tag(user=self.user))
+        recipe.ingredients.add(sample_ingredient(user=self.user))
+
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.get(detail_url(recipe.id))
+        few = len(ctx.captured_queries)
+
+        for i in range(20):
+            recipe.tags.add(sample_tag(user=self.user, name=f'Tag {i}'))
+            recipe.ingredients.add(
+                sample_ingredient(user=self.user, name=f'Ingredient {i}')
+            )
+
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.get(detail_url(recipe.id))
+
+        self.assertEqual(few, len(ctx.captured_queries))
+
+    def test_list_selected_fields(self):
+        """Test that ?fields= renders and loads only the selected fields"""
+        recipe = sample_recipe(user=self.user, link='https://example.com')
+        recipe.tags.add(sample_tag(user=self.user))
+
+        with CaptureQueriesContext(connection) as ctx:
+            res = self.client.get(RECIPIES_URL, {'fields': 'id,title'})
+
+        self.assertEqual(
+            res.data['results'], [{'id': recipe.id, 'title': recipe.title}]
+        )
+        sql = ' '.join(query['sql'] for query in ctx.captured_queries)
+        self.assertNotIn('"link"', sql)
+        self.assertNotIn('core_recipe_tags', sql)
+
+    def test_list_omitted_fields(self):
+        """Test that ?omit= drops fields and skips their prefetch"""
+        recipe = sample_recipe(user=self.user)
+        recipe.tags.add(sample_tag(user=self.user))
+
+        with CaptureQueriesContext(connection) as ctx:
+            res = self.client.get(
+                RECIPIES_URL, {'omit': 'tags,ingredients,link'}
+            )
+
+        self.assertEqual(list(res.data['results'][0]), [
+            'id', 'title', 'time_minutes', 'price', 'image_status',
+            'image_renditions',
+        ])
+        sql = ' '.join(query['sql'] for query in ctx.captured_queries)
+        self.assertNotIn('core_recipe_tags', sql)
+        self.assertIn('image_digest', sql)
+
+    def test_selected_fields_detail_and_ordering(self):
+        """Test that field selection works on details and other orderings"""
+        recipe = sample_recipe(user=self.user, title='Cheap', price='1.00')
+        sample_recipe(user=self.user, title='Dear', price='9.00')
+
+        res = self.client.get(RECIPIES_URL, {
+            'fields': 'title', 'ordering': '-price', 'page_size': 1,
+        })
+        self.assertEqual(res.data['results'], [{'title': 'Dear'}])
+        res = self.client.get(res.data['next'])
+        self.assertEqual(res.data['results'], [{'title': 'Cheap'}])
+
+        res = self.client.get(detail_url(recipe.id), {'fields': 'id,tags'})
+        self.assertEqual(res.data, {'id': recipe.id, 'tags': []})
+
+    def test_selected_fields_invalid(self):
+        """Test that unknown fields are rejected"""
+        res = self.client.get(RECIPIES_URL, {'fields': 'title,user'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_selected_fields_ignored_on_write(self):
+        """Test that writes always render the full recipe"""
+        payload = {
+            'title': 'Cake', 'time_minutes': 30, 'price': '5.00',
+            'ingredients': [],
+        }
+
+        res = self.client.post(f'{RECIPIES_URL}?fields=id', payload)
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertIn('title', res.data)
+
+    def test_list_served_from_cache_until_write(self):
+        """Test that a repeated list is cached and a write invalidates it"""
+        sample_recipe(user=self.user)
+        first = self.client.get(RECIPIES_URL)
+
+        with CaptureQueriesContext(connection) as queries:
+            cached = self.client.get(RECIPIES_URL)
+        self.assertEqual(recipe_queries(queries), [])
+        self.assertEqual(cached.data, first.data)
+        self.assertEqual(cached['ETag'], first['ETag'])
+
+        self.client.post(
+            RECIPIES_URL, {'title': 'Cake', 'time_minutes': 5, 'price': 7.50}
+        )
+        res = self.client.get(RECIPIES_URL)
+
+        self.assertNotEqual(res['ETag'], first['ETag'])
+        self.assertEqual(len(res.data['results']), 2)
+
+    def test_list_not_modified(self):
+        """Test that a list matching the client's ETag returns 304"""
+        sample_recipe(user=self.user)
+        res = self.client.get(RECIPIES_URL)
+
+        with CaptureQueriesContext(connection) as queries:
+            res = self.client.get(RECIPIES_URL, HTTP_IF_NONE_MATCH=res['ETag'])
+        self.assertEqual(recipe_queries(queries), [])
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
 
     def test_recipe_detail(self):
         """Test the detail view ofn our Recipe API"""
@@ -192,6 +350,48 @@ class PrivateRecipeApiTest(TestCase):
         self.assertIn(ingredient1, ingredients)
         self.assertIn(ingredient2, ingredients)
 
+    def test_create_recipe_with_other_users_tag(self):
+        """Tags of another user cannot be attached to a recipe"""
+        user2 = get_user_model().objects.create_user(
+            'jolly@gmail.com', 'basscoder'
+        )
+        tag = sample_tag(user=user2)
+        payload = {
+            'title': 'Chocolate Cake',
+            'tags': [tag.id],
+            'time_minutes': 5,
+            'price': 7.50
+        }
+
+        res = self.client.post(RECIPIES_URL, payload)
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('tags', res.data)
+
+    def test_create_recipe_related_ids_resolved_in_one_query(self):
+        """Validating many related ids costs one query per relation"""
+        tags = [sample_tag(user=self.user, name=f'Tag {i}') for i in range(50)]
+        payload = {
+            'title': 'Chocolate Cake',
+            'time_minutes': 5,
+            'price': '7.50',
+            'tags': [tag.id for tag in tags],
+            'ingredients': [],
+        }
+        serializer = RecipeSerializer(
+            data=payload, context={'request': self._request()}
+        )
+
+        with self.assertNumQueries(1):
+            self.assertTrue(serializer.is_valid())
+        self.assertEqual(serializer.validated_data['tags'], tags)
+
+    def _request(self):
+        """Return a request made by the test user"""
+        request = APIRequestFactory().post(RECIPIES_URL)
+        request.user = self.user
+        return request
+
     def test_partial_update_recipe(self):
         """Test to update a recipe using patch"""
 
@@ -245,6 +445,53 @@ class PrivateRecipeApiTest(TestCase):
         self.assertEqual(len(tags), 0)
 
 
+class SharedGenerationTests(TestCase):
+    """Test that list invalidation reaches every process"""
+
+    def setUp(self):
+        # One cache object per worker process, as each one builds its own
+        self.workers = [DatabaseCache('shared_cache', {}) for _ in range(2)]
+
+    def in_worker(self, index):
+        return mock.patch.object(
+            response_cache, 'get_cache', return_value=self.workers[index]
+        )
+
+    def test_write_in_one_worker_invalidates_the_other(self):
+        """Test that a generation bumped by one worker is seen by another"""
+        with self.in_worker(0):
+            before = response_cache.get_generation(1)
+        with self.in_worker(1):
+            self.assertEqual(response_cache.get_generation(1), before)
+            response_cache.bump_generation(1)
+
+        with self.in_worker(0):
+            self.assertNotEqual(response_cache.get_generation(1)[0], before[0])
+
+    @override_settings(RECIPE_RESPONSE_CACHE={'CACHE': 'default'})
+    def test_process_local_cache_refused(self):
+        """Test that the per-process cache cannot hold the generations"""
+        with self.assertRaises(ImproperlyConfigured):
+            response_cache.get_generation(1)
+
+
+class CommittedGenerationTests(TransactionTestCase):
+    """Test that writes invalidate the cached lists once committed"""
+
+    def test_generation_bumped_after_commit(self):
+        """Test that lists cached before the commit are not reused"""
+        user = get_user_model().objects.create_user(
+            'vedant@gmail.com', 'basscoder2808'
+        )
+        before = response_cache.get_generation(user.pk)
+
+        with transaction.atomic():
+            sample_recipe(user=user)
+            self.assertEqual(response_cache.get_generation(user.pk), before)
+
+        self.assertNotEqual(response_cache.get_generation(user.pk), before)
+
+
 class RecipeImageUploadTests(TestCase):
 
     def setUp(self):
@@ -254,23 +501,187 @@ class RecipeImageUploadTests(TestCase):
         self.recipe = sample_recipe(user=self.user)
 
     def tearDown(self):
+        self.recipe.refresh_from_db()
         self.recipe.image.delete()
-
-    def test_upload_image_to_recipe(self):
-        """Upload an image to our recipe"""
+        if self.recipe.image_upload:
+            self.recipe.image_upload.delete()
+        if self.recipe.image_digest:
+            self._delete_renditions(self.recipe.image_digest)
+
+    def _delete_renditions(self, digest):
+        directory = os.path.dirname(images.rendition_path(digest, 0, 'jpeg'))
+        for name in default_storage.listdir(directory)[1]:
+            default_storage.delete(os.path.join(directory, name))
+
+    def _upload(self, img, **save_kwargs):
+        """Post an image to the recipe"""
         url = image_upload_url(self.recipe.id)
 
         with tempfile.NamedTemporaryFile(suffix='.jpg') as ntf:
-            img = Image.new('RGB', (10, 10))
-            img.save(ntf, format='JPEG')
+            img.save(ntf, format='JPEG', **save_kwargs)
             ntf.seek(0)
-            res = self.client.post(url, {'image': ntf}, format='multipart')
+            return self.client.post(url, {'image': ntf}, format='multipart')
+
+    @override_settings(RECIPE_IMAGE_PIPELINE={'EAGER': True})
+    def test_upload_image_to_recipe(self):
+        """Upload an image to our recipe"""
+        res = self._upload(Image.new('RGB', (10, 10)))
 
         self.recipe.refresh_from_db()
 
-        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(res.status_code, status.HTTP_202_ACCEPTED)
         self.assertIn('image', res.data)
+        self.assertEqual(self.recipe.image_status, Recipe.IMAGE_READY)
         self.assertTrue(os.path.exists(self.recipe.image.path))
+        self.assertFalse(self.recipe.image_upload)
+
+    @override_settings(
+        RECIPE_IMAGE_PIPELINE={'EAGER': True, 'RENDITION_SIZES': (8, 16)}
+    )
+    def test_upload_image_renditions(self):
+        """Renditions are created once per image content and exposed as urls"""
+        res = self._upload(Image.new('RGB', (40, 20)))
+        self.recipe.refresh_from_db()
+        digest = self.recipe.image_digest
+
+        res = self.client.get(detail_url(self.recipe.id))
+        renditions = res.data['image_renditions']
+
+        self.assertEqual(set(renditions), {'8', '16'})
+        for size in (8, 16):
+            path = images.rendition_path(digest, size, 'jpeg')
+            self.assertTrue(renditions[str(size)]['jpeg'].endswith(path))
+            with default_storage.open(path) as f, Image.open(f) as img:
+                self.assertEqual(max(img.size), size)
+
+        path = images.rendition_path(digest, 8, 'jpeg')
+        modified = default_storage.get_modified_time(path)
+        self.assertEqual(
+            images.generate_renditions(self.recipe.image.read()), digest
+        )
+        self.assertEqual(default_storage.get_modified_time(path), modified)
+
+    def test_upload_image_processed_in_background(self):
+        """The upload is accepted before the image is processed"""
+        res = self._upload(Image.new('RGB', (10, 10)))
+
+        self.recipe.refresh_from_db()
+
+        self.assertEqual(res.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(res.data['image_status'], Recipe.IMAGE_PENDING)
+        self.assertTrue(os.path.exists(self.recipe.image_upload.path))
+        self.assertFalse(self.recipe.image)
+
+    @override_settings(RECIPE_IMAGE_PIPELINE={'EAGER': True, 'MAX_SIZE': 64})
+    def test_upload_image_oriented_and_resized(self):
+        """The stored image follows the EXIF orientation and the size limit"""
+        exif = Image.Exif()
+        exif[0x0112] = 6  # Rotated 90 degrees clockwise
+        self._upload(Image.new('RGB', (200, 100)), exif=exif)
+
+        self.recipe.refresh_from_db()
+
+        with Image.open(self.recipe.image.path) as img:
+            self.assertEqual(img.size, (32, 64))
+
+    def test_rendition_written_twice(self):
+        """Two jobs storing the same rendition leave a single file"""
+        path = images.rendition_path('ab' * 32, 8, 'jpeg')
+        directory = os.path.dirname(path)
+        self.addCleanup(self._delete_renditions, 'ab' * 32)
+
+        images.save_rendition(path, b'first')
+        images.save_rendition(path, b'second')
+
+        self.assertEqual(default_storage.listdir(directory)[1], ['8.jpg'])
+        with default_storage.open(path) as f:
+            self.assertEqual(f.read(), b'second')
+
+    def test_webp_support_checked_once(self):
+        """Rendition urls do not query Pillow's features for every recipe"""
+        images.can_encode_webp.cache_clear()
+        self.addCleanup(images.can_encode_webp.cache_clear)
+
+        with mock.patch.object(
+            images.features, 'check', return_value=True
+        ) as check:
+            for _ in range(3):
+                images.rendition_urls('ab' * 32)
+
+        self.assertEqual(check.call_count, 1)
+
+    def test_upload_keeps_previous_until_its_job_ran(self):
+        """A second upload leaves the first one to its job, which drops it"""
+        self._upload(Image.new('RGB', (10, 10)))
+        self.recipe.refresh_from_db()
+        first = self.recipe.image_upload.name
+
+        self._upload(Image.new('RGB', (20, 20)))
+        self.recipe.refresh_from_db()
+        second = self.recipe.image_upload.name
+        self.assertTrue(default_storage.exists(first))
+
+        images.process_recipe_image(self.recipe.id, first)
+        self.recipe.refresh_from_db()
+        self.assertFalse(default_storage.exists(first))
+        self.assertEqual(self.recipe.image_status, Recipe.IMAGE_PENDING)
+
+        images.process_recipe_image(self.recipe.id, second)
+        self.recipe.refresh_from_db()
+        self.assertEqual(self.recipe.image_status, Recipe.IMAGE_READY)
+        self.assertFalse(default_storage.exists(second))
+
+    def test_upload_replaced_while_processing(self):
+        """A job finishing after a newer upload arrived does not replace it"""
+        stored_images = default_storage.listdir('uploads/recipe/')[1]
+        self._upload(Image.new('RGB', (10, 10)))
+        self.recipe.refresh_from_db()
+        first = self.recipe.image_upload.name
+        render_image = images.render_image
+
+        def upload_meanwhile(fp):
+            self._upload(Image.new('RGB', (20, 20)))
+            return render_image(fp)
+
+        with mock.patch.object(
+            images, 'render_image', side_effect=upload_meanwhile
+        ):
+            images.process_recipe_image(self.recipe.id, first)
+
+        self.recipe.refresh_from_db()
+        self.assertEqual(self.recipe.image_status, Recipe.IMAGE_PENDING)
+        self.assertNotEqual(self.recipe.image_upload.name, first)
+        self.assertFalse(self.recipe.image)
+        self.assertFalse(default_storage.exists(first))
+        self.assertEqual(
+            default_storage.listdir('uploads/recipe/')[1], stored_images
+        )
+
+    def test_upload_failure_marks_recipe_failed(self):
+        """Any error of the job leaves the recipe failed, not processing"""
+        self._upload(Image.new('RGB', (10, 10)))
+        self.recipe.refresh_from_db()
+        upload = self.recipe.image_upload.name
+
+        error = OSError('disk full')
+        with mock.patch.object(
+            images, 'generate_renditions', side_effect=error
+        ), self.assertLogs('recipe.images', 'ERROR'):
+            images.process_recipe_image(self.recipe.id, upload)
+
+        self.recipe.refresh_from_db()
+        self.assertEqual(self.recipe.image_status, Recipe.IMAGE_FAILED)
+        self.assertFalse(self.recipe.image_upload)
+        self.assertFalse(default_storage.exists(upload))
+
+    def test_image_job_errors_logged(self):
+        """Errors escaping a background job are logged"""
+        with mock.patch.object(
+            images, 'process_recipe_image', side_effect=RuntimeError
+        ), self.assertLogs('recipe.images', 'ERROR') as logs:
+            images._run_job(self.recipe.id, 'uploads/recipe/raw/missing.jpg')
+
+        self.assertIn(f'recipe {self.recipe.id} failed', logs.output[0])
 
     def test_upload_image_bad_request(self):
         """Upload an image which is not allowed"""
@@ -298,30 +709,153 @@ class RecipeImageUploadTests(TestCase):
         serializer2 = RecipeSerializer(recipe2)
         serializer3 = RecipeSerializer(recipe3)
 
-        self.assertIn(serializer1.data, res.data)
-        self.assertIn(serializer2.data, res.data)
-        self.assertNotIn(serializer3.data, res.data)
+        self.assertIn(serializer1.data, res.data['results'])
+        self.assertIn(serializer2.data, res.data['results'])
+        self.assertNotIn(serializer3.data, res.data['results'])
 
-        def test_filter_recipies_by_ingredients(self):
-            """Filter recipies by tags"""
-            recipe1 = sample_recipe(user=self.user, title='Vegan Curry')
-            recipe2 = sample_recipe(user=self.user, title='Veg KOfta')
+    def test_filter_recipies_by_ingredients(self):
+        """Filter recipies by ingredients"""
+        recipe1 = sample_recipe(user=self.user, title='Vegan Curry')
+        recipe2 = sample_recipe(user=self.user, title='Veg KOfta')
+
+        ingredient1 = sample_ingredient(user=self.user, name='Vegan kofta')
+        ingredient2 = sample_ingredient(user=self.user, name='Vegetables')
 
-            ingredient1 = sample_tag(user=self.user, name='Vegan kofta')
-            ingredient2 = sample_tag(user=self.user, name='Vegetables')
+        recipe1.ingredients.add(ingredient1)
+        recipe2.ingredients.add(ingredient2)
 
-            recipe1.tags.add(ingredient1)
-            recipe2.tags.add(ingredient2)
+        recipe3 = sample_recipe(user=self.user, title='FIsh and Chips')
 
-            recipe3 = sample_recipe(user=self.user, title='FIsh and Chips')
+        res = self.client.get(
+            RECIPIES_URL,
+            {'ingredients': f'{ingredient1.id},{ingredient2.id}'}
+        )
 
-            res = self.client.get(
-                RECIPIES_URL, {'ingredients': f'{ingredient1.id},{ingredient2.id}'})
+        serializer1 = RecipeSerializer(recipe1)
+        serializer2 = RecipeSerializer(recipe2)
+        serializer3 = RecipeSerializer(recipe3)
+
+        self.assertIn(serializer1.data, res.data['results'])
+        self.assertIn(serializer2.data, res.data['results'])
+        self.assertNotIn(serializer3.data, res.data['results'])
+
+    def test_filter_recipies_without_duplicates(self):
+        """Filtering on several matching relations returns a recipe once"""
+        recipe = sample_recipe(user=self.user)
+        tag1 = sample_tag(user=self.user, name='Vegan')
+        tag2 = sample_tag(user=self.user, name='Veg')
+        ingredient1 = sample_ingredient(user=self.user, name='Rice')
+        ingredient2 = sample_ingredient(user=self.user, name='Dal')
+        recipe.tags.add(tag1, tag2)
+        recipe.ingredients.add(ingredient1, ingredient2)
+
+        res = self.client.get(RECIPIES_URL, {
+            'tags': f'{tag1.id},{tag2.id}',
+            'ingredients': f'{ingredient1.id},{ingredient2.id}',
+        })
+
+        self.assertEqual([r['id'] for r in res.data['results']], [recipe.id])
+
+    def test_filter_recipies_match_all(self):
+        """Filter recipies that have every one of the given tags"""
+        recipe1 = sample_recipe(user=self.user, title='Vegan Curry')
+        recipe2 = sample_recipe(user=self.user, title='Veg KOfta')
+        tag1 = sample_tag(user=self.user, name='Vegan')
+        tag2 = sample_tag(user=self.user, name='Spicy')
+        recipe1.tags.add(tag1, tag2)
+        recipe2.tags.add(tag1)
+
+        res = self.client.get(
+            RECIPIES_URL, {'tags': f'{tag1.id},{tag2.id}', 'match': 'all'}
+        )
+
+        self.assertEqual([r['id'] for r in res.data['results']], [recipe1.id])
+
+    def test_filter_recipies_invalid_params(self):
+        """Malformed filter parameters are rejected"""
+        res = self.client.get(RECIPIES_URL, {'tags': 'one,two'})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+        res = self.client.get(RECIPIES_URL, {'tags': '1', 'match': 'some'})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
 
-            serializer1 = RecipeSerializer(recipe1)
-            serializer2 = RecipeSerializer(recipe2)
-            serializer3 = RecipeSerializer(recipe3)
+        res = self.client.get(RECIPIES_URL, {'tags': f'1,{10 ** 30}'})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('tags', res.data)
+
+    def test_filter_recipies_by_time_and_price(self):
+        """Filter recipies by maximum time and a price range"""
+        quick = sample_recipe(
+            user=self.user, title='Toast', time_minutes=5, price='2.00'
+        )
+        sample_recipe(
+            user=self.user, title='Roast', time_minutes=120, price='15.00'
+        )
+        sample_recipe(
+            user=self.user, title='Caviar', time_minutes=5, price='90.00'
+        )
+
+        res = self.client.get(RECIPIES_URL, {
+            'max_time': 30, 'min_price': '1', 'max_price': '4.50',
+        })
+
+        self.assertEqual([r['id'] for r in res.data['results']], [quick.id])
+
+    def test_filter_recipies_by_large_price_bounds(self):
+        """Price bounds above the largest price of a recipe are accepted"""
+        res = self.client.get(
+            RECIPIES_URL, {'min_price': '1000', 'max_price': '100000.50'}
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['results'], [])
+
+        res = self.client.get(RECIPIES_URL, {'max_price': '1000'})
+        self.assertEqual(
+            [r['id'] for r in res.data['results']], [self.recipe.id]
+        )
+
+    def test_order_recipies(self):
+        """Order recipies by a whitelisted field along with other filters"""
+        tag = sample_tag(user=self.user)
+        recipes = [
+            sample_recipe(
+                user=self.user, title=title, time_minutes=minutes, price=price
+            )
+            for title, minutes, price in (
+                ('Soup', 20, '4.00'), ('Salad', 10, '6.00'),
+                ('Stew', 90, '3.00'), ('Pie', 25, '4.00'),
+            )
+        ]
+        for recipe in recipes:
+            recipe.tags.add(tag)
+
+        res = self.client.get(RECIPIES_URL, {
+            'tags': tag.id, 'max_time': 30, 'ordering': 'price',
+            'page_size': 2,
+        })
+        titles = [r['title'] for r in res.data['results']]
+        res = self.client.get(res.data['next'])
+        titles += [r['title'] for r in res.data['results']]
+        self.assertEqual(titles, ['Soup', 'Pie', 'Salad'])
+
+        res = self.client.get(RECIPIES_URL, {'ordering': '-time_minutes'})
+        self.assertEqual(
+            [r['title'] for r in res.data['results']],
+            ['Stew', 'Pie', 'Soup', 'Salad', self.recipe.title]
+        )
 
-            self.assertIn(serializer1.data, res.data)
-            self.assertIn(serializer2.data, res.data)
-            self.assertNotIn(serializer3.data, res.data)
+    def test_order_and_range_invalid_params(self):
+        """Unknown orderings and malformed ranges are rejected"""
+        for params in (
+            {'ordering': 'user'},
+            {'ordering': '--price'},
+            {'max_time': 'soon'},
+            {'max_time': '-1'},
+            {'max_time': str(10 ** 30)},
+            {'max_price': '1.234'},
+        ):
+            res = self.client.get(RECIPIES_URL, params)
+            self.assertEqual(
+                res.status_code, status.HTTP_400_BAD_REQUEST, params
+            )
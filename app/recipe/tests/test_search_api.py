@@ -0,0 +1,162 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Tag, Ingredient
+from recipe import cache as response_cache
+
+RECIPES_URL = reverse('recipe:recipe-list')
+RECIPES_BULK_URL = reverse('recipe:recipe-bulk')
+TAGS_BULK_URL = reverse('recipe:tag-bulk')
+
+
+def sample_recipe(user, **params):
+    """Creating and returning a sample recipe"""
+    defaults = {
+        'title': 'Sample Recipe',
+        'time_minutes': 5,
+        'price': 5.00
+    }
+    defaults.update(params)
+
+    return Recipe.objects.create(user=user, **defaults)
+
+
+@mock.patch.object(
+    response_cache.transaction, 'on_commit', lambda func, using=None: func()
+)
+class RecipeSearchApiTests(TestCase):
+    """Test searching recipes with ?q="""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'vedant@gmail.com',
+            'basscoder2808'
+        )
+        self.client.force_authenticate(self.user)
+
+    def search(self, query, **params):
+        res = self.client.get(RECIPES_URL, {'q': query, **params})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return [recipe['title'] for recipe in res.data['results']]
+
+    def test_search_title_tags_and_ingredients(self):
+        """Test that the query matches titles, tags and ingredient names"""
+        curry = sample_recipe(self.user, title='Chicken curry')
+        salad = sample_recipe(self.user, title='Green salad')
+        soup = sample_recipe(self.user, title='Lentil soup')
+        salad.tags.add(Tag.objects.create(user=self.user, name='Vegan'))
+        soup.ingredients.add(
+            Ingredient.objects.create(user=self.user, name='Chicken stock')
+        )
+
+        self.assertEqual(self.search('curry'), [curry.title])
+        self.assertEqual(self.search('vegan'), [salad.title])
+        self.assertCountEqual(
+            self.search('chicken'), [curry.title, soup.title]
+        )
+
+    def test_search_requires_every_word(self):
+        """Test that every word of the query must match"""
+        sample_recipe(self.user, title='Chicken curry')
+        sample_recipe(self.user, title='Chicken soup')
+
+        self.assertEqual(self.search('chicken curry'), ['Chicken curry'])
+        self.assertEqual(self.search('chicken pie'), [])
+
+    def test_search_ranks_title_matches_first(self):
+        """Test that a title match ranks above an ingredient match"""
+        stew = sample_recipe(self.user, title='Winter stew')
+        stew.ingredients.add(
+            Ingredient.objects.create(user=self.user, name='Mushroom')
+        )
+        risotto = sample_recipe(self.user, title='Mushroom risotto')
+
+        self.assertEqual(self.search('mushroom'), [risotto.title, stew.title])
+
+    def test_search_pagination(self):
+        """Test that ranked results can be paged through with the cursor"""
+        for index in range(5):
+            sample_recipe(self.user, title=f'Pasta {index}')
+
+        res = self.client.get(RECIPES_URL, {'q': 'pasta', 'page_size': 2})
+        titles = [recipe['title'] for recipe in res.data['results']]
+        while res.data['next']:
+            res = self.client.get(res.data['next'])
+            titles += [recipe['title'] for recipe in res.data['results']]
+
+        self.assertEqual(
+            titles, [f'Pasta {index}' for index in reversed(range(5))]
+        )
+
+    def test_search_limited_to_user(self):
+        """Test that other users' recipes are never matched"""
+        other = get_user_model().objects.create_user(
+            'other@gmail.com', 'testpass'
+        )
+        sample_recipe(other, title='Chicken curry')
+
+        self.assertEqual(self.search('curry'), [])
+
+    def test_index_follows_writes(self):
+        """Test that renames, unlinks and deletes show in the results"""
+        recipe = sample_recipe(self.user, title='Pancakes')
+        tag = Tag.objects.create(user=self.user, name='Breakfast')
+        recipe.tags.add(tag)
+        self.assertEqual(self.search('breakfast'), ['Pancakes'])
+
+        tag.name = 'Brunch'
+        tag.save()
+        self.assertEqual(self.search('breakfast'), [])
+        self.assertEqual(self.search('brunch'), ['Pancakes'])
+
+        tag.recipe_set.clear()
+        self.assertEqual(self.search('brunch'), [])
+
+        recipe.title = 'Waffles'
+        recipe.save()
+        self.assertEqual(self.search('waffles'), ['Waffles'])
+        ingredient = Ingredient.objects.create(user=self.user, name='Butter')
+        recipe.ingredients.add(ingredient)
+        ingredient.delete()
+        self.assertEqual(self.search('butter'), [])
+
+    def test_bulk_writes_indexed(self):
+        """Test that recipes written in bulk are searchable"""
+        tag = Tag.objects.create(user=self.user, name='Spicy')
+        payload = [
+            {
+                'title': 'Hot wings', 'time_minutes': 20, 'price': '6.00',
+                'tags': [tag.id],
+            },
+            {'title': 'Mild wings', 'time_minutes': 20, 'price': '6.00'},
+        ]
+        res = self.client.post(RECIPES_BULK_URL, payload, format='json')
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+
+        self.assertEqual(self.search('spicy wings'), ['Hot wings'])
+
+    def test_bulk_rename_indexed(self):
+        """Test that tags renamed in bulk are found by their new name"""
+        recipe = sample_recipe(self.user, title='Soup')
+        tag = Tag.objects.create(user=self.user, name='Squash')
+        recipe.tags.add(tag)
+
+        payload = [{'id': tag.id, 'name': 'Zucchini'}]
+        res = self.client.patch(TAGS_BULK_URL, payload, format='json')
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        self.assertEqual(self.search('zucchini'), ['Soup'])
+        self.assertEqual(self.search('squash'), [])
+
+    def test_search_without_words(self):
+        """Test that a query without any word matches nothing"""
+        sample_recipe(self.user, title='Chicken curry')
+
+        self.assertEqual(self.search('!!'), [])
@@ -1,3 +1,6 @@
+import json
+from base64 import b64encode
+
 from django.contrib.auth import get_user_model
 from django.urls import reverse
 from django.test import TestCase
@@ -47,7 +50,7 @@ class PrivateTagsApiTests(TestCase):
         serializer = TagSerializers(tags, many=True)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data['results'], serializer.data)
 
     def test_tags_limited_to_user(self):
         """Test to check that a user can retrieve his tags only"""
@@ -61,8 +64,8 @@ class PrivateTagsApiTests(TestCase):
         res = self.client.get(TAGS_URL)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(res.data), 1)
-        self.assertEqual(res.data[0]['name'], tag.name)
+        self.assertEqual(len(res.data['results']), 1)
+        self.assertEqual(res.data['results'][0]['name'], tag.name)
 
     def test_create_tag_successfull(self):
         """Test for creating a tag successfull"""
@@ -82,3 +85,51 @@ class PrivateTagsApiTests(TestCase):
         res = self.client.post(TAGS_URL, payload)
 
         self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_tags_paginated_with_cursor(self):
+        """Test that walking the cursor returns every tag exactly once"""
+        for name in ['Vegan', 'Vegan', 'Desserts', 'Breakfast', 'Vegan']:
+            Tag.objects.create(user=self.user, name=name)
+
+        res = self.client.get(TAGS_URL, {'page_size': 2})
+        seen = list(res.data['results'])
+        self.assertIsNone(res.data['previous'])
+        while res.data['next']:
+            res = self.client.get(res.data['next'])
+            seen.extend(res.data['results'])
+
+        tags = Tag.objects.filter(user=self.user).order_by('-name', 'id')
+        self.assertEqual(seen, TagSerializers(tags, many=True).data)
+
+        previous = self.client.get(res.data['previous'])
+        self.assertEqual(previous.data['results'], seen[2:4])
+
+    def test_tags_invalid_cursor(self):
+        """Test that a tampered cursor is rejected"""
+        res = self.client.get(TAGS_URL, {'cursor': 'not-a-cursor'})
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_tags_cursor_with_invalid_values(self):
+        """Test that cursors with values the ordering cannot use fail"""
+        for values in (
+            [['Vegan'], 1], ['Vegan', {'id': 1}], ['Vegan', 'one'],
+            ['Vegan', 10 ** 30], ['Vegan', True],
+        ):
+            payload = json.dumps({'v': values, 'r': 0}).encode('utf-8')
+            cursor = b64encode(payload).decode('ascii')
+
+            res = self.client.get(TAGS_URL, {'cursor': cursor})
+
+            self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_tags_selected_fields(self):
+        """Test that ?fields= trims the tags list"""
+        Tag.objects.create(user=self.user, name='Vegan')
+        Tag.objects.create(user=self.user, name='Dessert')
+
+        res = self.client.get(TAGS_URL, {'fields': 'name'})
+
+        self.assertEqual(
+            res.data['results'], [{'name': 'Vegan'}, {'name': 'Dessert'}]
+        )
@@ -1,36 +1,223 @@
+from django.db import transaction
+from django.http import StreamingHttpResponse
+from django.utils.translation import gettext_lazy as _
+
 from rest_framework import viewsets, mixins, status
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
-from rest_framework.authentication import TokenAuthentication
 from rest_framework.permissions import IsAuthenticated
 
 from core.models import Tag, Ingredient, Recipe
+from core.profiling import ProfiledViewMixin
+from core.replicas import ReplicaReadMixin
+from core.throttling import SlidingWindowThrottle
+from user.authentication import (
+    CachedTokenAuthentication, SignedTokenAuthentication,
+)
 
-from recipe import serializers
+from recipe import exports, images, search, serializers
+from recipe.autocomplete import (
+    bump_generation as bump_index_generation, complete, parse_limit,
+)
+from recipe.cache import CachedListMixin, bump_generation
+from recipe.fastpath import FastListMixin, FastRetrieveMixin
+from recipe.filters import (
+    RecipeOrderingFilterBackend, RecipeRangeFilterBackend,
+    RecipeRelationFilterBackend, RecipeSearchFilterBackend,
+)
+from recipe.pagination import KeysetPagination
+from recipe.signals import bulk_writes
+from recipe.streaming import StreamingListMixin
 
 # Create your views here.
 
 
-class BaseRecipeAtrrViewSet(viewsets.GenericViewSet, mixins.ListModelMixin, mixins.CreateModelMixin):
+def setup_eager_loading(view, queryset):
+    """Load only what the view's serializer renders for the selected fields"""
+    serializer_class = view.get_serializer_class()
+    if not hasattr(serializer_class, 'setup_eager_loading'):
+        return queryset
+    fields = serializer_class.get_selected_fields(view.request)
+    return serializer_class.setup_eager_loading(
+        queryset, fields, view.get_ordering()
+    )
+
+
+def _is_id(value):
+    """Whether a JSON value is an integer id, booleans are not"""
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+class BulkModelMixin:
+    """Create (POST), update (PATCH) and delete (DELETE) batches of objects
+
+    The whole batch is validated first and written inside one transaction,
+    invalid batches are rejected with errors aligned with the submitted items.
+    """
+
+    bulk_serializer_class = None
+
+    def get_serializer_class(self):
+        if self.action == 'bulk':
+            return self.bulk_serializer_class
+        return super().get_serializer_class()
+
+    @action(methods=['POST', 'PATCH', 'DELETE'], detail=False, url_path='bulk')
+    def bulk(self, request):
+        """Apply a batch of writes"""
+        if request.method == 'DELETE':
+            return self._bulk_delete(request)
+
+        if request.method == 'POST':
+            serializer = self.get_serializer(data=request.data, many=True)
+            response_status = status.HTTP_201_CREATED
+        else:
+            ids = self._bulk_ids(request.data)
+            instances = list(self.get_queryset().filter(id__in=ids))
+            serializer = self.get_serializer(
+                instances, data=request.data, many=True, partial=True
+            )
+            response_status = status.HTTP_200_OK
+
+        serializer.is_valid(raise_exception=True)
+        with transaction.atomic(), bulk_writes():
+            if request.method == 'POST':
+                objs = serializer.save(user=request.user)
+            else:
+                objs = serializer.save()
+            self.bulk_saved(objs)
+        self.bulk_committed()
+
+        return Response(
+            self._bulk_representation(objs), status=response_status
+        )
+
+    def bulk_saved(self, objs):
+        """Hook for the work the receivers skipped during bulk writes do"""
+
+    def perform_bulk_delete(self, ids):
+        """Delete the user's objects with these ids"""
+        self.get_queryset().filter(id__in=ids).delete()
+
+    def bulk_committed(self):
+        """Invalidate the user's cached lists once the writes are committed"""
+        bump_generation(self.request.user.pk)
+
+    def _bulk_delete(self, request):
+        """Delete the user's objects whose ids are listed in the body"""
+        if not isinstance(request.data, list):
+            return Response(
+                {'non_field_errors': [_('Expected a list of ids.')]},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        ids = self._bulk_ids(request.data)
+        found = set(
+            self.get_queryset().filter(id__in=ids).values_list('id', flat=True)
+        )
+        errors = [
+            {} if _is_id(pk) and pk in found else {'id': [_('Not found.')]}
+            for pk in request.data
+        ]
+        if any(errors):
+            return Response(errors, status=status.HTTP_400_BAD_REQUEST)
+
+        with transaction.atomic(), bulk_writes():
+            self.perform_bulk_delete(found)
+        self.bulk_committed()
+
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+    def _bulk_ids(self, data):
+        """Return the integer ids referenced by a bulk request body"""
+        if not isinstance(data, list):
+            return []
+        items = (
+            item.get('id') if isinstance(item, dict) else item
+            for item in data
+        )
+        return [pk for pk in items if _is_id(pk)]
+
+    def _bulk_representation(self, objs):
+        """Render the written objects with the regular serializer"""
+        queryset = self.queryset.filter(id__in=[obj.id for obj in objs])
+        if hasattr(self.serializer_class, 'setup_eager_loading'):
+            queryset = self.serializer_class.setup_eager_loading(queryset)
+        by_id = {obj.id: obj for obj in queryset}
+        context = self.get_serializer_context()
+        return self.serializer_class(
+            [by_id[obj.id] for obj in objs], many=True, context=context
+        ).data
+
+
+class BaseRecipeAtrrViewSet(ProfiledViewMixin, ReplicaReadMixin,
+                            CachedListMixin, FastListMixin, BulkModelMixin,
+                            viewsets.GenericViewSet, mixins.ListModelMixin,
+                            mixins.CreateModelMixin):
     """Base view set for our Recipe API"""
 
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = (
+        SignedTokenAuthentication, CachedTokenAuthentication,
+    )
     permission_classes = (IsAuthenticated,)
+    throttle_classes = (SlidingWindowThrottle,)
+    throttle_scope = 'recipe'
+    pagination_class = KeysetPagination
+    ordering = ('-name', 'id')
+
+    def get_ordering(self):
+        """Return the keyset ordering used for listing"""
+        return self.ordering
 
     def get_queryset(self):
         """Return objects for the current user"""
-        return self.queryset.filter(user=self.request.user).order_by('-name')
+        queryset = self.queryset.filter(user=self.request.user)
+        queryset = queryset.order_by(*self.get_ordering())
+        return setup_eager_loading(self, queryset)
 
     def perform_create(self, serializer):
         """Create a new tag"""
         serializer.save(user=self.request.user)
 
+    def bulk_saved(self, objs):
+        """Reindex the recipes linked to the objects, they may be renamed"""
+        search.reindex_recipes(search.linked_recipe_ids(
+            self.queryset.model, [obj.id for obj in objs]
+        ))
+
+    def perform_bulk_delete(self, ids):
+        """Delete the objects and drop them from their recipes' index"""
+        recipe_ids = search.linked_recipe_ids(self.queryset.model, ids)
+        super().perform_bulk_delete(ids)
+        search.reindex_recipes(recipe_ids)
+
+    def bulk_committed(self):
+        """Also make every process rebuild its autocomplete index"""
+        super().bulk_committed()
+        bump_index_generation(self.queryset.model, self.request.user.pk)
+
+    @action(methods=['GET'], detail=False)
+    def autocomplete(self, request):
+        """Return the first names starting with `?prefix=` (or `?q=`)
+
+        Matches come in alphabetical order.
+        """
+        params = request.query_params
+        prefix = params.get('prefix', params.get('q', '')).strip()
+        matches = complete(
+            self.get_queryset(), request.user.pk, prefix,
+            parse_limit(params.get('limit')),
+        )
+        return Response([{'id': pk, 'name': name} for pk, name in matches])
+
 
 class TagViewSet(BaseRecipeAtrrViewSet):
     """To manage Tag model views"""
 
     queryset = Tag.objects.all()
     serializer_class = serializers.TagSerializers
+    bulk_serializer_class = serializers.TagBulkSerializer
 
 
 class IngredientViewSet(BaseRecipeAtrrViewSet):
@@ -38,43 +225,68 @@ class IngredientViewSet(BaseRecipeAtrrViewSet):
 
     queryset = Ingredient.objects.all()
     serializer_class = serializers.IngredientSerializer
+    bulk_serializer_class = serializers.IngredientBulkSerializer
 
 
-class RecipeViewSet(viewsets.ModelViewSet):
+class RecipeViewSet(ProfiledViewMixin, ReplicaReadMixin, CachedListMixin,
+                    StreamingListMixin, FastListMixin, FastRetrieveMixin,
+                    BulkModelMixin, viewsets.ModelViewSet):
     """To manage Recipe view set"""
 
     queryset = Recipe.objects.all()
     serializer_class = serializers.RecipeSerializer
-    authentication_classes = (TokenAuthentication,)
+    bulk_serializer_class = serializers.RecipeBulkSerializer
+    authentication_classes = (
+        SignedTokenAuthentication, CachedTokenAuthentication,
+    )
     permission_classes = (IsAuthenticated,)
+    throttle_classes = (SlidingWindowThrottle,)
+    throttle_scope = 'recipe'
+    pagination_class = KeysetPagination
+    filter_backends = (
+        RecipeRelationFilterBackend, RecipeRangeFilterBackend,
+        RecipeSearchFilterBackend, RecipeOrderingFilterBackend,
+    )
+    ordering = ('-id',)
+    search_ordering = ('-rank', '-id')
+    export_format_param = 'export_format'
+    throttle_action_scopes = {'upload_image': 'upload'}
 
-    def _params_to_ints(self, qs):
-        """Function to convert string ids to integer"""
-        return [int(str_id) for str_id in qs.split(',')]
+    def get_ordering(self):
+        """Return the keyset ordering used for listing
+
+        An explicit `?ordering=` wins, otherwise searches are ordered by
+        relevance.
+        """
+        ordering = RecipeOrderingFilterBackend().get_ordering(
+            self.request, self
+        )
+        if ordering is not None:
+            return ordering
+        params = self.request.query_params
+        if params.get(RecipeSearchFilterBackend.search_param, '').strip():
+            return self.search_ordering
+        return self.ordering
 
     def get_queryset(self):
         """Return objects for the current user"""
-        tags = self.request.query_params.get('tags')
-        ingredients = self.request.query_params.get('ingredients')
-        queryset = self.queryset
-        if tags:
-            tags_ids = self._params_to_ints(queryset)
-            queryset = queryset.filter(tags__id__in=tags_ids)
-
-        if ingredients:
-            ingredients_tags = self._params_to_ints(queryset)
-            queryset = queryset.filter(ingredients__id__in=ingredients_tags)
-        return queryset.filter(user=self.request.user)
+        queryset = self.queryset.filter(user=self.request.user)
+        queryset = queryset.order_by(*self.ordering)
+        return setup_eager_loading(self, queryset)
 
     def get_serializer_class(self):
         """Retrieve the serializer class"""
 
         if self.action == 'retrieve':
             return serializers.RecipeDetailSerializer
-        elif self.action == ' upload_image':
+        elif self.action == 'upload_image':
             return serializers.RecipeImageSerializer
 
-        return self.serializer_class
+        return super().get_serializer_class()
+
+    def bulk_saved(self, objs):
+        """Index the written recipes"""
+        search.reindex_recipes([obj.id for obj in objs])
 
     def perform_create(self, serializer):
         """Create a new Recipe"""
@@ -89,7 +301,35 @@ class RecipeViewSet(viewsets.ModelViewSet):
         serializer = self.get_serializer(recipe, data=request.data)
 
         if serializer.is_valid():
-            serializer.save()
-            return Response(serializer.data, status=status.HTTP_200_OK)
+            # The job of a replaced upload deletes it, it may still read it
+            recipe = serializer.save(image_status=Recipe.IMAGE_PENDING)
+            images.enqueue(recipe.id, recipe.image_upload.name)
+            return Response(serializer.data, status=status.HTTP_202_ACCEPTED)
 
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+    @action(methods=['GET'], detail=False)
+    def export(self, request):
+        """Stream the user's tags, ingredients and recipes as NDJSON or CSV"""
+        export_format = request.query_params.get(
+            self.export_format_param, 'ndjson'
+        )
+        if export_format not in exports.CONTENT_TYPES:
+            message = _('Expected one of %(formats)s.') % {
+                'formats': ', '.join(exports.CONTENT_TYPES),
+            }
+            raise ValidationError({self.export_format_param: message})
+
+        # The body is generated after the view returned, pin the database the
+        # request was routed to
+        using = Recipe.objects.all().db
+        response = StreamingHttpResponse(
+            exports.export(
+                request.user, export_format, self.stream_chunk_size, using
+            ),
+            content_type=exports.CONTENT_TYPES[export_format],
+        )
+        response['Content-Disposition'] = (
+            f'attachment; filename="recipes.{export_format}"'
+        )
+        return response
@@ -0,0 +1,167 @@
+import copy
+import hashlib
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.utils.translation import gettext_lazy as _
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication
+
+from core.lru import LocalLRUCache
+from user import tokens
+
+DEFAULTS = {
+    # Entries kept in the in-process tier of every worker
+    'LOCAL_MAX_ENTRIES': 10000,
+    # Seconds an entry lives in the in-process tier, this bounds how long
+    # another process can keep serving a token after it was invalidated
+    'LOCAL_TIMEOUT': 30,
+    # Alias from settings.CACHES shared between processes, None to disable
+    'SHARED_CACHE': None,
+    'SHARED_TIMEOUT': 300,
+}
+
+
+def get_setting(name):
+    """Return a TOKEN_AUTH_CACHE setting falling back to our defaults"""
+    return getattr(settings, 'TOKEN_AUTH_CACHE', {}).get(name, DEFAULTS[name])
+
+
+class TokenCache:
+    """Two tier cache of authenticated (user, token) pairs keyed by token
+
+    Keys are hashed so raw tokens never end up in a shared backend.
+    """
+
+    key_prefix = 'auth-token'
+
+    def __init__(self):
+        self.local = LocalLRUCache(
+            get_setting('LOCAL_MAX_ENTRIES'), get_setting('LOCAL_TIMEOUT')
+        )
+
+    @property
+    def shared(self):
+        alias = get_setting('SHARED_CACHE')
+        return caches[alias] if alias else None
+
+    def make_key(self, key):
+        digest = hashlib.sha256(key.encode('utf-8')).hexdigest()
+        return f'{self.key_prefix}:{digest}'
+
+    def get(self, key):
+        cache_key = self.make_key(key)
+        entry = self.local.get(cache_key)
+        if entry is None and self.shared is not None:
+            entry = self.shared.get(cache_key)
+            if entry is not None:
+                self.local.set(cache_key, entry)
+        if entry is None:
+            return None
+        return _detach(entry)
+
+    def set(self, key, user, token):
+        cache_key = self.make_key(key)
+        entry = _detach((user, token))
+        self.local.set(cache_key, entry)
+        if self.shared is not None:
+            self.shared.set(cache_key, entry, get_setting('SHARED_TIMEOUT'))
+
+    def delete(self, key):
+        cache_key = self.make_key(key)
+        self.local.delete(cache_key)
+        if self.shared is not None:
+            self.shared.delete(cache_key)
+
+    def clear(self):
+        """Drop the in-process tier, the shared tier expires on its own"""
+        self.local.clear()
+
+
+token_cache = TokenCache()
+
+
+def _copy_instance(instance, **related):
+    """Shallow copy a cached model instance with its own state and relations"""
+    instance = copy.copy(instance)
+    instance._state = copy.copy(instance._state)
+    instance._state.fields_cache = related
+    return instance
+
+
+def _detach(entry):
+    """Copy a cached (user, token) pair so requests never share instances"""
+    user, token = entry
+    user = _copy_instance(user)
+    return user, _copy_instance(token, user=user)
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """Token authentication that only hits the database on a cache miss
+
+    Entries are evicted when the token is deleted or its user is saved, see
+    `user.signals`.
+    """
+
+    def authenticate_credentials(self, key):
+        entry = token_cache.get(key)
+        if entry is None:
+            user, token = super().authenticate_credentials(key)
+            token_cache.set(key, user, token)
+            return user, token
+
+        user, token = entry
+        if not user.is_active:
+            raise exceptions.AuthenticationFailed(
+                _('User inactive or deleted.')
+            )
+        return user, token
+
+
+user_cache = LocalLRUCache(
+    get_setting('LOCAL_MAX_ENTRIES'), get_setting('LOCAL_TIMEOUT')
+)
+
+
+def get_cached_user(user_id):
+    """Return a copy of a user from the in-process tier, loaded on a miss"""
+    user = user_cache.get(user_id)
+    if user is None:
+        user = get_user_model()._default_manager.filter(pk=user_id).first()
+        if user is None:
+            return None
+        user_cache.set(user_id, user)
+    return _copy_instance(user)
+
+
+class SignedTokenAuthentication(TokenAuthentication):
+    """Authentication with the signed tokens of `user.tokens`
+
+    The signature and expiry are checked without a query, revocations come
+    from the in-memory index and users from the in-process cache, so a warm
+    worker authenticates requests on CPU alone. Keys that are not signed
+    tokens are left to the next authentication class.
+    """
+
+    def authenticate_credentials(self, key):
+        # Signed tokens read `payload:timestamp:signature`, legacy keys are hex
+        if ':' not in key:
+            return None
+        try:
+            token = tokens.read_token(key)
+        except tokens.ExpiredToken:
+            raise exceptions.AuthenticationFailed(_('Token has expired.'))
+        except tokens.InvalidToken:
+            raise exceptions.AuthenticationFailed(_('Invalid token.'))
+        if token.jti in tokens.revocations:
+            raise exceptions.AuthenticationFailed(_('Token has been revoked.'))
+
+        user = get_cached_user(token.user_id)
+        if user is None or not user.is_active:
+            raise exceptions.AuthenticationFailed(
+                _('User inactive or deleted.')
+            )
+        if not tokens.is_valid_for(token, user):
+            raise exceptions.AuthenticationFailed(_('Invalid token.'))
+        return user, token
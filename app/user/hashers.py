@@ -0,0 +1,128 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth import hashers
+from django.utils.translation import gettext_lazy as _
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+DEFAULTS = {
+    # Threads hashing passwords in every worker process, the CPU a burst of
+    # logins can take from the other endpoints
+    'WORKERS': 2,
+    # Hashing jobs allowed to wait for a thread before logins are refused
+    'QUEUE': 16,
+    'ARGON2_TIME_COST': 2,
+    # KiB
+    'ARGON2_MEMORY_COST': 19456,
+    'ARGON2_PARALLELISM': 1,
+    'BCRYPT_ROUNDS': 12,
+}
+
+_executor = None
+_slots = None
+_executor_lock = threading.Lock()
+_local = threading.local()
+
+
+def get_setting(name):
+    """Return a PASSWORD_HASHING setting falling back to our defaults"""
+    return getattr(settings, 'PASSWORD_HASHING', {}).get(name, DEFAULTS[name])
+
+
+class HashingBusy(APIException):
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = _('Too many logins in progress, try again shortly.')
+    default_code = 'hashing_busy'
+
+
+def get_executor():
+    """Return the process wide hashing pool and the slots bounding it"""
+    global _executor, _slots
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                workers = get_setting('WORKERS')
+                _slots = threading.BoundedSemaphore(
+                    workers + get_setting('QUEUE')
+                )
+                _executor = ThreadPoolExecutor(
+                    max_workers=workers, thread_name_prefix='password-hasher'
+                )
+    return _executor, _slots
+
+
+def run_bounded(func, *args):
+    """Run a hashing function on the hashing pool and wait for its result
+
+    Raises `HashingBusy` instead of queueing when the pool is saturated. Calls
+    made from a pool thread, such as `verify` calling `encode`, run in place.
+    """
+    if getattr(_local, 'active', False):
+        return func(*args)
+    executor, slots = get_executor()
+    if not slots.acquire(blocking=False):
+        raise HashingBusy()
+    try:
+        return executor.submit(_run_job, func, args).result()
+    finally:
+        slots.release()
+
+
+def _run_job(func, args):
+    _local.active = True
+    try:
+        return func(*args)
+    finally:
+        _local.active = False
+
+
+class BoundedHasherMixin:
+    """Hash and verify on the bounded hashing pool
+
+    Only the CPU bound work moves to the pool, the user lookup and the rehash
+    Django saves after a successful login stay in the request thread.
+    """
+
+    def encode(self, password, salt, *args):
+        return run_bounded(super().encode, password, salt, *args)
+
+    def verify(self, password, encoded):
+        return run_bounded(super().verify, password, encoded)
+
+    def harden_runtime(self, password, encoded):
+        return run_bounded(super().harden_runtime, password, encoded)
+
+
+class Argon2PasswordHasher(BoundedHasherMixin, hashers.Argon2PasswordHasher):
+    """Argon2 with the costs from `PASSWORD_HASHING`
+
+    Hashes with other costs are updated when their user logs in.
+    """
+
+    @property
+    def time_cost(self):
+        return get_setting('ARGON2_TIME_COST')
+
+    @property
+    def memory_cost(self):
+        return get_setting('ARGON2_MEMORY_COST')
+
+    @property
+    def parallelism(self):
+        return get_setting('ARGON2_PARALLELISM')
+
+
+class BCryptSHA256PasswordHasher(
+    BoundedHasherMixin, hashers.BCryptSHA256PasswordHasher
+):
+    """bcrypt with the rounds from `PASSWORD_HASHING`"""
+
+    @property
+    def rounds(self):
+        return get_setting('BCRYPT_ROUNDS')
+
+
+class PBKDF2PasswordHasher(BoundedHasherMixin, hashers.PBKDF2PasswordHasher):
+    """Django's default hasher, kept to verify and upgrade existing hashes"""
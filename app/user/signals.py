@@ -0,0 +1,31 @@
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from user.authentication import token_cache, user_cache
+
+
+@receiver(post_delete, sender=Token)
+def evict_deleted_token(sender, instance, **kwargs):
+    """Stop accepting a token as soon as it is deleted"""
+    token_cache.delete(instance.key)
+
+
+@receiver(post_save, sender=get_user_model())
+def evict_user_tokens(sender, instance, created, update_fields=None, **kwargs):
+    """Drop a saved user from the caches, and its tokens if it is inactive"""
+    if created:
+        return
+    user_cache.delete(instance.pk)
+    if update_fields is not None and 'is_active' not in update_fields:
+        return
+    keys = Token.objects.filter(user=instance).values_list('key', flat=True)
+    for key in keys:
+        token_cache.delete(key)
+
+
+@receiver(post_delete, sender=get_user_model())
+def evict_deleted_user(sender, instance, **kwargs):
+    """Stop accepting the signed tokens of a deleted user"""
+    user_cache.delete(instance.pk)
@@ -0,0 +1,98 @@
+import threading
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.cache import caches
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from user import hashers
+from user.throttling import LoginEmailThrottle, LoginIPThrottle
+
+TOKEN_URL = reverse('user:token')
+
+
+class LoginTests(TestCase):
+    """Test password hashing and throttling of the token endpoint"""
+
+    def setUp(self):
+        caches['shared'].clear()
+        self.user = get_user_model().objects.create_user(
+            'vedant@gmail.com', 'BassCoder2808'
+        )
+        self.client = APIClient()
+
+    def login(self, password='BassCoder2808', email='vedant@gmail.com'):
+        payload = {'email': email, 'password': password}
+        return self.client.post(TOKEN_URL, payload)
+
+    def test_new_passwords_use_argon2(self):
+        self.assertTrue(self.user.password.startswith('argon2$'))
+        self.assertEqual(self.login().status_code, status.HTTP_200_OK)
+
+    def test_legacy_hash_upgraded_on_login(self):
+        self.user.password = make_password(
+            'BassCoder2808', hasher='pbkdf2_sha256'
+        )
+        self.user.save()
+
+        self.assertEqual(self.login().status_code, status.HTTP_200_OK)
+
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.password.startswith('argon2$'))
+
+    def test_hash_with_old_costs_upgraded_on_login(self):
+        with override_settings(PASSWORD_HASHING={'ARGON2_TIME_COST': 3}):
+            self.login()
+            self.user.refresh_from_db()
+            self.assertIn('t=3', self.user.password)
+
+    def test_saturated_hashing_pool(self):
+        """Test that logins are refused, not queued, when the pool is full"""
+        executor, _ = hashers.get_executor()
+        full = threading.BoundedSemaphore(1)
+        full.acquire()
+        with mock.patch.object(
+            hashers, 'get_executor', return_value=(executor, full)
+        ):
+            res = self.login()
+
+        self.assertEqual(res.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+
+    def test_email_throttled_before_hashing(self):
+        for _ in range(5):
+            self.assertEqual(
+                self.login('wrong').status_code, status.HTTP_400_BAD_REQUEST
+            )
+
+        hasher = hashers.Argon2PasswordHasher
+        with mock.patch.object(hasher, 'verify') as verify:
+            res = self.login(email='VEDANT@gmail.com')
+
+        self.assertEqual(res.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertIn('Retry-After', res)
+        verify.assert_not_called()
+
+    def test_successful_login_resets_email_failures(self):
+        for _ in range(4):
+            self.login('wrong')
+        self.assertEqual(self.login().status_code, status.HTTP_200_OK)
+
+        for _ in range(4):
+            self.assertEqual(
+                self.login('wrong').status_code, status.HTTP_400_BAD_REQUEST
+            )
+
+    def test_ip_throttled_across_emails(self):
+        rates = {'login_ip': '3/min', 'login_email': '5/min'}
+        with mock.patch.object(LoginIPThrottle, 'THROTTLE_RATES', rates), \
+                mock.patch.object(LoginEmailThrottle, 'THROTTLE_RATES', rates):
+            for i in range(3):
+                self.login('wrong', email=f'user{i}@gmail.com')
+            res = self.login()
+
+        self.assertEqual(res.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
@@ -0,0 +1,133 @@
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import RevokedToken
+from user import tokens
+from user.authentication import user_cache
+
+TOKEN_URL = reverse('user:token')
+REFRESH_URL = reverse('user:token-refresh')
+REVOKE_URL = reverse('user:token-revoke')
+ME_URL = reverse('user:me')
+
+
+class SignedTokenTests(TestCase):
+    """Test issuing, verifying, rotating and revoking signed tokens"""
+
+    def setUp(self):
+        user_cache.clear()
+        tokens.revocations.clear()
+        self.user = get_user_model().objects.create_user(
+            'vedant@gmail.com', 'BassCoder2808'
+        )
+        self.client = APIClient()
+        res = self.client.post(TOKEN_URL, {
+            'email': 'vedant@gmail.com', 'password': 'BassCoder2808',
+        })
+        self.token = res.data['token']
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token}')
+
+    def test_verified_without_queries(self):
+        self.client.get(ME_URL)
+
+        with self.assertNumQueries(0):
+            res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['email'], 'vedant@gmail.com')
+
+    def test_expired_token_is_rejected(self):
+        with mock.patch('user.tokens.time.time', return_value=4_000_000_000):
+            res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_tampered_token_is_rejected(self):
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token[:-1]}x')
+
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_password_change_invalidates_tokens(self):
+        self.user.set_password('AnotherPassword1')
+        self.user.save()
+
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_refresh_rotates_the_token(self):
+        res = self.client.post(REFRESH_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(res.data['token'], self.token)
+        self.assertEqual(
+            self.client.get(ME_URL).status_code, status.HTTP_401_UNAUTHORIZED
+        )
+        token = res.data['token']
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {token}')
+        self.assertEqual(
+            self.client.get(ME_URL).status_code, status.HTTP_200_OK
+        )
+
+    def test_revoke(self):
+        res = self.client.post(REVOKE_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertEqual(
+            self.client.get(ME_URL).status_code, status.HTTP_401_UNAUTHORIZED
+        )
+
+    @override_settings(SIGNED_TOKENS={'REFRESH_INTERVAL': 0})
+    def test_revocations_of_other_processes_are_picked_up(self):
+        self.client.get(ME_URL)
+        token = tokens.read_token(self.token)
+        RevokedToken.objects.create(
+            jti=token.jti, user=self.user, expires_at='2100-01-01T00:00Z'
+        )
+
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_prune_tokens(self):
+        self.client.post(REVOKE_URL)
+        RevokedToken.objects.create(
+            jti=1, user=self.user, expires_at='2000-01-01T00:00Z'
+        )
+
+        call_command('prune_tokens', stdout=StringIO())
+
+        self.assertEqual(RevokedToken.objects.count(), 1)
+
+
+class RevocationIndexTests(TestCase):
+    """Test the in-memory index of revoked tokens"""
+
+    def test_incremental_refresh(self):
+        user = get_user_model().objects.create_user(
+            'vedant@gmail.com', 'BassCoder2808'
+        )
+        index = tokens.RevocationIndex()
+        future, past = '2100-01-01T00:00Z', '2000-01-01T00:00Z'
+        RevokedToken.objects.create(jti=5, user=user, expires_at=future)
+        RevokedToken.objects.create(jti=7, user=user, expires_at=past)
+        index.refresh(force=True)
+
+        self.assertIn(5, index)
+        self.assertNotIn(7, index)
+
+        RevokedToken.objects.create(jti=3, user=user, expires_at=future)
+        index.refresh(force=True)
+        index.add(9)
+
+        self.assertEqual(list(index._jtis), [3, 5, 9])
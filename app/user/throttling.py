@@ -0,0 +1,76 @@
+import hashlib
+
+from rest_framework.throttling import SimpleRateThrottle
+
+from core.caches import get_shared_cache
+
+
+class LoginFailureThrottle(SimpleRateThrottle):
+    """Refuse logins once a client has failed `rate` of them
+
+    Only failed logins are counted, by `record_failure`. The check runs before
+    the serializer so a credential stuffing burst is rejected without hashing
+    a single password. The count restarts `duration` seconds after the first
+    failure. Counts live in a cache shared between processes, so the limit
+    holds for the deployment rather than for each worker.
+    """
+
+    # Alias from settings.CACHES holding the failure counts
+    cache_alias = 'shared'
+
+    @property
+    def cache(self):
+        return get_shared_cache(
+            self.cache_alias, f'{type(self).__name__}.cache_alias'
+        )
+
+    def allow_request(self, request, view):
+        if self.rate is None:
+            return True
+        self.key = self.get_cache_key(request, view)
+        if self.key is None:
+            return True
+        return self.cache.get(self.key, 0) < self.num_requests
+
+    def wait(self):
+        return self.duration
+
+    def record_failure(self):
+        """Count a failed login of the client of the last checked request"""
+        if getattr(self, 'key', None) is None:
+            return
+        if not self.cache.add(self.key, 1, self.duration):
+            try:
+                self.cache.incr(self.key)
+            except ValueError:
+                self.cache.set(self.key, 1, self.duration)
+
+    def reset(self):
+        """Forget the failures of the client of the last checked request"""
+        if getattr(self, 'key', None) is not None:
+            self.cache.delete(self.key)
+
+
+class LoginIPThrottle(LoginFailureThrottle):
+    """Failed logins per client address"""
+
+    scope = 'login_ip'
+
+    def get_cache_key(self, request, view):
+        ident = self.get_ident(request)
+        return self.cache_format % {'scope': self.scope, 'ident': ident}
+
+
+class LoginEmailThrottle(LoginFailureThrottle):
+    """Failed logins per submitted email, whichever address they come from"""
+
+    scope = 'login_email'
+
+    def get_cache_key(self, request, view):
+        data = request.data
+        email = data.get('email') if hasattr(data, 'get') else None
+        if not isinstance(email, str) or not email.strip():
+            return None
+        email = email.strip().lower().encode('utf-8')
+        ident = hashlib.sha256(email).hexdigest()
+        return self.cache_format % {'scope': self.scope, 'ident': ident}
@@ -0,0 +1,169 @@
+import datetime
+import secrets
+import threading
+import time
+from array import array
+from bisect import bisect_left
+from collections import namedtuple
+
+from django.conf import settings
+from django.core import signing
+from django.db import DEFAULT_DB_ALIAS
+from django.utils import timezone
+from django.utils.crypto import constant_time_compare, salted_hmac
+
+from core.models import RevokedToken
+
+DEFAULTS = {
+    # Seconds a token is accepted after it was issued
+    'LIFETIME': 3600,
+    # Seconds between two reads of the new revocations, the longest another
+    # process keeps accepting a revoked token
+    'REFRESH_INTERVAL': 1,
+    # Revocations committed up to this many seconds late are still picked up
+    'REFRESH_OVERLAP': 30,
+    # Seconds between two full reloads of the revocations, dropping the
+    # expired ones from memory
+    'REBUILD_INTERVAL': 300,
+}
+
+SALT = 'user.tokens'
+
+SignedToken = namedtuple('SignedToken', 'key user_id jti expires user_hash')
+
+
+def get_setting(name):
+    """Return a SIGNED_TOKENS setting falling back to our defaults"""
+    return getattr(settings, 'SIGNED_TOKENS', {}).get(name, DEFAULTS[name])
+
+
+class InvalidToken(Exception):
+    pass
+
+
+class ExpiredToken(InvalidToken):
+    pass
+
+
+def user_hash(user):
+    """Digest of the user's password, so changing it invalidates every token"""
+    return salted_hmac(SALT, user.password).hexdigest()[:16]
+
+
+def issue_token(user):
+    """Return a new signed token of the user and the seconds it is valid for"""
+    lifetime = get_setting('LIFETIME')
+    expires = int(time.time()) + lifetime
+    payload = [user.pk, secrets.randbits(63), expires, user_hash(user)]
+    return {'token': signing.dumps(payload, salt=SALT), 'expires_in': lifetime}
+
+
+def read_token(key):
+    """Verify a signed token and return its claims, without any query"""
+    try:
+        user_id, jti, expires, digest = signing.loads(key, salt=SALT)
+    except (signing.BadSignature, TypeError, ValueError):
+        raise InvalidToken(key)
+    if expires <= time.time():
+        raise ExpiredToken(key)
+    return SignedToken(key, user_id, jti, expires, digest)
+
+
+def is_valid_for(token, user):
+    return constant_time_compare(token.user_hash, user_hash(user))
+
+
+def revoke_token(token):
+    """Refuse a token from now on, in every process within REFRESH_INTERVAL"""
+    expires_at = datetime.datetime.fromtimestamp(
+        token.expires, datetime.timezone.utc
+    )
+    RevokedToken.objects.using(DEFAULT_DB_ALIAS).get_or_create(
+        jti=token.jti,
+        defaults={'user_id': token.user_id, 'expires_at': expires_at},
+    )
+    revocations.add(token.jti)
+
+
+class RevocationIndex:
+    """Sorted array of the ids of the revoked, unexpired, tokens
+
+    Lookups are a lock free binary search. The array is brought up to date
+    with the revocations recorded since the previous read at most every
+    REFRESH_INTERVAL seconds, and rebuilt from the unexpired ones every
+    REBUILD_INTERVAL seconds.
+    """
+
+    def __init__(self):
+        self._jtis = array('q')
+        self._lock = threading.Lock()
+        self._checked = None
+        self._rebuilt = None
+        self._synced_at = None
+
+    def __contains__(self, jti):
+        self.refresh()
+        jtis = self._jtis
+        index = bisect_left(jtis, jti)
+        return index < len(jtis) and jtis[index] == jti
+
+    def __len__(self):
+        return len(self._jtis)
+
+    def add(self, jti):
+        """Record a revocation made by this process"""
+        with self._lock:
+            self._jtis = _merged(self._jtis, [jti])
+
+    def refresh(self, force=False):
+        now = time.monotonic()
+        checked = self._checked
+        interval = get_setting('REFRESH_INTERVAL')
+        if not force and checked is not None and now - checked < interval:
+            return
+        # Threads arriving during a refresh keep using the current array
+        if not self._lock.acquire(blocking=force):
+            return
+        try:
+            started = timezone.now()
+            revoked = RevokedToken.objects.using(DEFAULT_DB_ALIAS).filter(
+                expires_at__gt=started
+            )
+            rebuilt = self._rebuilt
+            interval = get_setting('REBUILD_INTERVAL')
+            if rebuilt is None or now - rebuilt >= interval:
+                jtis = revoked.values_list('jti', flat=True)
+                self._jtis = array('q', sorted(set(jtis)))
+                self._rebuilt = now
+            else:
+                overlap = get_setting('REFRESH_OVERLAP')
+                since = self._synced_at - datetime.timedelta(seconds=overlap)
+                jtis = revoked.filter(revoked_at__gte=since).values_list(
+                    'jti', flat=True
+                )
+                self._jtis = _merged(self._jtis, jtis)
+            self._synced_at = started
+            self._checked = now
+        finally:
+            self._lock.release()
+
+    def clear(self):
+        """Forget everything, the next lookup reloads the revocations"""
+        with self._lock:
+            self._jtis = array('q')
+            self._checked = self._rebuilt = self._synced_at = None
+
+
+def _merged(jtis, new):
+    """Return the sorted array of `jtis` with the missing ids of `new`"""
+    missing = set()
+    for jti in new:
+        index = bisect_left(jtis, jti)
+        if index == len(jtis) or jtis[index] != jti:
+            missing.add(jti)
+    if not missing:
+        return jtis
+    return array('q', sorted([*jtis, *missing]))
+
+
+revocations = RevocationIndex()
@@ -1,29 +1,100 @@
-from rest_framework import generics, authentication, permissions
+from django.contrib.auth import get_user_model
+from rest_framework import generics, permissions, status
 from rest_framework.authtoken.views import ObtainAuthToken
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
 from rest_framework.settings import api_settings
+from rest_framework.views import APIView
 
+from core.profiling import ProfiledViewMixin
+from core.replicas import ReplicaReadMixin
+from core.throttling import SlidingWindowThrottle
+from user import tokens
+from user.authentication import (
+    CachedTokenAuthentication, SignedTokenAuthentication,
+)
 from user.serializers import UserSerializer, AuthTokenSerializer
+from user.throttling import LoginEmailThrottle, LoginIPThrottle
 
 # Create your views here.
 
 
-class CreateUserView(generics.CreateAPIView):
+class CreateUserView(ProfiledViewMixin, generics.CreateAPIView):
     """Create a new user in the system"""
     serializer_class = UserSerializer
+    throttle_classes = (SlidingWindowThrottle,)
+    throttle_scope = 'user'
 
 
-class CreateTokenView(ObtainAuthToken):
-    """Create a new auth token for user"""
+class CreateTokenView(ProfiledViewMixin, ObtainAuthToken):
+    """Create a new auth token for user
+
+    Tokens are signed and expire, see `user.tokens`. Failed logins count
+    against both the client address and the email, see `user.throttling`.
+    """
     serializer_class = AuthTokenSerializer
     renderer_classes = api_settings.DEFAULT_RENDERER_CLASSES
+    throttle_classes = (LoginIPThrottle, LoginEmailThrottle)
+
+    def get_throttles(self):
+        self.login_throttles = super().get_throttles()
+        return self.login_throttles
+
+    def post(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        try:
+            serializer.is_valid(raise_exception=True)
+        except ValidationError:
+            for throttle in self.login_throttles:
+                throttle.record_failure()
+            raise
+        for throttle in self.login_throttles:
+            if isinstance(throttle, LoginEmailThrottle):
+                throttle.reset()
+        return Response(tokens.issue_token(serializer.validated_data['user']))
+
+
+class RefreshTokenView(ProfiledViewMixin, APIView):
+    """Exchange the signed token of the request for a new one and revoke it"""
+
+    authentication_classes = (SignedTokenAuthentication,)
+    permission_classes = (permissions.IsAuthenticated,)
+    throttle_classes = (SlidingWindowThrottle,)
+    throttle_scope = 'user'
+
+    def post(self, request):
+        tokens.revoke_token(request.auth)
+        return Response(tokens.issue_token(request.user))
+
+
+class RevokeTokenView(ProfiledViewMixin, APIView):
+    """Revoke the signed token of the request"""
+
+    authentication_classes = (SignedTokenAuthentication,)
+    permission_classes = (permissions.IsAuthenticated,)
+    throttle_classes = (SlidingWindowThrottle,)
+    throttle_scope = 'user'
+
+    def post(self, request):
+        tokens.revoke_token(request.auth)
+        return Response(status=status.HTTP_204_NO_CONTENT)
 
 
-class ManageUserView(generics.RetrieveUpdateAPIView):
+class ManageUserView(
+    ProfiledViewMixin, ReplicaReadMixin, generics.RetrieveUpdateAPIView
+):
     """Manage the authenticated user"""
 
     serializer_class = UserSerializer
-    authenticate_classes = (authentication.TokenAuthentication,)
+    authentication_classes = (
+        SignedTokenAuthentication, CachedTokenAuthentication,
+    )
     permission_classes = (permissions.IsAuthenticated, )
+    throttle_classes = (SlidingWindowThrottle,)
+    throttle_scope = 'user'
 
     def get_object(self):
-        return self.request.user
+        if self.request.method in permissions.SAFE_METHODS:
+            return self.request.user
+        # The authenticated user can be a cached copy, update the stored one
+        return get_user_model().objects.get(pk=self.request.user.pk)